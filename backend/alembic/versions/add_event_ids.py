@@ -0,0 +1,33 @@
+"""add event_id dedupe keys to offer_clicks and offer_views
+
+Revision ID: add_event_ids
+Revises: partition_event_tables
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_event_ids'
+down_revision = 'partition_event_tables'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['offer_clicks', 'offer_views']
+
+
+def upgrade():
+    for table in TABLES:
+        # Nullable column without default: a catalog-only change, no table rewrite
+        op.add_column(table, sa.Column('event_id', sa.String(length=32), nullable=True))
+        # Unique indexes on a partitioned parent must include the partition key (created_at)
+        op.create_index(f'uq_{table}_event_id', table, ['event_id', 'created_at'], unique=True, if_not_exists=True)
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_index(f'uq_{table}_event_id', table_name=table, if_exists=True)
+        op.drop_column(table, 'event_id')
@@ -0,0 +1,70 @@
+"""add composite and partial indexes for hot query shapes
+
+Revision ID: add_hot_query_indexes
+Revises: add_category_icon_url
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_query_indexes'
+down_revision = 'add_category_icon_url'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial predicate) - each mirrors a query the routers issue
+INDEXES = [
+    # offers list / featured / exclusive / recommendations:
+    # WHERE is_active ORDER BY priority DESC, created_at DESC
+    ('ix_offers_active_priority_created', 'offers',
+     [sa.text('priority DESC'), sa.text('created_at DESC')], 'is_active = true'),
+    # homepage featured offers: WHERE is_active AND is_featured ORDER BY priority DESC, created_at DESC
+    ('ix_offers_featured_priority_created', 'offers',
+     [sa.text('priority DESC'), sa.text('created_at DESC')], 'is_active = true AND is_featured = true'),
+    # homepage exclusive offers: WHERE is_active AND is_exclusive ORDER BY ...
+    ('ix_offers_exclusive_priority_created', 'offers',
+     [sa.text('priority DESC'), sa.text('created_at DESC')], 'is_active = true AND is_exclusive = true'),
+    # trending: offer_clicks JOIN ... AND created_at >= cutoff
+    ('ix_offer_clicks_offer_created', 'offer_clicks', ['offer_id', 'created_at'], None),
+    # recommendations: WHERE user_id = ? AND created_at >= cutoff
+    ('ix_offer_clicks_user_created', 'offer_clicks', ['user_id', 'created_at'], None),
+    # trending: offer_views JOIN ... AND created_at >= cutoff
+    ('ix_offer_views_offer_created', 'offer_views', ['offer_id', 'created_at'], None),
+    # wallet history: WHERE user_id = ? ORDER BY created_at DESC
+    ('ix_wallet_transactions_user_created', 'wallet_transactions', ['user_id', 'created_at'], None),
+    # admin analytics: WHERE payment_status = 'paid' AND created_at range
+    ('ix_orders_payment_status_created', 'orders', ['payment_status', 'created_at'], None),
+    # order history: WHERE user_id = ? ORDER BY created_at DESC
+    ('ix_orders_user_created', 'orders', ['user_id', 'created_at'], None),
+]
+
+
+def upgrade():
+    is_postgres = op.get_context().dialect.name == 'postgresql'
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            kwargs = {}
+            if where:
+                if is_postgres:
+                    kwargs['postgresql_where'] = sa.text(where)
+                else:
+                    kwargs['sqlite_where'] = sa.text(where.replace('true', '1'))
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
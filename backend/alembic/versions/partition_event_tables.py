@@ -0,0 +1,146 @@
+"""partition event tables by month on created_at
+
+Revision ID: partition_event_tables
+Revises: add_hot_query_indexes
+Create Date: 2026-10-19 10:00:00.000000
+
+Converts offer_clicks, offer_views, analytics_events and audit_logs into
+RANGE (created_at) partitioned tables with one partition per month plus a
+default partition. Existing rows are copied into the new layout; ongoing
+partition creation and retention is handled by app.tasks.partitions.
+PostgreSQL only - other dialects are left untouched.
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'partition_event_tables'
+down_revision = 'add_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ['offer_clicks', 'offer_views', 'analytics_events', 'audit_logs']
+PREMAKE_MONTHS = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + (value.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _table_exists(conn, table):
+    return conn.scalar(sa.text("SELECT to_regclass(:t) IS NOT NULL"), {'t': table})
+
+
+def _is_partitioned(conn, table):
+    return bool(conn.scalar(
+        sa.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+        {'t': table},
+    ))
+
+
+def _has_column(conn, table, column):
+    return bool(conn.scalar(
+        sa.text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :t AND column_name = :c"
+        ),
+        {'t': table, 'c': column},
+    ))
+
+
+def _secondary_indexes(conn, table):
+    """Non-constraint index definitions, to be recreated on the new parent."""
+    rows = conn.execute(
+        sa.text(
+            "SELECT i.relname, pg_get_indexdef(ix.indexrelid) FROM pg_index ix "
+            "JOIN pg_class i ON i.oid = ix.indexrelid "
+            "WHERE ix.indrelid = to_regclass(:t) AND NOT ix.indisprimary "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid)"
+        ),
+        {'t': table},
+    )
+    return list(rows)
+
+
+def _foreign_keys(conn, table):
+    rows = conn.execute(
+        sa.text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:t) AND contype = 'f'"
+        ),
+        {'t': table},
+    )
+    return list(rows)
+
+
+def _rebuild(conn, table, partitioned):
+    """Copy ``table`` into a fresh table, partitioned or plain, keeping indexes and FKs."""
+    legacy = f'{table}_legacy'
+    indexes = _secondary_indexes(conn, table)
+    fks = _foreign_keys(conn, table)
+    sequence = conn.scalar(sa.text("SELECT pg_get_serial_sequence(:t, 'id')"), {'t': table})
+
+    for name, _ in indexes:
+        op.execute(f'DROP INDEX "{name}"')
+    op.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+    op.execute(f'ALTER TABLE "{legacy}" RENAME CONSTRAINT "{table}_pkey" TO "{legacy}_pkey"')
+
+    if partitioned:
+        op.execute(f'UPDATE "{legacy}" SET created_at = now() AT TIME ZONE \'utc\' WHERE created_at IS NULL')
+        op.execute(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+        )
+        op.execute(f'ALTER TABLE "{table}" ALTER COLUMN created_at SET NOT NULL')
+        # Unique constraints on a partitioned table must include the partition key
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY (id, created_at)')
+        op.execute(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+        oldest = conn.scalar(sa.text(f'SELECT min(created_at) FROM "{legacy}"'))
+        current = datetime.now(timezone.utc).date().replace(day=1)
+        month = (oldest.date().replace(day=1) if oldest else current)
+        while month <= _add_months(current, PREMAKE_MONTHS):
+            name = f'{table}_p{month.year:04d}{month.month:02d}'
+            op.execute(
+                f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            )
+            month = _add_months(month, 1)
+    else:
+        op.execute(f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS)')
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY (id)')
+
+    op.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}".id')
+    op.execute(f'DROP TABLE "{legacy}"')
+
+    for _, definition in indexes:
+        op.execute(definition.replace(" ON ONLY ", " ON "))
+    for name, definition in fks:
+        op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}')
+
+
+def upgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    conn = op.get_bind()
+    for table in TABLES:
+        if not _table_exists(conn, table) or _is_partitioned(conn, table):
+            continue
+        if not _has_column(conn, table, 'created_at'):
+            continue
+        _rebuild(conn, table, partitioned=True)
+
+
+def downgrade():
+    if op.get_context().dialect.name != 'postgresql':
+        return
+    conn = op.get_bind()
+    for table in reversed(TABLES):
+        if _table_exists(conn, table) and _is_partitioned(conn, table):
+            _rebuild(conn, table, partitioned=False)
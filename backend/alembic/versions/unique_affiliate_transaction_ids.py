@@ -0,0 +1,69 @@
+"""make affiliate_transactions.external_transaction_id unique
+
+Revision ID: unique_affiliate_tx_ids
+Revises: add_event_ids
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'unique_affiliate_tx_ids'
+down_revision = 'add_event_ids'
+branch_labels = None
+depends_on = None
+
+
+INDEX = 'ix_affiliate_transactions_external_transaction_id'
+# Built next to the old index, then renamed over it, so lookups keep an index throughout
+NEW_INDEX = 'ix_affiliate_transactions_external_transaction_id_unique'
+
+
+def upgrade():
+    # The table is created by metadata.create_all; fresh databases already get the unique index
+    if not sa.inspect(op.get_bind()).has_table('affiliate_transactions'):
+        return
+    # The sync import upserts ON CONFLICT (external_transaction_id), which needs a unique index.
+    # Keep the first import of each transaction; later copies are the duplicates it created.
+    op.execute(
+        'DELETE FROM affiliate_transactions '
+        'WHERE external_transaction_id IS NOT NULL AND id NOT IN ('
+        'SELECT MIN(id) FROM affiliate_transactions '
+        'WHERE external_transaction_id IS NOT NULL GROUP BY external_transaction_id)'
+    )
+    if op.get_context().dialect.name != 'postgresql':
+        op.drop_index(INDEX, table_name='affiliate_transactions', if_exists=True)
+        op.create_index(INDEX, 'affiliate_transactions', ['external_transaction_id'], unique=True)
+        return
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            NEW_INDEX,
+            'affiliate_transactions',
+            ['external_transaction_id'],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(INDEX, table_name='affiliate_transactions', postgresql_concurrently=True, if_exists=True)
+        op.execute(f'ALTER INDEX {NEW_INDEX} RENAME TO {INDEX}')
+
+
+def downgrade():
+    if not sa.inspect(op.get_bind()).has_table('affiliate_transactions'):
+        return
+    if op.get_context().dialect.name != 'postgresql':
+        op.drop_index(INDEX, table_name='affiliate_transactions', if_exists=True)
+        op.create_index(INDEX, 'affiliate_transactions', ['external_transaction_id'])
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(INDEX, table_name='affiliate_transactions', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            INDEX,
+            'affiliate_transactions',
+            ['external_transaction_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
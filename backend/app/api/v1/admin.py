@@ -5,11 +5,25 @@ from datetime import datetime, timedelta
 from typing import Optional
 from math import ceil
 
-from ...redis_client import cache_invalidate, cache_invalidate_prefix, rk, redis_client, publish
-from ...database import get_db
+from ...redis_client import (
+    cache_invalidate,
+    cache_invalidate_prefix,
+    get_offer_click_count,
+    offer_unique_viewers,
+    publish,
+    redis_client,
+    rk,
+)
+from ...database import get_db, get_read_db
 from ...models import User, Withdrawal, WalletTransaction, Order, OrderItem, Merchant, Offer, Product, ProductVariant, Category, GiftCard, Banner
 from ...schemas.wallet_transaction import WithdrawalRead, WithdrawalStatusUpdate
-from ...queue import push_email_job, push_sms_job
+from ...jobs import (
+    WITHDRAWAL_PROCESSED_EMAIL,
+    WITHDRAWAL_PROCESSED_SMS,
+    WITHDRAWAL_REJECTED_EMAIL,
+    WITHDRAWAL_REJECTED_SMS,
+    submit,
+)
 from ...config import get_settings
 from ...dependencies import get_current_admin, require_admin, verify_admin_ip
 from pydantic import BaseModel, Field
@@ -871,26 +885,28 @@ def approve_withdrawal(
 
     # Queue approval notification
     if settings.EMAIL_ENABLED and user.email:
-        push_email_job(
-            "withdrawal_processed",
-            user.email,
+        submit(
+            WITHDRAWAL_PROCESSED_EMAIL,
             {
                 "user_name": user.full_name or (user.email.split('@')[0] if user.email else "User"),
                 "amount": withdrawal.amount,
                 "method": withdrawal.method,
                 "transaction_id": withdrawal.transaction_id or "N/A",
                 "status": "approved"
-            }
+            },
+            to=user.email,
+            key=str(withdrawal.id),
         )
 
     if settings.SMS_ENABLED and user.mobile:
-        push_sms_job(
-            "withdrawal_processed",
-            user.mobile,
+        submit(
+            WITHDRAWAL_PROCESSED_SMS,
             {
                 "amount": withdrawal.amount,
                 "status": "approved"
-            }
+            },
+            to=user.mobile,
+            key=str(withdrawal.id),
         )
 
     return {
@@ -953,9 +969,8 @@ def reject_withdrawal(
 
     # Queue rejection notification
     if settings.EMAIL_ENABLED and user.email:
-        push_email_job(
-            "withdrawal_rejected",
-            user.email,
+        submit(
+            WITHDRAWAL_REJECTED_EMAIL,
             {
                 "user_name": user.full_name or (user.email.split('@')[0] if user.email else "User"),
                 "amount": withdrawal.amount,
@@ -963,17 +978,20 @@ def reject_withdrawal(
                 "reason": payload.admin_notes or "Not specified",
                 "refunded_amount": withdrawal.amount,
                 "new_balance": new_balance
-            }
+            },
+            to=user.email,
+            key=str(withdrawal.id),
         )
 
     if settings.SMS_ENABLED and user.mobile:
-        push_sms_job(
-            "withdrawal_rejected",
-            user.mobile,
+        submit(
+            WITHDRAWAL_REJECTED_SMS,
             {
                 "amount": withdrawal.amount,
                 "refunded": withdrawal.amount
-            }
+            },
+            to=user.mobile,
+            key=str(withdrawal.id),
         )
 
     return {
@@ -991,7 +1009,7 @@ def complete_withdrawal(id: int, _: bool = Depends(require_admin)):
 @router.get("/analytics/dashboard", response_model=dict)
 def analytics_dashboard(
     current_admin: User = Depends(get_current_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get admin dashboard metrics"""
     from datetime import datetime, timedelta
@@ -1156,7 +1174,7 @@ def analytics_dashboard(
 def analytics_revenue(
     days: int = 30,
     _: bool = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get daily revenue for the last N days"""
     from datetime import datetime, timedelta
@@ -1204,7 +1222,7 @@ def analytics_revenue(
 def analytics_top_merchants(
     limit: int = 10,
     _: bool = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get top merchants by order count"""
     from sqlalchemy.orm import joinedload
@@ -1245,6 +1263,33 @@ def analytics_top_merchants(
     }
 
 
+@router.get("/analytics/offers/{offer_id}", response_model=dict)
+def analytics_offer(
+    offer_id: int,
+    days: int = Query(30, ge=1, le=365),
+    _: bool = Depends(require_admin),
+    db: Session = Depends(get_read_db)
+):
+    """Clicks and approximate unique signed-in clickers of an offer (HyperLogLog, ~0.8% error)"""
+    offer = db.scalar(select(Offer).where(Offer.id == offer_id))
+    if not offer:
+        raise HTTPException(status_code=404, detail="Offer not found")
+
+    end = datetime.utcnow().date()
+    start = end - timedelta(days=days - 1)
+    return {
+        "success": True,
+        "data": {
+            "offer_id": offer.id,
+            "title": offer.title,
+            "clicks": get_offer_click_count(offer.id),
+            "unique_users": offer_unique_viewers(offer.id),
+            "unique_users_period": offer_unique_viewers(offer.id, start, end),
+            "period_days": days
+        }
+    }
+
+
 class CategoryPayload(BaseModel):
     name: str = Field(..., min_length=1)
     slug: str = Field(..., min_length=1)
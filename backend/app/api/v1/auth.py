@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr, Field
 from ...security import create_access_token, get_password_hash, verify_password, revoke_token, decode_token
 from ...redis_client import rk, cache_set, cache_get, cache_invalidate, rate_limit
-from ...queue import push_email_job, push_sms_job
+from ...jobs import PASSWORD_RESET_EMAIL, WELCOME_EMAIL, submit
 from ...otp import request_otp as create_otp, verify_and_consume_otp
 from ...sms import send_otp_sms
 from ...database import get_db
@@ -103,14 +103,15 @@ def register(payload: RegisterRequest, db: Session = Depends(get_db)):
 
     # Queue welcome email
     if settings.EMAIL_ENABLED and user.email:
-        push_email_job(
-            "welcome",
-            user.email,
+        submit(
+            WELCOME_EMAIL,
             {
                 "user_name": user.full_name or user.email.split('@')[0],
                 "referral_code": user.referral_code,
                 "app_url": "https://app.example.com"  # TODO: Get from settings
-            }
+            },
+            to=user.email,
+            key=str(user.id),
         )
 
     return RegisterResponse(
@@ -353,7 +354,6 @@ def send_verification_email(
 ):
     """Send email verification link"""
     from ...verification import generate_verification_token, resend_verification_throttle
-    from ...email import send_welcome_email
     from ...config import get_settings
 
     settings = get_settings()
@@ -373,9 +373,13 @@ def send_verification_email(
     # Create verification link
     verification_url = f"http://localhost:3000/auth/verify-email?token={token}"
 
-    # Send email
+    # Queue email
     if settings.EMAIL_ENABLED:
-        send_welcome_email(email, verification_url)
+        submit(
+            WELCOME_EMAIL,
+            {"user_name": email.split('@')[0], "verification_url": verification_url},
+            to=email,
+        )
     else:
         # Dev mode: log the link
         print(f"[DEV] Verification link for {email}: {verification_url}")
@@ -448,7 +452,7 @@ def password_reset_request(payload: PasswordResetRequest, db: Session = Depends(
     cache_set(rk("pwdreset", token), {"user_id": user.id}, RESET_TTL_SECONDS)
     reset_url = f"{settings.FRONTEND_BASE_URL or 'https://app.example.com'}/reset-password?token={token}"
     if settings.EMAIL_ENABLED:
-        push_email_job("password_reset", user.email, {"user_name": user.full_name or user.email, "reset_url": reset_url})
+        submit(PASSWORD_RESET_EMAIL, {"user_name": user.full_name or user.email, "reset_url": reset_url}, to=user.email)
     return {"success": True, "message": "If the email exists a reset link was sent."}
 
 @router.post("/password-reset/confirm", response_model=dict)
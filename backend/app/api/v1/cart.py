@@ -22,7 +22,7 @@ from ...schemas.cart import (
     PaymentVerificationResponse,
 )
 from ...config import get_settings
-from ...email import send_order_confirmation, send_voucher_email
+from ...jobs import ORDER_CONFIRMATION_EMAIL, submit
 from ...sms import send_order_notification
 from ...queue import get_cart as redis_get_cart, add_item, update_item, remove_item, clear_cart
 from ...queue import get_cart as redis_get_cart, add_item, update_item, remove_item, clear_cart
@@ -434,21 +434,27 @@ def verify_payment(
     db.commit()
     db.refresh(order)
     
-    # Send order confirmation email
-    if current_user.email:
+    # Queue order confirmation email
+    if settings.EMAIL_ENABLED and current_user.email:
         items = db.query(OrderItem).filter(OrderItem.order_id == order.id).all()
-        items_data = [{
-            'product_name': item.product_name,
-            'quantity': item.quantity,
-            'unit_price': float(item.unit_price),
-            'subtotal': float(item.subtotal)
-        } for item in items]
-        
-        send_order_confirmation(
-            current_user.email,
-            order.order_number,
-            float(order.total_amount),
-            items_data
+        submit(
+            ORDER_CONFIRMATION_EMAIL,
+            {
+                "user_name": current_user.full_name or current_user.email.split('@')[0],
+                "order_number": order.order_number,
+                "total_amount": float(order.total_amount),
+                "items_count": len(items),
+                "items": [{
+                    "product_name": item.product_name,
+                    "quantity": item.quantity,
+                    "unit_price": float(item.unit_price),
+                    "subtotal": float(item.subtotal),
+                } for item in items],
+                "payment_id": request.razorpay_payment_id,
+                "order_url": f"{settings.FRONTEND_BASE_URL}/orders/{order.id}",
+            },
+            to=current_user.email,
+            key=str(order.id),
         )
     
     # Send SMS notification
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, status, HTTPException, Depends
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from ...redis_client import acquire_lock, release_lock, enqueue, publish, rk
-from ...queue import push_email_job, push_sms_job
+from ...redis_client import acquire_lock, release_lock, publish, rk
+from ...jobs import ORDER_CONFIRMATION_EMAIL, submit
 from ...database import get_db
 from ...models import Order
 from ...config import get_settings
@@ -96,7 +96,6 @@ def create_order(payload: CreateOrderRequest):
                 },
             },
         }
-        enqueue("queue:checkout", {"event": "order_created", "order_id": order_id, "email": payload.delivery_email})
         publish("events:checkout", {"order_id": order_id, "status": "created"})
         return response
     finally:
@@ -117,9 +116,8 @@ def verify_payment(payload: VerifyPaymentRequest, db: Session = Depends(get_db))
     if settings.EMAIL_ENABLED:
         # In production, fetch order from DB to get user email and order details
         # For now, this is a placeholder structure
-        push_email_job(
-            "order_confirmation",
-            "user@example.com",  # TODO: Get from order.user.email
+        submit(
+            ORDER_CONFIRMATION_EMAIL,
             {
                 "user_name": "Customer",  # TODO: Get from order.user.name
                 "order_number": f"ORD-{payload.order_id}",
@@ -127,7 +125,9 @@ def verify_payment(payload: VerifyPaymentRequest, db: Session = Depends(get_db))
                 "items_count": 0,  # TODO: Get from order items
                 "payment_id": payload.razorpay_payment_id,
                 "order_url": f"https://app.example.com/orders/{payload.order_id}"
-            }
+            },
+            to="user@example.com",  # TODO: Get from order.user.email
+            key=str(payload.order_id),
         )
     
     return {
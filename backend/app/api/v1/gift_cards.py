@@ -4,7 +4,7 @@ from ...database import get_db
 from ...models import GiftCard, User
 from ...schemas import GiftCardRead, GiftCardCreate
 from ...dependencies import require_admin
-from ...queue import push_email_job
+from ...jobs import GIFT_CARD_DELIVERY_EMAIL, submit
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import secrets, csv, io
@@ -102,9 +102,9 @@ def assign_and_deliver(gift_card_id: int, payload: GiftCardAssignRequest, db: Se
     db.commit()
     db.refresh(gc)
     # Enqueue delivery email with real user email
-    push_email_job("gift_card_delivery", to_email=user.email, data={
+    submit(GIFT_CARD_DELIVERY_EMAIL, {
         "code": gc.code,
         "value": float(gc.remaining_value),
         "user_id": user.id,
-    })
+    }, to=user.email, key=str(gc.id))
     return gc
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from ...database import get_db
+from ...database import get_db, db_router
 from ...queue import get_queue_stats
 from ...redis_client import redis_client
 
@@ -19,11 +19,14 @@ async def health_check(db: Session = Depends(get_db)):
     except Exception as e:
         db_status = f"unhealthy: {str(e)}"
     
-    return {
+    response = {
         "status": "healthy" if db_status == "healthy" else "degraded",
         "database": db_status,
         "service": "coupon-commerce-api"
     }
+    if db_router.replicas:
+        response["replicas"] = db_router.status()
+    return response
 
 
 @router.get("/redis")
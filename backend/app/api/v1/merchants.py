@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy import select, func, bindparam
 from ...database import get_db
 from ...models import Merchant, Offer
 from ...redis_client import cache_get, cache_set, cache_invalidate, cache_invalidate_prefix, rk
@@ -11,6 +11,14 @@ import json, hashlib
 
 router = APIRouter(prefix="/merchants", tags=["Merchants"])
 
+# Built once and executed with bound parameters (see offers.py)
+MERCHANT_BY_SLUG_STMT = select(Merchant).where(Merchant.slug == bindparam("slug"), Merchant.is_active == True)
+
+ACTIVE_OFFERS_COUNT_STMT = select(func.count(Offer.id)).where(
+    Offer.merchant_id == bindparam("merchant_id"),
+    Offer.is_active == True
+)
+
 class MerchantFilters(BaseModel):
     page: int = 1
     limit: int = 20
@@ -53,10 +61,7 @@ def list_merchants(
     
     merchants_data = []
     for m in merchants:
-        offers_count = db.scalar(select(func.count(Offer.id)).where(
-            Offer.merchant_id == m.id,
-            Offer.is_active == True
-        ))
+        offers_count = db.scalar(ACTIVE_OFFERS_COUNT_STMT, {"merchant_id": m.id})
         merchants_data.append({
             "id": m.id,
             "name": m.name,
@@ -151,14 +156,11 @@ def get_merchant(slug: str, db: Session = Depends(get_db)):
     if cached:
         return {"success": True, "data": cached, "cache": True}
     
-    merchant = db.scalar(select(Merchant).where(Merchant.slug == slug, Merchant.is_active == True))
+    merchant = db.scalar(MERCHANT_BY_SLUG_STMT, {"slug": slug})
     if not merchant:
         return {"success": False, "error": "Merchant not found"}
     
-    offers_count = db.scalar(select(func.count(Offer.id)).where(
-        Offer.merchant_id == merchant.id,
-        Offer.is_active == True
-    ))
+    offers_count = db.scalar(ACTIVE_OFFERS_COUNT_STMT, {"merchant_id": merchant.id})
     
     data = {
         "id": merchant.id,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import select, func, desc
 from pydantic import BaseModel, EmailStr
@@ -8,9 +8,10 @@ import uuid
 
 from ...database import get_db
 from ...models import User
-from ...models.newsletter import NewsletterSubscriber, NewsletterCampaign, NewsletterDelivery
-from ...security import get_current_user
-from ...queue import push_email_job
+from ...models.newsletter import NewsletterSubscriber, NewsletterCampaign
+from ...dependencies import get_current_user
+from ...jobs import NEWSLETTER_WELCOME_EMAIL, submit
+from ...newsletter import schedule_campaign, start_campaign
 
 router = APIRouter(prefix="/newsletter", tags=["Newsletter"])
 
@@ -90,12 +91,13 @@ def subscribe_to_newsletter(
     db.commit()
 
     # Send welcome email
-    push_email_job(
-        "newsletter_welcome",
-        payload.email,
+    submit(
+        NEWSLETTER_WELCOME_EMAIL,
         {
             "name": payload.name or "there"
-        }
+        },
+        to=payload.email,
+        key=payload.email,
     )
 
     return {
@@ -186,6 +188,9 @@ def create_campaign(
     db.commit()
     db.refresh(campaign)
 
+    if campaign.send_at:
+        schedule_campaign(campaign.id, campaign.send_at)
+
     return {
         "success": True,
         "message": "Campaign created successfully",
@@ -250,9 +255,8 @@ def list_campaigns(
 
 
 @router.post("/admin/campaigns/{id}/send", response_model=dict)
-async def send_campaign(
+def send_campaign(
     id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Send a campaign immediately (Admin only)"""
@@ -264,61 +268,25 @@ async def send_campaign(
     if campaign.status not in ["draft", "scheduled"]:
         raise HTTPException(status_code=400, detail="Campaign already sent or sending")
 
-    # Get active subscribers
-    subscribers = db.scalars(
-        select(NewsletterSubscriber).where(NewsletterSubscriber.status == "active")
-    ).all()
+    # Count active subscribers; the fan-out worker streams them
+    total_recipients = db.scalar(
+        select(func.count()).select_from(NewsletterSubscriber).where(NewsletterSubscriber.status == "active")
+    ) or 0
 
-    if not subscribers:
+    if not total_recipients:
         raise HTTPException(status_code=400, detail="No active subscribers")
 
-    # Update campaign status
+    # Update campaign status; clearing send_at disarms any scheduled fan-out
     campaign.status = "sending"
-    campaign.total_recipients = len(subscribers)
+    campaign.total_recipients = total_recipients
+    campaign.send_at = None
     db.commit()
 
-    # Queue emails in background
-    async def send_to_subscribers():
-        for subscriber in subscribers:
-            try:
-                # Track delivery
-                delivery = NewsletterDelivery(
-                    campaign_id=campaign.id,
-                    subscriber_id=subscriber.id,
-                    status="sent",
-                    sent_at=datetime.utcnow()
-                )
-                db.add(delivery)
-
-                # Queue email
-                push_email_job(
-                    "newsletter_campaign",
-                    subscriber.email,
-                    {
-                        "subject": campaign.subject,
-                        "preview_text": campaign.preview_text,
-                        "html_content": campaign.html_content,
-                        "campaign_id": campaign.id,
-                        "subscriber_id": subscriber.id
-                    }
-                )
-
-                campaign.sent_count += 1
-
-            except Exception as e:
-                print(f"Failed to send to {subscriber.email}: {e}")
-                campaign.bounced_count += 1
-
-        # Update campaign status
-        campaign.status = "sent"
-        campaign.sent_at = datetime.utcnow()
-        db.commit()
-
-    background_tasks.add_task(send_to_subscribers)
+    start_campaign(campaign.id)
 
     return {
         "success": True,
-        "message": f"Campaign queued for delivery to {len(subscribers)} subscribers"
+        "message": f"Campaign queued for delivery to {total_recipients} subscribers"
     }
 
 
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ...database import get_db
 from ...models import OfferView
-from ...schemas import OfferViewRead, OfferViewCreate
+from ...schemas import OfferViewRead, OfferViewCreate, OfferViewAccepted
 from ...dependencies import require_internal_service
+from ...ingest import IngestBackpressure, record_event
 
 router = APIRouter(prefix="/offer-views", tags=["OfferViews"])
 
@@ -11,10 +12,11 @@ router = APIRouter(prefix="/offer-views", tags=["OfferViews"])
 def list_offer_views(db: Session = Depends(get_db), _: bool = Depends(require_internal_service)):
     return db.query(OfferView).all()
 
-@router.post("/", response_model=OfferViewRead)
+@router.post("/", response_model=OfferViewAccepted, status_code=202)
 def create_view(payload: OfferViewCreate, db: Session = Depends(get_db), _: bool = Depends(require_internal_service)):
-    ov = OfferView(**payload.dict())
-    db.add(ov)
-    db.commit()
-    db.refresh(ov)
-    return ov
+    # Buffered: the row is written by workers.event_flusher
+    try:
+        event, buffered = record_event(db, "view", payload.offer_id, payload.user_id)
+    except IngestBackpressure:
+        raise HTTPException(status_code=503, detail="Event backlog full", headers={"Retry-After": "1"})
+    return {"event_id": event["id"], "buffered": buffered}
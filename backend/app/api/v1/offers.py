@@ -1,15 +1,59 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy import select, func, bindparam
 from ...database import get_db
 from ...models import Offer, Merchant
 from pydantic import BaseModel
-from ...redis_client import cache_get, cache_set, cache_invalidate_prefix, rk
-from ...dependencies import rate_limit_dependency
+from ...redis_client import cache_get, cache_set, cache_invalidate_prefix, rk, track_offer_click
+from ...dependencies import client_ip, get_optional_user_id, rate_limit_dependency
+from ...ingest import IngestBackpressure, click_visitor, filter_click, record_event, remember_click
+from functools import lru_cache
 import json, hashlib
 
 router = APIRouter(prefix="/offers", tags=["Offers"])
 
+LIST_SORTS = {"newest", "popular", "expiring_soon"}
+
+
+# Hot statements are built once and executed with bound parameters, so each
+# request skips select() construction and reuses SQLAlchemy's compiled SQL.
+@lru_cache(maxsize=None)
+def _list_offers_stmts(sort_by: str | None, by_merchant: bool, exclusive_only: bool, with_search: bool):
+    query = select(Offer, Merchant).join(Merchant).where(Offer.is_active == True)
+    count_query = select(func.count()).select_from(Offer).where(Offer.is_active == True)
+
+    if by_merchant:
+        query = query.where(Offer.merchant_id == bindparam("merchant_id"))
+        count_query = count_query.where(Offer.merchant_id == bindparam("merchant_id"))
+    if exclusive_only:
+        query = query.where(Offer.is_exclusive == True)
+    if with_search:
+        query = query.where(Offer.title.ilike(bindparam("search")))
+        count_query = count_query.where(Offer.title.ilike(bindparam("search")))
+
+    if sort_by == "newest":
+        query = query.order_by(Offer.created_at.desc())
+    elif sort_by == "popular":
+        query = query.order_by(Offer.priority.desc())
+    elif sort_by == "expiring_soon":
+        query = query.where(Offer.end_date.isnot(None)).order_by(Offer.end_date.asc())
+    else:
+        query = query.order_by(Offer.priority.desc(), Offer.created_at.desc())
+
+    return query.offset(bindparam("offset")).limit(bindparam("limit")), count_query
+
+
+FEATURED_OFFERS_STMT = (
+    select(Offer, Merchant)
+    .join(Merchant)
+    .where(Offer.is_active == True)
+    .order_by(Offer.priority.desc(), Offer.created_at.desc())
+    .limit(bindparam("limit"))
+)
+
+GET_OFFER_STMT = select(Offer, Merchant).join(Merchant).where(Offer.id == bindparam("offer_id"))
+CLICK_OFFER_STMT = select(Offer.id, Offer.code).where(Offer.id == bindparam("offer_id"), Offer.is_active == True)
+
 class OfferFilters(BaseModel):
     page: int = 1
     limit: int = 20
@@ -47,37 +91,20 @@ def list_offers(
     if cached:
         return cached
 
-    query = select(Offer, Merchant).join(Merchant).where(Offer.is_active == True)
-    
-    if merchant_id:
-        query = query.where(Offer.merchant_id == merchant_id)
-    if is_exclusive:
-        query = query.where(Offer.is_exclusive == True)
-    if search:
-        query = query.where(Offer.title.ilike(f"%{search}%"))
-    
-    # Apply sorting
-    if sort_by == "newest":
-        query = query.order_by(Offer.created_at.desc())
-    elif sort_by == "popular":
-        query = query.order_by(Offer.priority.desc())
-    elif sort_by == "expiring_soon":
-        query = query.where(Offer.end_date.isnot(None)).order_by(Offer.end_date.asc())
-    else:
-        query = query.order_by(Offer.priority.desc(), Offer.created_at.desc())
-    
+    query, count_query = _list_offers_stmts(
+        sort_by if sort_by in LIST_SORTS else None,
+        bool(merchant_id),
+        bool(is_exclusive),
+        bool(search),
+    )
+    params = {"merchant_id": merchant_id, "search": f"%{search}%" if search else None}
+
     # Count total
-    count_query = select(func.count()).select_from(Offer).where(Offer.is_active == True)
-    if merchant_id:
-        count_query = count_query.where(Offer.merchant_id == merchant_id)
-    if search:
-        count_query = count_query.where(Offer.title.ilike(f"%{search}%"))
-    
-    total = db.scalar(count_query)
-    
+    total = db.scalar(count_query, params)
+
     # Paginate
     offset = (page - 1) * limit
-    results = db.execute(query.offset(offset).limit(limit)).all()
+    results = db.execute(query, {**params, "offset": offset, "limit": limit}).all()
     
     # Format response
     offers = []
@@ -119,14 +146,7 @@ def list_offers(
 @router.get("/featured")
 def featured_offers(limit: int = 12, db: Session = Depends(get_db)):
     """Return a list of 'featured' offers (highest priority first)."""
-    query = (
-        select(Offer, Merchant)
-        .join(Merchant)
-        .where(Offer.is_active == True)
-        .order_by(Offer.priority.desc(), Offer.created_at.desc())
-        .limit(limit)
-    )
-    results = db.execute(query).all()
+    results = db.execute(FEATURED_OFFERS_STMT, {"limit": limit}).all()
     data = [
         {
             "id": o.id,
@@ -173,11 +193,7 @@ def exclusive_offers(limit: int = 12, db: Session = Depends(get_db)):
 @router.get("/{offer_id}")
 def get_offer(offer_id: int, db: Session = Depends(get_db)):
     """Get single offer by ID"""
-    result = db.execute(
-        select(Offer, Merchant)
-        .join(Merchant)
-        .where(Offer.id == offer_id)
-    ).first()
+    result = db.execute(GET_OFFER_STMT, {"offer_id": offer_id}).first()
     
     if not result:
         return {"success": False, "error": "Offer not found"}
@@ -205,3 +221,32 @@ def get_offer(offer_id: int, db: Session = Depends(get_db)):
             }
         }
     }
+
+
+@router.post("/{offer_id}/click", status_code=202)
+def click_offer(
+    offer_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user_id: int | None = Depends(get_optional_user_id),
+    _rl: dict = Depends(rate_limit_dependency("offer_click", 60, 60)),
+):
+    """Record a click; the offer_clicks row is written by workers.event_flusher"""
+    offer = db.execute(CLICK_OFFER_STMT, {"offer_id": offer_id}).first()
+    if not offer:
+        return {"success": False, "error": "Offer not found"}
+
+    # Bots and rapid repeat clicks still get the code but are not counted
+    user_agent = request.headers.get("user-agent")
+    visitor = click_visitor(user_id, client_ip(request), user_agent)
+    if filter_click(offer.id, visitor, user_agent):
+        return {"success": True, "data": {"click_id": None, "code": offer.code}}
+
+    try:
+        event, _ = record_event(db, "click", offer.id, user_id)
+    except IngestBackpressure:
+        raise HTTPException(status_code=503, detail="Event backlog full", headers={"Retry-After": "1"})
+    remember_click(offer.id, visitor)
+    track_offer_click(offer.id, user_id)
+
+    return {"success": True, "data": {"click_id": event["id"], "code": offer.code}}
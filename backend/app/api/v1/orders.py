@@ -14,9 +14,12 @@ from ...schemas.order import (
     VoucherDelivery,
 )
 from ...sms import send_voucher_sms
-from ...email import send_voucher_email
+from ...config import get_settings
+from ...jobs import VOUCHER_CODES_EMAIL, submit
 from ...events import publish_order_event
 
+settings = get_settings()
+
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
 
@@ -186,8 +189,8 @@ def fulfill_order(
                     item.product_name
                 )
     
-    # Send email with voucher codes
-    if user and user.email and fulfilled_items:
+    # Queue email with voucher codes
+    if settings.EMAIL_ENABLED and user and user.email and fulfilled_items:
         vouchers_data = [{
             'product_name': item.product_name,
             'code': item.voucher_code,
@@ -196,10 +199,11 @@ def fulfill_order(
         } for item in fulfilled_items if item.voucher_code]
         
         if vouchers_data:
-            send_voucher_email(
-                user.email,
-                order.order_number,
-                vouchers_data
+            submit(
+                VOUCHER_CODES_EMAIL,
+                {"order_number": order.order_number, "vouchers": vouchers_data},
+                to=user.email,
+                key=str(order.id),
             )
     
     return {
@@ -1,36 +1,66 @@
 """Queue management API endpoints."""
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query
 from ...queue import (
+    QUEUE_NAMES,
     get_queue_stats,
+    get_consumer_groups,
     get_dead_letter_jobs,
     retry_dead_letter_job,
+    replay_dead_letter_jobs,
     clear_dead_letter_queue,
 )
 
 router = APIRouter(prefix="/queue", tags=["System"])
 
+
+def _check_queue(queue_name: str) -> None:
+    if queue_name not in QUEUE_NAMES:
+        raise HTTPException(status_code=400, detail="Unsupported queue")
+
 @router.get("/stats")
 async def queue_stats():
     return get_queue_stats()
 
+@router.get("/groups/{queue_name}")
+async def consumer_groups(queue_name: str):
+    _check_queue(queue_name)
+    return {"queue": queue_name, "lanes": get_consumer_groups(queue_name)}
+
 @router.get("/dead-letter/{queue_name}")
-async def dead_letter_list(queue_name: str):
-    if queue_name not in {"email", "sms"}:
-        raise HTTPException(status_code=400, detail="Unsupported queue")
-    return {"queue": queue_name, "jobs": get_dead_letter_jobs(queue_name)}
+async def dead_letter_list(
+    queue_name: str,
+    limit: int = Query(50, ge=1, le=500),
+    before: str | None = Query(None, description="dlq_id of the last job of the previous page"),
+):
+    _check_queue(queue_name)
+    jobs = get_dead_letter_jobs(queue_name, count=limit, before=before)
+    next_cursor = jobs[-1]["dlq_id"] if len(jobs) == limit else None
+    return {"queue": queue_name, "jobs": jobs, "next": next_cursor}
 
-@router.post("/dead-letter/{queue_name}/{index}/retry")
-async def dead_letter_retry(queue_name: str, index: int):
-    if queue_name not in {"email", "sms"}:
-        raise HTTPException(status_code=400, detail="Unsupported queue")
-    success = retry_dead_letter_job(queue_name, index)
+@router.post("/dead-letter/{queue_name}/replay")
+async def dead_letter_replay(
+    queue_name: str,
+    error_type: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(1000, ge=1, le=100000),
+):
+    _check_queue(queue_name)
+    count = replay_dead_letter_jobs(queue_name, error_type=error_type, since=since, until=until, limit=limit)
+    return {"status": "requeued", "queue": queue_name, "count": count}
+
+@router.post("/dead-letter/{queue_name}/{dlq_id}/retry")
+async def dead_letter_retry(queue_name: str, dlq_id: str):
+    _check_queue(queue_name)
+    success = retry_dead_letter_job(queue_name, dlq_id)
     if not success:
-        raise HTTPException(status_code=404, detail="Job index not found")
-    return {"status": "requeued", "queue": queue_name, "index": index}
+        raise HTTPException(status_code=404, detail="Dead-letter job not found")
+    return {"status": "requeued", "queue": queue_name, "dlq_id": dlq_id}
 
 @router.delete("/dead-letter/{queue_name}")
 async def dead_letter_clear(queue_name: str):
-    if queue_name not in {"email", "sms"}:
-        raise HTTPException(status_code=400, detail="Unsupported queue")
+    _check_queue(queue_name)
     count = clear_dead_letter_queue(queue_name)
     return {"status": "cleared", "queue": queue_name, "count": count}
@@ -44,7 +44,7 @@ async def queue_stats_ws(ws: WebSocket):
         try:
             first_stats = get_queue_stats()
         except Exception:
-            first_stats = {"email": {"pending": 0, "processing": 0, "dlq": 0}, "sms": {"pending": 0, "processing": 0, "dlq": 0}}
+            first_stats = {"email": {"pending": 0, "processing": 0, "dead_letter": 0}, "sms": {"pending": 0, "processing": 0, "dead_letter": 0}}
         await ws.send_json({"type": "queue_stats", "data": first_stats})
         # Continue periodic updates
         while True:
@@ -52,7 +52,7 @@ async def queue_stats_ws(ws: WebSocket):
             try:
                 stats = get_queue_stats()
             except Exception:
-                stats = {"email": {"pending": 0, "processing": 0, "dlq": 0}, "sms": {"pending": 0, "processing": 0, "dlq": 0}}
+                stats = {"email": {"pending": 0, "processing": 0, "dead_letter": 0}, "sms": {"pending": 0, "processing": 0, "dead_letter": 0}}
             await ws.send_json({"type": "queue_stats", "data": stats})
     except WebSocketDisconnect:
         pass
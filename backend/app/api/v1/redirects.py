@@ -4,6 +4,7 @@ from ...database import get_db
 from ...models import SEORedirect
 from ...schemas import SEORedirectRead, SEORedirectCreate
 from ...dependencies import require_admin
+from ...redirects import notify_redirects_changed, redirect_engine
 
 router = APIRouter(prefix="/redirects", tags=["Redirects"])
 
@@ -17,4 +18,7 @@ def create_redirect(payload: SEORedirectCreate, db: Session = Depends(get_db), _
     db.add(r)
     db.commit()
     db.refresh(r)
+    # Apply locally right away; other processes reload on the pub/sub notice
+    redirect_engine.load(db)
+    notify_redirects_changed()
     return r
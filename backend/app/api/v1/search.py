@@ -5,7 +5,7 @@ from sqlalchemy import select, func, or_, and_, desc, text
 from typing import Optional, List
 from datetime import datetime, timedelta
 
-from ...database import get_db
+from ...database import get_read_db
 from ...models import Merchant, Offer, Product, OfferClick, OfferView
 from ...redis_client import redis_client, rk, cache_get, cache_set
 from pydantic import BaseModel
@@ -36,7 +36,7 @@ def search_all(
     type: Optional[str] = Query(None, description="Filter by type: merchant, offer, product"),
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: dict = Depends(rate_limit_dependency("search", limit=60, window_seconds=60))
 ):
     """
@@ -189,7 +189,7 @@ def search_all(
 def autocomplete(
     q: str = Query(..., min_length=2, description="Search query"),
     limit: int = Query(10, ge=1, le=20),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Autocomplete suggestions for search.
@@ -260,7 +260,7 @@ def autocomplete(
 def get_trending_offers(
     limit: int = Query(10, ge=1, le=50),
     days: int = Query(7, ge=1, le=30),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get trending offers based on click-through rate and recent activity.
@@ -348,7 +348,7 @@ def get_trending_offers(
 def get_expiring_offers(
     limit: int = Query(20, ge=1, le=50),
     days: int = Query(7, ge=1, le=30),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get offers expiring in the next N days.
@@ -424,7 +424,7 @@ def get_expiring_offers(
 def get_personalized_recommendations(
     user_id: Optional[int] = Query(None, description="User ID for personalization"),
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Get personalized offer recommendations.
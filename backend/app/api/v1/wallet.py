@@ -17,7 +17,7 @@ from ...schemas.wallet_transaction import (
     CashbackConversionRequest
 )
 from ...dependencies import get_current_user
-from ...queue import push_email_job, push_sms_job
+from ...jobs import CASHBACK_CONFIRMED_EMAIL, WITHDRAWAL_REQUESTED_EMAIL, WITHDRAWAL_REQUESTED_SMS, submit
 from ...config import get_settings
 from ...redis_client import redis_client
 
@@ -190,14 +190,15 @@ def convert_cashback_to_wallet(
         
         # Queue cashback notification
         if settings.EMAIL_ENABLED:
-            push_email_job(
-                "cashback_confirmed",
-                current_user.email,
+            submit(
+                CASHBACK_CONFIRMED_EMAIL,
                 {
                     "user_name": current_user.name or current_user.email.split('@')[0],
                     "amount": amount_to_convert,
                     "new_balance": new_balance
-                }
+                },
+                to=current_user.email,
+                key=str(transaction.id),
             )
         
         return {
@@ -308,27 +309,29 @@ def request_withdrawal(
         
         # Queue email notification
         if settings.EMAIL_ENABLED:
-            push_email_job(
-                "withdrawal_requested",
-                current_user.email,
+            submit(
+                WITHDRAWAL_REQUESTED_EMAIL,
                 {
                     "user_name": current_user.name or current_user.email.split('@')[0],
                     "amount": request.amount,
                     "method": request.method,
                     "withdrawal_id": withdrawal.id,
                     "status": "pending"
-                }
+                },
+                to=current_user.email,
+                key=str(withdrawal.id),
             )
         
         # Queue SMS notification
         if settings.SMS_ENABLED and current_user.mobile:
-            push_sms_job(
-                "withdrawal_requested",
-                current_user.mobile,
+            submit(
+                WITHDRAWAL_REQUESTED_SMS,
                 {
                     "amount": request.amount,
                     "method": request.method
-                }
+                },
+                to=current_user.mobile,
+                key=str(withdrawal.id),
             )
         
         return {
@@ -0,0 +1,86 @@
+"""Rotating time-windowed Bloom filter over plain Redis bitmaps.
+
+Works on stock Redis (no RedisBloom module). Time is cut into windows of
+``window_seconds``; an item is added to the current window's bitmap and
+counts as seen if it is in the current or previous window, so the dedupe
+horizon is between one and two windows. Expired windows simply TTL out.
+
+Sizing follows the usual formulas for ``capacity`` items per window at
+``fp_rate``: m = -n ln p / (ln 2)^2 bits and k = m / n ln 2 hashes. When m
+exceeds ``max_bytes`` the bitmap is capped and the false-positive rate
+rises accordingly (see ``effective_fp_rate``).
+"""
+import hashlib
+import math
+import time
+
+from .redis_client import redis_client, rk
+
+# Seen if every bit is set in the current window (KEYS[1]) or the previous one (KEYS[2])
+CONTAINS_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    local seen = 1
+    for i = 1, #ARGV do
+        if redis.call('GETBIT', key, ARGV[i]) == 0 then seen = 0 break end
+    end
+    if seen == 1 then return 1 end
+end
+return 0
+"""
+
+# Set the item's bits in the current window and keep it for two windows
+ADD_SCRIPT = """
+for i = 2, #ARGV do
+    redis.call('SETBIT', KEYS[1], ARGV[i], 1)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class WindowedBloomFilter:
+    def __init__(self, name: str, window_seconds: int, capacity: int, fp_rate: float, max_bytes: int):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.capacity = capacity
+        bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        self.bits = max(8, min(bits, max_bytes * 8))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._contains = None
+        self._add = None
+
+    @property
+    def effective_fp_rate(self) -> float:
+        """Expected false-positive rate at full capacity with the actual bitmap size."""
+        return (1 - math.exp(-self.hashes * self.capacity / self.bits)) ** self.hashes
+
+    def positions(self, item: str) -> list[int]:
+        # Kirsch-Mitzenmacher double hashing from one 128-bit digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _key(self, window: int) -> str:
+        return rk("bloom", self.name, str(window))
+
+    def _window(self, now: float | None) -> int:
+        return int((time.time() if now is None else now) // self.window_seconds)
+
+    def contains(self, item: str, now: float | None = None) -> bool:
+        """Return True if ``item`` was (probably) added in this or the last window."""
+        if self._contains is None:
+            self._contains = redis_client.register_script(CONTAINS_SCRIPT)
+        window = self._window(now)
+        return bool(self._contains(
+            keys=[self._key(window), self._key(window - 1)],
+            args=self.positions(item),
+        ))
+
+    def add(self, item: str, now: float | None = None) -> None:
+        if self._add is None:
+            self._add = redis_client.register_script(ADD_SCRIPT)
+        self._add(
+            keys=[self._key(self._window(now))],
+            args=[self.window_seconds * 2, *self.positions(item)],
+        )
@@ -1,26 +1,223 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import itertools
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.sql.dml import UpdateBase
 from .config import get_settings
+from .metrics import observe_db_pool_wait, set_db_pool_usage
 
 settings = get_settings()
 
-# Use psycopg (version 3) instead of psycopg2
-# The DATABASE_URL should use postgresql+psycopg:// instead of postgresql://
-database_url = settings.DATABASE_URL
-if database_url.startswith("postgresql://"):
-    database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
 
-# Configure engine based on database type
-if database_url.startswith("sqlite"):
+def _normalize_url(url: str) -> str:
+    # Use psycopg (version 3) instead of psycopg2
+    # The DATABASE_URL should use postgresql+psycopg:// instead of postgresql://
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkout wait time and usage to Prometheus."""
+
+    metrics_label = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe_db_pool_wait(self.metrics_label, time.perf_counter() - start)
+            self._report_usage()
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._report_usage()
+
+    def _report_usage(self) -> None:
+        set_db_pool_usage(self.metrics_label, self.checkedout(), self.overflow(), self.size())
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics_label = self.metrics_label
+        return pool
+
+
+def _build_engine(url: str, label: str = "primary", connect_timeout: int = 0) -> Engine:
+    # Configure engine based on database type
+    if url.startswith("sqlite"):
+        return create_engine(
+            url,
+            echo=settings.DATABASE_ECHO,
+            connect_args={"check_same_thread": False}
+        )
+    connect_args = {}
+    if settings.DATABASE_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={settings.DATABASE_STATEMENT_TIMEOUT_MS}"
+    if connect_timeout > 0:
+        connect_args["connect_timeout"] = connect_timeout
+    if url.startswith("postgresql+psycopg:"):
+        # Server-side prepared statements for repeated queries (psycopg3 only)
+        threshold = settings.DATABASE_PREPARE_THRESHOLD
+        connect_args["prepare_threshold"] = threshold if threshold >= 0 else None
     engine = create_engine(
-        database_url, 
-        echo=settings.DEBUG, 
-        connect_args={"check_same_thread": False}
+        url,
+        echo=settings.DATABASE_ECHO,
+        pool_pre_ping=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        connect_args=connect_args,
     )
-else:
-    engine = create_engine(database_url, echo=settings.DEBUG, pool_pre_ping=True)
+    engine.pool.metrics_label = label
+    return engine
+
+
+database_url = _normalize_url(settings.DATABASE_URL)
+engine = _build_engine(database_url)
+
+# Seconds a streaming replica is behind the primary. An idle primary stops
+# advancing the replay timestamp, so a fully replayed WAL counts as zero lag.
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+
+
+class Replica:
+    """A read replica engine plus its last observed health and lag."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.healthy = False  # Reads go to the primary until the first probe passes
+        self.lag_seconds = 0.0
+        self.checked_at = 0.0
+        self.probing = threading.Lock()
+
+
+class ReplicaRouter:
+    """Round-robin over healthy, caught-up replicas; falls back to the primary.
+
+    Health and lag probes run in a background thread once a replica's check
+    interval has passed; requests keep using its last observed state meanwhile.
+    """
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+    def __init__(self, primary: Engine, replicas: list[Engine], max_lag_seconds: float, check_interval: float):
+        self.primary = primary
+        self.replicas = [Replica(e) for e in replicas]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._cycle = itertools.count()
+
+    def _probe(self, replica: Replica) -> None:
+        try:
+            with replica.engine.connect() as conn:
+                if replica.engine.dialect.name == "postgresql":
+                    lag = conn.scalar(REPLICA_LAG_SQL)
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag = 0
+            replica.lag_seconds = float(lag or 0)
+            replica.healthy = replica.lag_seconds <= self.max_lag_seconds
+        except Exception:
+            replica.healthy = False
+        replica.checked_at = time.monotonic()
+
+    def _probe_in_background(self, replica: Replica) -> None:
+        try:
+            self._probe(replica)
+        finally:
+            replica.probing.release()
+
+    def _refresh(self, replica: Replica) -> None:
+        if time.monotonic() - replica.checked_at < self.check_interval:
+            return
+        # At most one probe per replica; a probe already running is left alone
+        if replica.probing.acquire(blocking=False):
+            threading.Thread(
+                target=self._probe_in_background, args=(replica,), name="replica-probe", daemon=True
+            ).start()
+
+    def get_read_engine(self) -> Engine:
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._cycle) % len(self.replicas)]
+            self._refresh(replica)
+            if replica.healthy:
+                return replica.engine
+        return self.primary
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "url": r.engine.url.render_as_string(hide_password=True),
+                "healthy": r.healthy,
+                "lag_seconds": round(r.lag_seconds, 3),
+            }
+            for r in self.replicas
+        ]
+
+
+class RoutingSession(Session):
+    """Session that sends reads to replicas when allowed and everything else to the primary.
+
+    Reads go to a replica when the session was opened read-only
+    (``info["read_only"]``) or the statement is marked with
+    ``.execution_options(use_replica=True)``. Once the session flushes or
+    executes DML it sticks to the primary so the caller reads its own writes.
+    The replica picked for the first read is kept for the rest of the session
+    so its reads see one consistent snapshot of replication.
+    """
+
+    def __init__(self, router: ReplicaRouter | None = None, **kw):
+        super().__init__(**kw)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.bind is not None or self.router is None:
+            return super().get_bind(mapper, clause=clause, **kw)
+        if not self.router.replicas:
+            return self.router.primary
+        if self._flushing or isinstance(clause, UpdateBase) or clause is None:
+            self.info["used_primary"] = True
+            return self.router.primary
+        if self.info.get("used_primary"):
+            return self.router.primary
+        wants_replica = self.info.get("read_only") or clause.get_execution_options().get("use_replica")
+        if wants_replica:
+            if "read_engine" not in self.info:
+                self.info["read_engine"] = self.router.get_read_engine()
+            return self.info["read_engine"]
+        return self.router.primary
+
+
+replica_urls = [u.strip() for u in settings.DATABASE_REPLICA_URLS.split(",") if u.strip()]
+db_router = ReplicaRouter(
+    engine,
+    [
+        _build_engine(_normalize_url(u), f"replica{i}", connect_timeout=settings.REPLICA_CONNECT_TIMEOUT)
+        for i, u in enumerate(replica_urls)
+    ],
+    max_lag_seconds=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL,
+)
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    router=db_router,
+    autoflush=False,
+    autocommit=False,
+    expire_on_commit=False,
+)
 
 class Base(DeclarativeBase):
     pass
@@ -30,4 +227,13 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    """Session for read-only endpoints (analytics, search); queries may hit a replica."""
+    db = SessionLocal(info={"read_only": True})
+    try:
+        yield db
+    finally:
+        db.close()
@@ -40,6 +40,27 @@ def get_current_user(db: Session = Depends(get_db), authorization: str | None =
 
     return user
 
+def get_optional_user_id(authorization: str | None = Header(None)) -> int | None:
+    """User id from a valid Bearer token, or None for anonymous requests. No DB lookup."""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization.replace("Bearer ", ""), settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        return int(payload.get("sub"))
+    except (JWTError, ValueError, TypeError):
+        return None
+
+def client_ip(request: Request) -> str | None:
+    """Client address as seen by the edge proxy (nginx sets X-Real-IP), else the socket peer."""
+    real_ip = request.headers.get("x-real-ip")
+    if real_ip:
+        return real_ip.strip()
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded:
+        # The last hop is the one appended by our proxy; earlier ones are client-supplied
+        return forwarded.split(",")[-1].strip()
+    return request.client.host if request.client else None
+
 def get_current_admin_user(current_user: User = Depends(get_current_user)):
     """Verify user has admin role"""
     if current_user.role != "admin" and not current_user.is_admin:
@@ -0,0 +1,283 @@
+"""Buffered click/view ingestion.
+
+API handlers append events to a Redis Stream and return immediately;
+workers.event_flusher drains the stream through a consumer group and writes
+batches to offer_clicks / offer_views with multi-row INSERTs.
+
+Delivery is at-least-once: entries are acked only after the batch commits,
+and entries left pending by a dead flusher are reclaimed with XAUTOCLAIM.
+Every event carries an ``event_id`` that is unique together with
+``created_at``, so a redelivered batch is absorbed by ON CONFLICT DO NOTHING.
+An event that is malformed or that the database rejects (e.g. its offer has
+since been deleted) is isolated by write_valid_events() and dropped so it
+cannot wedge its batch.
+Once the stream holds INGEST_MAX_BACKLOG entries new events are refused
+(IngestBackpressure -> 503) instead of growing Redis without bound.
+
+Clicks pass through filter_click() first: obvious bots and repeat clicks
+by the same visitor on the same offer (windowed Bloom filter) are dropped
+before they reach counters or the stream. A click enters the filter via
+remember_click() only after it has been recorded.
+"""
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from .bloom import WindowedBloomFilter
+from .config import get_settings
+from .metrics import increment_clicks_dropped, increment_events_ingested, increment_events_rejected
+from .models import OfferClick, OfferView
+from .redis_client import redis_client, rk
+
+settings = get_settings()
+
+EVENT_STREAM = rk("stream", "events")
+FLUSH_GROUP = "flushers"
+EVENT_MODELS = {"click": OfferClick, "view": OfferView}
+
+# Rows per INSERT statement; keeps bind parameters well below the Postgres 65535 limit
+INSERT_CHUNK = 10000
+
+# XADD only while the backlog is below the cap, in a single round trip
+APPEND_SCRIPT = """
+if redis.call('XLEN', KEYS[1]) >= tonumber(ARGV[1]) then
+    return false
+end
+return redis.call('XADD', KEYS[1], '*', 'e', ARGV[2])
+"""
+_append_script = None
+
+
+# Substrings of User-Agent headers sent by crawlers, monitors and HTTP libraries
+BOT_USER_AGENT_MARKERS = (
+    "bot", "crawl", "spider", "slurp", "headless", "lighthouse", "pingdom",
+    "curl/", "wget/", "python-requests", "python-httpx", "go-http-client", "java/", "okhttp",
+)
+
+click_dedupe = WindowedBloomFilter(
+    "clicks",
+    window_seconds=settings.CLICK_DEDUPE_WINDOW_SECONDS,
+    capacity=settings.CLICK_DEDUPE_CAPACITY,
+    fp_rate=settings.CLICK_DEDUPE_FP_RATE,
+    max_bytes=settings.CLICK_DEDUPE_MAX_BYTES,
+)
+
+
+class IngestBackpressure(Exception):
+    """Raised when the ingest backlog is full; callers should retry later."""
+
+
+def new_event(kind: str, offer_id: int, user_id: int | None = None) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "offer_id": offer_id,
+        "user_id": user_id,
+        "ts": datetime.utcnow().isoformat(),
+    }
+
+
+def _append(event: dict):
+    global _append_script
+    if _append_script is None:
+        _append_script = redis_client.register_script(APPEND_SCRIPT)
+    return _append_script(keys=[EVENT_STREAM], args=[settings.INGEST_MAX_BACKLOG, json.dumps(event)])
+
+
+def is_bot(user_agent: str | None) -> bool:
+    if not user_agent:
+        return True
+    ua = user_agent.lower()
+    return any(marker in ua for marker in BOT_USER_AGENT_MARKERS)
+
+
+def click_visitor(user_id: int | None, ip: str | None, user_agent: str | None) -> str:
+    """Dedupe identity of a clicker: the signed-in user, else client IP plus User-Agent.
+
+    The User-Agent keeps visitors behind one NAT or carrier IP apart.
+    """
+    if user_id is not None:
+        return f"u:{user_id}"
+    return f"ip:{ip or 'unknown'}|{user_agent or ''}"
+
+
+def filter_click(offer_id: int, visitor: str, user_agent: str | None) -> str | None:
+    """Return why a click should be dropped ("bot" / "duplicate"), or None to keep it.
+
+    ``visitor`` comes from click_visitor(). Only checks the dedupe filter; call
+    remember_click() once the click has been recorded, so a click refused
+    with 503 is not a duplicate when retried. Fails open when Redis is
+    unavailable.
+    """
+    reason = None
+    if is_bot(user_agent):
+        reason = "bot"
+    elif settings.CLICK_DEDUPE_ENABLED:
+        try:
+            if click_dedupe.contains(f"{offer_id}:{visitor}"):
+                reason = "duplicate"
+        except Exception:
+            pass
+    if reason:
+        increment_clicks_dropped(reason)
+    return reason
+
+
+def remember_click(offer_id: int, visitor: str) -> None:
+    """Add a recorded click to the dedupe filter."""
+    if not settings.CLICK_DEDUPE_ENABLED:
+        return
+    try:
+        click_dedupe.add(f"{offer_id}:{visitor}")
+    except Exception:
+        pass
+
+
+def ingest_event(kind: str, offer_id: int, user_id: int | None = None) -> dict | None:
+    """Buffer an event in the stream.
+
+    Returns the event, or None when Redis is unavailable so the caller can
+    fall back to a synchronous write. Raises IngestBackpressure when full.
+    """
+    if kind not in EVENT_MODELS:
+        raise ValueError(f"Unknown event kind: {kind}")
+    event = new_event(kind, offer_id, user_id)
+    try:
+        entry_id = _append(event)
+    except Exception:
+        return None
+    if not entry_id:
+        increment_events_rejected()
+        raise IngestBackpressure()
+    increment_events_ingested(kind)
+    return event
+
+
+def write_events(db: Session, events: list[dict]) -> dict[str, int]:
+    """Insert events with multi-row INSERTs, skipping ones already written.
+
+    Does not commit. Returns the number of events submitted per kind.
+    """
+    dialect = db.get_bind().dialect.name
+    by_kind: dict[str, list[dict]] = {}
+    for event in events:
+        by_kind.setdefault(event["kind"], []).append({
+            "event_id": event["id"],
+            "offer_id": event["offer_id"],
+            "user_id": event.get("user_id"),
+            "created_at": datetime.fromisoformat(event["ts"]),
+        })
+
+    for kind, rows in by_kind.items():
+        model = EVENT_MODELS[kind]
+        for start in range(0, len(rows), INSERT_CHUNK):
+            chunk = rows[start:start + INSERT_CHUNK]
+            if dialect == "postgresql":
+                stmt = pg_insert(model).values(chunk).on_conflict_do_nothing(index_elements=["event_id", "created_at"])
+            elif dialect == "sqlite":
+                stmt = sqlite_insert(model).values(chunk).on_conflict_do_nothing(index_elements=["event_id", "created_at"])
+            else:
+                stmt = insert(model).values(chunk)
+            db.execute(stmt)
+    return {kind: len(rows) for kind, rows in by_kind.items()}
+
+
+def write_valid_events(db: Session, events: list[dict]) -> tuple[dict[str, int], list[dict]]:
+    """write_events() that leaves out bad events instead of failing the batch.
+
+    Bad events are malformed ones and ones the database refuses (a foreign key
+    to a deleted offer or user, an out-of-range value); connection and other
+    transient errors still propagate.
+
+    A failing batch is split in halves under savepoints until the offending
+    events are isolated, so one bad event costs O(log n) extra statements.
+    Does not commit. Returns (events submitted per kind, rejected events).
+    """
+    counts: dict[str, int] = {}
+    rejected: list[dict] = []
+    pending = [events] if events else []
+    while pending:
+        part = pending.pop()
+        try:
+            with db.begin_nested():
+                written = write_events(db, part)
+        except (IntegrityError, DataError, KeyError, TypeError, ValueError):
+            if len(part) == 1:
+                rejected.extend(part)
+            else:
+                middle = len(part) // 2
+                pending += [part[middle:], part[:middle]]
+            continue
+        for kind, count in written.items():
+            counts[kind] = counts.get(kind, 0) + count
+    return counts, rejected
+
+
+def record_event(db: Session, kind: str, offer_id: int, user_id: int | None = None) -> tuple[dict, bool]:
+    """Buffer an event, or write it straight away when Redis is down.
+
+    Returns (event, buffered).
+    """
+    event = ingest_event(kind, offer_id, user_id)
+    if event is not None:
+        return event, True
+    event = new_event(kind, offer_id, user_id)
+    write_events(db, [event])
+    db.commit()
+    return event, False
+
+
+# ---------------- Flusher side ----------------
+
+def ensure_group() -> None:
+    try:
+        redis_client.xgroup_create(EVENT_STREAM, FLUSH_GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def read_batch(consumer: str, count: int, block_ms: int) -> list[tuple[str, dict | None]]:
+    """Next batch for ``consumer``: stale entries from dead flushers first, then new ones.
+
+    Entries whose payload cannot be decoded are returned with ``None`` so the
+    caller can ack them out of the stream.
+    """
+    _, entries, *_ = redis_client.xautoclaim(
+        EVENT_STREAM, FLUSH_GROUP, consumer,
+        min_idle_time=settings.INGEST_CLAIM_IDLE_MS, start_id="0-0", count=count,
+    )
+    if not entries:
+        response = redis_client.xreadgroup(FLUSH_GROUP, consumer, {EVENT_STREAM: ">"}, count=count, block=block_ms)
+        entries = response[0][1] if response else []
+
+    batch = []
+    for entry_id, fields in entries:
+        try:
+            batch.append((entry_id, json.loads(fields["e"])))
+        except Exception:
+            batch.append((entry_id, None))
+    return batch
+
+
+def ack(entry_ids: list[str]) -> None:
+    """Acknowledge and delete flushed entries so XLEN reflects the real backlog."""
+    if not entry_ids:
+        return
+    pipe = redis_client.pipeline()
+    pipe.xack(EVENT_STREAM, FLUSH_GROUP, *entry_ids)
+    pipe.xdel(EVENT_STREAM, *entry_ids)
+    pipe.execute()
+
+
+def backlog() -> int:
+    try:
+        return redis_client.xlen(EVENT_STREAM)
+    except Exception:
+        return 0
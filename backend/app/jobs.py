@@ -0,0 +1,300 @@
+"""Background job framework.
+
+Every kind of background work is a JobSpec declared here: the queue it runs
+on, a pydantic model for its payload and its retry budget. Producers call
+submit() with a spec, so payloads are validated before they reach Redis and
+an optional idempotency key makes repeated submissions (double clicks,
+retried requests, two schedulers) enqueue the job once. Workers register a
+handler per spec with @handles and run under workers.runner, which gives
+every queue the same reliability, throttling, supervision and metrics.
+QUEUES is the one place to tune throughput per queue.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable
+
+from pydantic import BaseModel, ConfigDict
+
+from .config import get_settings
+from .metrics import increment_queue
+from .queue import enqueue_jobs, enqueue_unique, new_job
+from .redis_client import rk
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class QueueSpec:
+    name: str
+    concurrency: int  # Jobs in flight per worker process
+    provider: str | None = None  # Throttled/circuit-broken provider behind the queue
+    recipient: str | None = None  # Job field holding the recipient, if any
+
+
+QUEUES = {
+    "email": QueueSpec("email", settings.EMAIL_WORKER_CONCURRENCY, "sendgrid", "to"),
+    "sms": QueueSpec("sms", settings.SMS_WORKER_CONCURRENCY, "msg91", "mobile"),
+    "maintenance": QueueSpec("maintenance", settings.MAINTENANCE_WORKER_CONCURRENCY),
+    "newsletter": QueueSpec("newsletter", settings.NEWSLETTER_WORKER_CONCURRENCY),
+}
+
+
+class Payload(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    queue: str
+    name: str
+    payload: type[Payload]
+    max_attempts: int | None = None  # Defaults to QUEUE_MAX_ATTEMPTS
+
+    @property
+    def attempts(self) -> int:
+        return self.max_attempts or settings.QUEUE_MAX_ATTEMPTS
+
+
+JOBS: dict[tuple[str, str], JobSpec] = {}
+
+
+def define_job(queue: str, name: str, payload: type[Payload] = Payload, max_attempts: int | None = None) -> JobSpec:
+    spec = JobSpec(queue, name, payload, max_attempts)
+    JOBS[(queue, name)] = spec
+    return spec
+
+
+# ---------------- Payloads ----------------
+
+class WelcomeEmail(Payload):
+    user_name: str
+    referral_code: str | None = None
+    app_url: str | None = None
+    verification_url: str | None = None
+
+
+class PasswordResetEmail(Payload):
+    user_name: str
+    reset_url: str
+
+
+class NewsletterWelcomeEmail(Payload):
+    name: str
+
+
+class OrderItemLine(Payload):
+    product_name: str
+    quantity: int
+    unit_price: float
+    subtotal: float
+
+
+class OrderConfirmationEmail(Payload):
+    user_name: str
+    order_number: str
+    total_amount: float
+    items_count: int
+    items: list[OrderItemLine] = []
+    payment_id: str | None = None
+    order_url: str
+
+
+class CashbackConfirmedEmail(Payload):
+    user_name: str
+    amount: float
+    new_balance: float
+
+
+class WithdrawalRequestedEmail(Payload):
+    user_name: str
+    amount: float
+    method: str
+    withdrawal_id: int
+    status: str
+
+
+class WithdrawalProcessedEmail(Payload):
+    user_name: str
+    amount: float
+    method: str
+    transaction_id: str
+    status: str
+
+
+class WithdrawalRejectedEmail(Payload):
+    user_name: str
+    amount: float
+    method: str
+    reason: str
+    refunded_amount: float
+    new_balance: float
+
+
+class Voucher(Payload):
+    product_name: str
+    code: str
+    value: float
+    instructions: str | None = None
+
+
+class VoucherCodesEmail(Payload):
+    order_number: str
+    vouchers: list[Voucher]
+
+
+class GiftCardDeliveryEmail(Payload):
+    code: str
+    value: float
+    user_id: int
+
+
+class Recipient(Payload):
+    id: int
+    email: str
+    name: str | None = None
+
+
+class NewsletterBatch(Payload):
+    campaign_id: int
+    recipients: list[Recipient]
+
+
+class NewsletterFanout(Payload):
+    campaign_id: int
+    send_at: datetime | None = None
+
+
+class WithdrawalRequestedSms(Payload):
+    amount: float
+    method: str
+
+
+class WithdrawalProcessedSms(Payload):
+    amount: float
+    status: str
+
+
+class WithdrawalRejectedSms(Payload):
+    amount: float
+    refunded: float
+
+
+# ---------------- Job definitions ----------------
+
+WELCOME_EMAIL = define_job("email", "welcome", WelcomeEmail)
+PASSWORD_RESET_EMAIL = define_job("email", "password_reset", PasswordResetEmail)
+NEWSLETTER_WELCOME_EMAIL = define_job("email", "newsletter_welcome", NewsletterWelcomeEmail)
+ORDER_CONFIRMATION_EMAIL = define_job("email", "order_confirmation", OrderConfirmationEmail)
+CASHBACK_CONFIRMED_EMAIL = define_job("email", "cashback_confirmed", CashbackConfirmedEmail)
+WITHDRAWAL_REQUESTED_EMAIL = define_job("email", "withdrawal_requested", WithdrawalRequestedEmail)
+WITHDRAWAL_PROCESSED_EMAIL = define_job("email", "withdrawal_processed", WithdrawalProcessedEmail)
+WITHDRAWAL_REJECTED_EMAIL = define_job("email", "withdrawal_rejected", WithdrawalRejectedEmail)
+GIFT_CARD_DELIVERY_EMAIL = define_job("email", "gift_card_delivery", GiftCardDeliveryEmail)
+VOUCHER_CODES_EMAIL = define_job("email", "voucher_codes", VoucherCodesEmail)
+NEWSLETTER_BATCH = define_job("email", "newsletter_batch", NewsletterBatch)
+NEWSLETTER_FANOUT = define_job("newsletter", "newsletter_fanout", NewsletterFanout, max_attempts=3)
+
+WITHDRAWAL_REQUESTED_SMS = define_job("sms", "withdrawal_requested", WithdrawalRequestedSms)
+WITHDRAWAL_PROCESSED_SMS = define_job("sms", "withdrawal_processed", WithdrawalProcessedSms)
+WITHDRAWAL_REJECTED_SMS = define_job("sms", "withdrawal_rejected", WithdrawalRejectedSms)
+
+EXPIRE_OFFERS = define_job("maintenance", "expire_offers", max_attempts=3)
+RECALCULATE_WALLET_BALANCES = define_job("maintenance", "recalculate_wallet_balances", max_attempts=3)
+GENERATE_SITEMAP = define_job("maintenance", "generate_sitemap", max_attempts=3)
+CLEAN_OLD_LOGS = define_job("maintenance", "clean_old_logs", max_attempts=3)
+MAINTAIN_EVENT_PARTITIONS = define_job("maintenance", "maintain_event_partitions", max_attempts=3)
+AFFILIATE_SYNC = define_job("maintenance", "affiliate_sync", max_attempts=3)
+
+
+# ---------------- Producing ----------------
+
+def idempotency_key(spec: JobSpec, key: str) -> str:
+    return rk("job", "idem", spec.queue, spec.name, key)
+
+
+def build_job(
+    spec: JobSpec, payload: dict | Payload, to: str | None = None, priority: str | None = None
+) -> dict:
+    """Validate the payload and build the queue entry for one job."""
+    data = spec.payload.model_validate(payload).model_dump(mode="json", exclude_unset=True)
+    queue_spec = QUEUES.get(spec.queue)
+    fields = {queue_spec.recipient: to} if queue_spec and queue_spec.recipient else {}
+    return new_job(spec.queue, spec.name, fields, data, priority=priority)
+
+
+def submit(
+    spec: JobSpec,
+    payload: dict | Payload,
+    *,
+    to: str | None = None,
+    key: str | None = None,
+    run_at: datetime | float | None = None,
+    priority: str | None = None,
+) -> str:
+    """Enqueue a job; returns its id.
+
+    ``to`` is the recipient (email address or mobile) on notification queues.
+    With an idempotency ``key``, submissions of the same job and key within
+    JOB_IDEMPOTENCY_TTL enqueue nothing and return the id of the first one;
+    the key is claimed atomically with the push (queue.enqueue_unique).
+    """
+    job = build_job(spec, payload, to=to, priority=priority)
+    if key is None:
+        enqueue_jobs(spec.queue, [job], run_at=run_at)
+    else:
+        holder = enqueue_unique(spec.queue, job, idempotency_key(spec, key), settings.JOB_IDEMPOTENCY_TTL, run_at)
+        if holder != job["id"]:
+            return holder
+    increment_queue(spec.queue)
+    return job["id"]
+
+
+# ---------------- Consuming ----------------
+
+Handler = Callable[[dict], Any]  # Receives the whole job; sync handlers run in a thread
+HANDLERS: dict[tuple[str, str | None], Handler] = {}
+LIFESPANS: list[Callable[[], Any]] = []
+
+# Set by the runner once the worker stops reserving. Long handlers check it
+# between steps, stop at a checkpoint and raise Requeue to resume elsewhere.
+stopping = threading.Event()
+
+
+class Requeue(Exception):
+    """Raised by a handler to put its job back on the queue without using up an attempt."""
+
+
+def handles(*specs: JobSpec) -> Callable[[Handler], Handler]:
+    """Register the decorated function as the handler of the given jobs."""
+    def decorator(fn: Handler) -> Handler:
+        for spec in specs:
+            HANDLERS[(spec.queue, spec.name)] = fn
+        return fn
+    return decorator
+
+
+def handles_queue(queue_name: str) -> Callable[[Handler], Handler]:
+    """Register the fallback handler for job types of a queue without their own."""
+    def decorator(fn: Handler) -> Handler:
+        HANDLERS[(queue_name, None)] = fn
+        return fn
+    return decorator
+
+
+def lifespan(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Register an async context manager factory entered once per worker
+    process around all consuming, e.g. to open pooled provider clients."""
+    LIFESPANS.append(fn)
+    return fn
+
+
+def handler_for(queue_name: str, job_type: str | None) -> Handler | None:
+    return HANDLERS.get((queue_name, job_type)) or HANDLERS.get((queue_name, None))
+
+
+def attempts_for(queue_name: str, job_type: str | None) -> int:
+    spec = JOBS.get((queue_name, job_type))
+    return spec.attempts if spec else settings.QUEUE_MAX_ATTEMPTS
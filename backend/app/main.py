@@ -86,7 +86,7 @@ from .redis_client import rate_limit, redis_client
 from fastapi import Request, HTTPException
 import time, uuid, logging, os
 from .logging_config import log, with_request_id
-from .metrics import observe_request, set_redis_memory, set_dead_letter
+from .metrics import observe_request, set_redis_memory, set_dead_letter, set_stream_group
 from .config import get_settings
 
 settings = get_settings()
@@ -148,21 +148,35 @@ async def security_headers_middleware(request: Request, call_next):
     return response
 
 
+# SEO redirects: matched in memory before any other middleware runs
+from .redirects import RedirectMiddleware, redirect_engine
+
+app.add_middleware(RedirectMiddleware)
+
+
+@app.on_event("startup")
+async def load_seo_redirects():
+    redirect_engine.start()
+
+
 # Periodic metrics update task (Redis stats, DLQ depth)
 try:
     import asyncio
 
     async def metrics_refresher():
+        from .queue import get_consumer_groups, get_queue_stats
+
         while True:
             try:
                 info = redis_client.info()
                 used = info.get("used_memory", 0)
                 set_redis_memory(int(used))
-                # Dead letter queues
-                for q in ["email", "sms", "cashback"]:
-                    dlq_key = f"queue:{q}:dlq"
-                    depth = redis_client.llen(dlq_key)
-                    set_dead_letter(q, depth)
+                # Dead letter queues, and consumer group lag under the streams backend
+                for q, stats in get_queue_stats().items():
+                    set_dead_letter(q, stats["dead_letter"])
+                    if settings.QUEUE_BACKEND == "streams":
+                        for lane, group in get_consumer_groups(q).items():
+                            set_stream_group(q, lane, group["group"], group["lag"], group["pending"])
             except Exception:
                 pass
             await asyncio.sleep(15)
@@ -173,34 +187,25 @@ try:
 except Exception:
     pass
 
-# Periodic affiliate sync scheduler (disabled for Replit to avoid event loop conflicts)
-# To enable, set AFFILIATE_SYNC_ENABLED=true and ensure sync_affiliate_transactions is async
+# Periodic affiliate sync scheduler: submits a maintenance job per interval,
+# run by `python -m workers.runner --queues maintenance`
 try:
-    from .tasks.affiliate_sync import sync_affiliate_transactions
-    from .database import SessionLocal
+    from .jobs import AFFILIATE_SYNC, submit
     AFFILIATE_INTERVAL_MINUTES = float(
         os.getenv("AFFILIATE_SYNC_INTERVAL_MINUTES", "1440"))  # default daily
     AFFILIATE_SYNC_ENABLED = os.getenv("AFFILIATE_SYNC_ENABLED",
                                        "false").lower() == "true"
 
     async def affiliate_sync_scheduler():
+        interval = AFFILIATE_INTERVAL_MINUTES * 60
         while True:
-            start_ts = time.time()
-            if SessionLocal is not None:
-                session = SessionLocal()
-                try:
-                    result = sync_affiliate_transactions(session)
-                    log.info(
-                        f"Affiliate periodic sync imported={result['imported']} updated={result['updated']} total={result['total']}"
-                    )
-                except Exception as e:
-                    log.error(f"Affiliate periodic sync failed: {e}")
-                finally:
-                    session.close()
-            # Sleep remaining interval (convert minutes to seconds)
-            elapsed = time.time() - start_ts
-            sleep_for = max(5.0, AFFILIATE_INTERVAL_MINUTES * 60 - elapsed)
-            await asyncio.sleep(sleep_for)
+            # One job per interval slot however many API processes run this loop
+            slot = int(time.time() // interval)
+            try:
+                await asyncio.to_thread(submit, AFFILIATE_SYNC, {}, key=str(slot))
+            except Exception as e:
+                log.error(f"Submitting affiliate sync failed: {e}")
+            await asyncio.sleep(max(5.0, (slot + 1) * interval - time.time()))
 
     @app.on_event("startup")
     async def start_affiliate_scheduler():
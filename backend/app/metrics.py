@@ -20,12 +20,121 @@ queue_jobs_enqueued_total = Counter(
     ["queue"]
 )
 
+queue_job_latency_seconds = Histogram(
+    "app_queue_job_latency_seconds",
+    "Time from enqueue to successful send, per priority lane",
+    ["queue", "lane"],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600)
+)
+
+jobs_processed_total = Counter(
+    "app_jobs_processed_total",
+    "Jobs finished by the worker runner, per job type and outcome (success, retry, dead, duplicate, requeued)",
+    ["queue", "job", "outcome"]
+)
+
+job_duration_seconds = Histogram(
+    "app_job_duration_seconds",
+    "Handler run time per job type, successful or not",
+    ["queue", "job"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 30, 120, 600)
+)
+
 queue_dead_letter_depth = Gauge(
     "app_queue_dead_letter_depth",
     "Dead letter queue depth",
     ["queue"]
 )
 
+queue_stream_lag = Gauge(
+    "app_queue_stream_lag",
+    "Entries not yet delivered to the consumer group (streams queue backend)",
+    ["queue", "lane", "group"]
+)
+
+queue_stream_pending = Gauge(
+    "app_queue_stream_pending",
+    "Entries delivered to the consumer group but not acked yet (streams queue backend)",
+    ["queue", "lane", "group"]
+)
+
+provider_circuit_state = Gauge(
+    "app_provider_circuit_state",
+    "Notification provider circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["provider"]
+)
+
+provider_throttle_wait_seconds_total = Counter(
+    "app_provider_throttle_wait_seconds_total",
+    "Time sends spent waiting for a provider rate-limit token",
+    ["provider"]
+)
+
+db_pool_checkout_wait_seconds = Histogram(
+    "app_db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+
+db_pool_checked_out = Gauge(
+    "app_db_pool_checked_out",
+    "Database connections currently checked out of the pool",
+    ["pool"]
+)
+
+db_pool_overflow = Gauge(
+    "app_db_pool_overflow",
+    "Database connections open beyond pool_size (negative while the pool is still filling)",
+    ["pool"]
+)
+
+db_pool_size = Gauge(
+    "app_db_pool_size",
+    "Configured persistent pool size",
+    ["pool"]
+)
+
+events_ingested_total = Counter(
+    "app_events_ingested_total",
+    "Click/view events appended to the ingest stream",
+    ["kind"]
+)
+
+events_rejected_total = Counter(
+    "app_events_rejected_total",
+    "Click/view events refused because the ingest backlog was full"
+)
+
+events_discarded_total = Counter(
+    "app_events_discarded_total",
+    "Buffered events the flusher dropped because the database rejected them",
+    ["kind"]
+)
+
+clicks_dropped_total = Counter(
+    "app_clicks_dropped_total",
+    "Clicks discarded at ingest before reaching counters or the database",
+    ["reason"]
+)
+
+events_flushed_total = Counter(
+    "app_events_flushed_total",
+    "Click/view events written to the database by the flusher",
+    ["kind"]
+)
+
+events_flush_duration_seconds = Histogram(
+    "app_events_flush_duration_seconds",
+    "Time to write one flusher batch to the database",
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+)
+
+events_backlog = Gauge(
+    "app_events_backlog",
+    "Entries waiting in the ingest stream"
+)
+
 redis_memory_bytes = Gauge(
     "app_redis_memory_bytes",
     "Redis used memory bytes"
@@ -68,10 +177,68 @@ def increment_queue(queue: str):
     queue_jobs_enqueued_total.labels(queue=queue).inc()
 
 
+def observe_job_latency(queue: str, lane: str, seconds: float):
+    queue_job_latency_seconds.labels(queue=queue, lane=lane).observe(max(seconds, 0))
+
+
+def observe_job(queue: str, job: str, outcome: str, seconds: float):
+    jobs_processed_total.labels(queue=queue, job=job, outcome=outcome).inc()
+    job_duration_seconds.labels(queue=queue, job=job).observe(seconds)
+
+
 def set_dead_letter(queue: str, depth: int):
     queue_dead_letter_depth.labels(queue=queue).set(depth)
 
 
+def set_stream_group(queue: str, lane: str, group: str, lag: int, pending: int):
+    queue_stream_lag.labels(queue=queue, lane=lane, group=group).set(lag)
+    queue_stream_pending.labels(queue=queue, lane=lane, group=group).set(pending)
+
+
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def set_circuit_state(provider: str, state: str):
+    provider_circuit_state.labels(provider=provider).set(CIRCUIT_STATES[state])
+
+
+def add_throttle_wait(provider: str, seconds: float):
+    provider_throttle_wait_seconds_total.labels(provider=provider).inc(seconds)
+
+
+def observe_db_pool_wait(pool: str, duration: float):
+    db_pool_checkout_wait_seconds.labels(pool=pool).observe(duration)
+
+
+def set_db_pool_usage(pool: str, checked_out: int, overflow: int, size: int):
+    db_pool_checked_out.labels(pool=pool).set(checked_out)
+    db_pool_overflow.labels(pool=pool).set(overflow)
+    db_pool_size.labels(pool=pool).set(size)
+
+
+def increment_events_ingested(kind: str):
+    events_ingested_total.labels(kind=kind).inc()
+
+
+def increment_events_rejected():
+    events_rejected_total.inc()
+
+
+def increment_events_discarded(kind: str, count: int = 1):
+    events_discarded_total.labels(kind=kind).inc(count)
+
+
+def increment_clicks_dropped(reason: str):
+    clicks_dropped_total.labels(reason=reason).inc()
+
+
+def observe_events_flush(counts: dict[str, int], duration: float, backlog: int):
+    for kind, count in counts.items():
+        events_flushed_total.labels(kind=kind).inc(count)
+    events_flush_duration_seconds.observe(duration)
+    events_backlog.set(backlog)
+
+
 def set_redis_memory(bytes_used: int):
     redis_memory_bytes.set(bytes_used)
 
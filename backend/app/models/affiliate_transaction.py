@@ -12,7 +12,7 @@ class AffiliateTransaction(Base):
     merchant_id: Mapped[int | None] = mapped_column(ForeignKey("merchants.id"), index=True)
     offer_id: Mapped[int | None] = mapped_column(ForeignKey("offers.id"), index=True)
     network: Mapped[str] = mapped_column(String(40), index=True)
-    external_transaction_id: Mapped[str] = mapped_column(String(120), index=True)
+    external_transaction_id: Mapped[str] = mapped_column(String(120), unique=True, index=True)  # Upsert key of the sync import
     status: Mapped[str] = mapped_column(String(30), default="pending", index=True)  # pending/confirmed/rejected
     amount: Mapped[float] = mapped_column(Numeric(10,2), default=0)
     currency: Mapped[str] = mapped_column(String(10), default="INR")
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Boolean, DateTime, ForeignKey, Integer
+from sqlalchemy import String, Boolean, DateTime, ForeignKey, Integer, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from ..database import Base
@@ -20,3 +20,25 @@ class Offer(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     merchant = relationship("Merchant")
+
+    # Partial indexes matching the listing queries:
+    # WHERE is_active [AND is_featured | is_exclusive] ORDER BY priority DESC, created_at DESC
+    __table_args__ = (
+        Index(
+            "ix_offers_active_priority_created",
+            text("priority DESC"), text("created_at DESC"),
+            postgresql_where=text("is_active = true"), sqlite_where=text("is_active = 1"),
+        ),
+        Index(
+            "ix_offers_featured_priority_created",
+            text("priority DESC"), text("created_at DESC"),
+            postgresql_where=text("is_active = true AND is_featured = true"),
+            sqlite_where=text("is_active = 1 AND is_featured = 1"),
+        ),
+        Index(
+            "ix_offers_exclusive_priority_created",
+            text("priority DESC"), text("created_at DESC"),
+            postgresql_where=text("is_active = true AND is_exclusive = true"),
+            sqlite_where=text("is_active = 1 AND is_exclusive = 1"),
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import DateTime, ForeignKey, Integer
+from sqlalchemy import DateTime, ForeignKey, Integer, Index, String
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime
 from ..database import Base
@@ -10,3 +10,12 @@ class OfferClick(Base):
     offer_id: Mapped[int] = mapped_column(ForeignKey("offers.id"), index=True)
     user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Set by buffered ingestion so redelivered stream entries are inserted once
+    event_id: Mapped[str | None] = mapped_column(String(32))
+
+    __table_args__ = (
+        # Includes created_at because unique indexes on a partitioned table must cover the partition key
+        Index("uq_offer_clicks_event_id", "event_id", "created_at", unique=True),
+        Index("ix_offer_clicks_offer_created", "offer_id", "created_at"),
+        Index("ix_offer_clicks_user_created", "user_id", "created_at"),
+    )
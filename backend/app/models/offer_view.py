@@ -1,4 +1,4 @@
-from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy import DateTime, ForeignKey, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from ..database import Base
@@ -10,6 +10,14 @@ class OfferView(Base):
     offer_id: Mapped[int] = mapped_column(ForeignKey("offers.id", ondelete="CASCADE"), index=True)
     user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Set by buffered ingestion so redelivered stream entries are inserted once
+    event_id: Mapped[str | None] = mapped_column(String(32))
 
     offer = relationship("Offer")
     user = relationship("User")
+
+    __table_args__ = (
+        # Includes created_at because unique indexes on a partitioned table must cover the partition key
+        Index("uq_offer_views_event_id", "event_id", "created_at", unique=True),
+        Index("ix_offer_views_offer_created", "offer_id", "created_at"),
+    )
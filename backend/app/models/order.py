@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, ForeignKey, Integer, Numeric
+from sqlalchemy import String, DateTime, ForeignKey, Integer, Numeric, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from uuid import uuid4
@@ -34,3 +34,8 @@ class Order(Base):
     # Relationships
     user = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_orders_payment_status_created", "payment_status", "created_at"),
+        Index("ix_orders_user_created", "user_id", "created_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import String, DateTime, ForeignKey, Integer, Numeric, Text
+from sqlalchemy import String, DateTime, ForeignKey, Integer, Numeric, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from ..database import Base
@@ -16,3 +16,7 @@ class WalletTransaction(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
 
     user = relationship("User")
+
+    __table_args__ = (
+        Index("ix_wallet_transactions_user_created", "user_id", "created_at"),
+    )
@@ -0,0 +1,229 @@
+"""Newsletter campaign delivery in recipient batches.
+
+A campaign's subject and HTML live once in newsletter_campaigns; queue jobs
+only carry the campaign id and up to NEWSLETTER_BATCH_SIZE recipients. The
+email worker turns each batch into a single SendGrid request with one
+personalization per recipient (SendGrid allows 1000 per request), and
+per-recipient values are filled in through SendGrid substitutions:
+
+    -name-   subscriber name, or "there"
+    -email-  subscriber email
+
+Sending a campaign only flips it to "sending" and pushes a fan-out job on
+the newsletter queue; its handler (workers.newsletter_fanout, run by
+workers.runner) then walks the active subscribers in keyset chunks of
+NEWSLETTER_FANOUT_CHUNK (constant memory for any list size). Per chunk it bulk-inserts "queued" delivery rows,
+commits, and pushes the chunk's batch jobs together with the fan-out cursor
+(last subscriber id) in one MULTI, so jobs and checkpoint never disagree.
+A crashed fan-out is requeued by the queue reaper and resumes after the
+cursor; rows of a chunk committed but never pushed are deleted and redone.
+Campaigns created with send_at get a fan-out job delayed until then; it
+only fires if the campaign is still scheduled for that same time.
+Delivery rows flip to "sent" with one UPDATE when a batch is accepted.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .database import SessionLocal
+from .models.newsletter import NewsletterCampaign, NewsletterDelivery, NewsletterSubscriber
+from .jobs import NEWSLETTER_BATCH, NEWSLETTER_FANOUT, build_job, submit
+from .queue import enqueue_jobs
+from .redis_client import redis_client, rk
+
+settings = get_settings()
+
+NEWSLETTER_BATCH_JOB = NEWSLETTER_BATCH.name
+NEWSLETTER_FANOUT_JOB = NEWSLETTER_FANOUT.name
+# Cursor outlives any realistic fan-out; cleared when the campaign finishes
+FANOUT_CURSOR_TTL = 7 * 24 * 3600
+# SendGrid rejects more personalizations than this in one request
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+
+def batch_size() -> int:
+    return max(1, min(settings.NEWSLETTER_BATCH_SIZE, SENDGRID_MAX_PERSONALIZATIONS))
+
+
+def fanout_cursor_key(campaign_id: int) -> str:
+    return rk("newsletter", "fanout", str(campaign_id))
+
+
+def start_campaign(campaign_id: int) -> str:
+    """Hand a campaign already marked "sending" to the fan-out worker."""
+    return submit(NEWSLETTER_FANOUT, {"campaign_id": campaign_id}, key=str(campaign_id))
+
+
+def schedule_campaign(campaign_id: int, send_at: datetime) -> str:
+    """Delay the fan-out of a "scheduled" campaign until ``send_at`` (naive UTC)."""
+    return submit(
+        NEWSLETTER_FANOUT,
+        {"campaign_id": campaign_id, "send_at": send_at},
+        key=f"{campaign_id}:{send_at.isoformat()}",
+        run_at=send_at,
+    )
+
+
+def _active_subscriber_count(db: Session) -> int:
+    return db.scalar(
+        select(func.count()).select_from(NewsletterSubscriber).where(NewsletterSubscriber.status == "active")
+    ) or 0
+
+
+def _subscriber_chunks(db: Session, after_id: int, chunk: int):
+    """Active subscribers as (id, email, name) rows, ``chunk`` at a time by id."""
+    while True:
+        rows = db.execute(
+            select(NewsletterSubscriber.id, NewsletterSubscriber.email, NewsletterSubscriber.name)
+            .where(NewsletterSubscriber.status == "active", NewsletterSubscriber.id > after_id)
+            .order_by(NewsletterSubscriber.id)
+            .limit(chunk)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1].id
+
+
+def fan_out_campaign(
+    db: Session,
+    campaign_id: int,
+    should_stop: Callable[[], bool] | None = None,
+    send_at: datetime | None = None,
+) -> int:
+    """Enqueue batch jobs for every active subscriber not yet handled. Commits per chunk.
+
+    ``send_at`` is set for scheduled fan-outs: nothing happens unless the
+    campaign is still scheduled for exactly that time, and a "scheduled"
+    campaign is switched to "sending" first. ``should_stop`` is checked
+    between chunks; when it returns True the fan-out stops at the checkpoint
+    and the campaign stays "sending". Returns the number of recipients
+    enqueued by this call.
+    """
+    campaign = db.scalar(select(NewsletterCampaign).where(NewsletterCampaign.id == campaign_id))
+    if campaign is None:
+        return 0
+    if send_at is not None:
+        if campaign.send_at != send_at:
+            return 0
+        if campaign.status == "scheduled":
+            campaign.status = "sending"
+            campaign.total_recipients = _active_subscriber_count(db)
+            db.commit()
+    if campaign.status != "sending":
+        return 0
+
+    cursor_key = fanout_cursor_key(campaign_id)
+    cursor = int(redis_client.get(cursor_key) or 0)
+    # Rows of a chunk that was committed but whose jobs were never pushed
+    db.execute(
+        delete(NewsletterDelivery).where(
+            NewsletterDelivery.campaign_id == campaign_id,
+            NewsletterDelivery.subscriber_id > cursor,
+            NewsletterDelivery.status == "queued",
+        )
+    )
+    db.commit()
+
+    size = batch_size()
+    enqueued = 0
+    for rows in _subscriber_chunks(db, cursor, settings.NEWSLETTER_FANOUT_CHUNK):
+        db.execute(insert(NewsletterDelivery), [
+            {"campaign_id": campaign_id, "subscriber_id": row.id, "status": "queued"}
+            for row in rows
+        ])
+        db.commit()
+
+        recipients = [{"id": row.id, "email": row.email, "name": row.name} for row in rows]
+        jobs = [
+            build_job(NEWSLETTER_BATCH, {"campaign_id": campaign_id, "recipients": recipients[i:i + size]}, to="")
+            for i in range(0, len(recipients), size)
+        ]
+        pipe = redis_client.pipeline(transaction=True)
+        enqueue_jobs("email", jobs, pipe)
+        pipe.set(cursor_key, rows[-1].id, ex=FANOUT_CURSOR_TTL)
+        pipe.execute()
+        enqueued += len(rows)
+        if should_stop and should_stop():
+            return enqueued
+
+    campaign.status = "sent"
+    campaign.sent_at = datetime.utcnow()
+    db.commit()
+    redis_client.delete(cursor_key)
+    return enqueued
+
+
+@lru_cache(maxsize=32)
+def campaign_content(campaign_id: int) -> dict:
+    """Subject and bodies of a campaign, loaded once per worker process."""
+    db = SessionLocal()
+    try:
+        campaign = db.scalar(select(NewsletterCampaign).where(NewsletterCampaign.id == campaign_id))
+        if campaign is None:
+            raise LookupError(f"Newsletter campaign {campaign_id} not found")
+        return {
+            "subject": campaign.subject,
+            "html": campaign.html_content,
+            "text": campaign.plain_text_content,
+        }
+    finally:
+        db.close()
+
+
+def sendgrid_payload(campaign_id: int, content: dict, recipients: list[dict], from_email: str, from_name: str) -> dict:
+    """One SendGrid v3 mail/send body covering every recipient of a batch."""
+    body = [{"type": "text/html", "value": content["html"]}]
+    if content.get("text"):
+        # SendGrid requires text/plain to come first
+        body.insert(0, {"type": "text/plain", "value": content["text"]})
+    return {
+        "personalizations": [
+            {
+                "to": [{"email": r["email"], **({"name": r["name"]} if r.get("name") else {})}],
+                "substitutions": {"-name-": r.get("name") or "there", "-email-": r["email"]},
+                "custom_args": {"campaign_id": str(campaign_id), "subscriber_id": str(r["id"])},
+            }
+            for r in recipients
+        ],
+        "from": {"email": from_email, "name": from_name},
+        "subject": content["subject"],
+        "content": body,
+    }
+
+
+def mark_batch_sent(db: Session, campaign_id: int, subscriber_ids: list[int]) -> int:
+    """Flip a batch's delivery rows to sent and bump the campaign counter. Commits.
+
+    Rows already marked sent (a redelivered batch) are not counted again.
+    Returns the number of rows updated.
+    """
+    result = db.execute(
+        update(NewsletterDelivery)
+        .where(
+            NewsletterDelivery.campaign_id == campaign_id,
+            NewsletterDelivery.subscriber_id.in_(subscriber_ids),
+            NewsletterDelivery.status != "sent",
+        )
+        .values(status="sent", sent_at=datetime.utcnow())
+    )
+    if result.rowcount:
+        db.execute(
+            update(NewsletterCampaign)
+            .where(NewsletterCampaign.id == campaign_id)
+            .values(sent_count=NewsletterCampaign.sent_count + result.rowcount)
+        )
+    db.commit()
+    return result.rowcount
+
+
+def record_batch_sent(campaign_id: int, subscriber_ids: list[int]) -> None:
+    db = SessionLocal()
+    try:
+        mark_batch_sent(db, campaign_id, subscriber_ids)
+    finally:
+        db.close()
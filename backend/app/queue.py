@@ -2,15 +2,20 @@
 from typing import Any
 from datetime import datetime, timezone
 import json
+import random
+import time
+import uuid
+from .config import get_settings
 from .redis_client import redis_client, rk, cache_get, cache_set
 
+settings = get_settings()
+
 # Queue key helpers
 EMAIL_QUEUE = rk("queue", "email")
 SMS_QUEUE = rk("queue", "sms")
-EMAIL_PROCESSING = rk("queue", "email", "processing")
-SMS_PROCESSING = rk("queue", "sms", "processing")
-EMAIL_DLQ = rk("queue", "email", "dlq")
-SMS_DLQ = rk("queue", "sms", "dlq")
+EMAIL_DLQ = rk("queue", "email", "dead")
+SMS_DLQ = rk("queue", "sms", "dead")
+QUEUE_NAMES = ("email", "sms", "newsletter", "maintenance")
 
 
 def _now_iso() -> str:
@@ -68,81 +73,854 @@ def remove_item(user_id: int, variant_id: int):
 
 
 # ---------------- Job Queue Helpers ----------------
+#
+# Reliable delivery: a worker reserves a job with BLMOVE from queue:<name>
+# into its own processing list queue:<name>:processing:<worker_id>, so the
+# job is never only in worker memory. Workers heartbeat into
+# queue:<name>:workers (sorted set, score = last beat); the reaper moves the
+# processing list of any worker silent for QUEUE_VISIBILITY_TIMEOUT back to
+# the head of the queue. Every job carries a unique id, so identical
+# payloads stay distinct and LREM removes exactly one entry.
+#
+# Priority lanes: each queue is three lists, queue:<name>:high, queue:<name>
+# (normal, the original key) and queue:<name>:low. A reservation tries the
+# lanes in the order given by the worker's LaneScheduler (weighted
+# round-robin, so a flood of high jobs cannot starve low ones) inside one
+# Lua call; when all are empty it blocks on the high lane for up to
+# IDLE_POLL_SECONDS and tries again.
+#
+# Delayed jobs (scheduled sends and retry backoff) wait in the sorted set
+# queue:<name>:scheduled scored by run-at epoch; promote_due_jobs moves due
+# ones onto their lanes atomically in Lua. Workers run it every
+# QUEUE_SCHEDULER_INTERVAL seconds; concurrent movers are safe.
+#
+# Streams backend (QUEUE_BACKEND=streams): each lane is instead the stream
+# queue:<name>:stream:<lane> read by one consumer group (QUEUE_STREAM_GROUP)
+# with XREADGROUP, so scaling out is starting more consumers. Acked entries
+# are XDELed; the reaper XAUTOCLAIMs entries idle past the visibility timeout
+# and re-adds them, and XINFO GROUPS gives per-group lag. The TypeScript
+# workers only speak the list backend.
+#
+# Dead letters go to the stream queue:<name>:dead (fields: job, error_type),
+# capped at about QUEUE_DLQ_MAXLEN entries. Stream ids double as failure
+# timestamps and as stable handles for paging and retrying single jobs.
+
+LANES = ("high", "normal", "low")
+# Default lane by job type when the producer does not pass one
+PRIORITY_BY_TYPE = {
+    "otp": "high",
+    "password_reset": "high",
+    "newsletter_batch": "low",
+    "newsletter_welcome": "low",
+}
+IDLE_POLL_SECONDS = 0.25
+DLQ_PAGE_SIZE = 500
+
+
+def _queue_key(queue_name: str) -> str:
+    return rk("queue", queue_name)
+
+
+def lane_key(queue_name: str, lane: str) -> str:
+    return _queue_key(queue_name) if lane == "normal" else rk("queue", queue_name, lane)
+
+
+def stream_key(queue_name: str, lane: str) -> str:
+    return rk("queue", queue_name, "stream", lane)
+
+
+def _streams() -> bool:
+    return settings.QUEUE_BACKEND == "streams"
+
+
+def _lane_keys(queue_name: str, lanes=LANES) -> list[str]:
+    """Keys the given lanes wait in under the configured backend."""
+    key = stream_key if _streams() else lane_key
+    return [key(queue_name, lane) for lane in lanes]
+
+
+def _lane_of(job: dict) -> str:
+    return job.get("priority") if job.get("priority") in LANES else "normal"
+
+
+class LaneScheduler:
+    """Smooth weighted round-robin over lanes.
+
+    Each call to order() picks the lane whose turn it is (high/normal/low get
+    turns in proportion to their weights) and returns it first, followed by
+    the other lanes by priority, so an empty lane's turn is not wasted.
+    """
+
+    def __init__(self, weights: dict[str, int] | None = None):
+        self.weights = weights or {
+            "high": settings.QUEUE_LANE_WEIGHT_HIGH,
+            "normal": settings.QUEUE_LANE_WEIGHT_NORMAL,
+            "low": settings.QUEUE_LANE_WEIGHT_LOW,
+        }
+        self._current = {lane: 0 for lane in LANES}
+
+    def order(self) -> list[str]:
+        total = sum(self.weights.values())
+        for lane in LANES:
+            self._current[lane] += self.weights.get(lane, 0)
+        pick = max(LANES, key=lambda lane: self._current[lane])
+        self._current[pick] -= total
+        return [pick] + [lane for lane in LANES if lane != pick]
+
+
+def processing_key(queue_name: str, worker_id: str) -> str:
+    return rk("queue", queue_name, "processing", worker_id)
+
+
+def workers_key(queue_name: str) -> str:
+    return rk("queue", queue_name, "workers")
 
-def push_email_job(email_type: str, to_email: str, data: dict):
-    job = {
-        "type": email_type,
-        "to": to_email,
-        "data": data,
-        "enqueued_at": _now_iso(),
-        "attempts": 0,
-    }
-    redis_client.rpush(EMAIL_QUEUE, json.dumps(job))
 
+def scheduled_key(queue_name: str) -> str:
+    return rk("queue", queue_name, "scheduled")
 
-def push_sms_job(sms_type: str, mobile: str, data: dict):
-    job = {
-        "type": sms_type,
-        "mobile": mobile,
+
+def _epoch(run_at: datetime | float) -> float:
+    if isinstance(run_at, datetime):
+        # Naive datetimes are UTC throughout the models
+        return (run_at if run_at.tzinfo else run_at.replace(tzinfo=timezone.utc)).timestamp()
+    return float(run_at)
+
+
+def new_job(
+    queue_name: str,
+    job_type: str,
+    fields: dict,
+    data: dict,
+    job_id: str | None = None,
+    priority: str | None = None,
+) -> dict:
+    priority = priority or PRIORITY_BY_TYPE.get(job_type, "normal")
+    if priority not in LANES:
+        raise ValueError(f"Unknown priority: {priority}")
+    return {
+        "id": job_id or f"{queue_name}_{uuid.uuid4().hex}",
+        "type": job_type,
+        **fields,
         "data": data,
+        "priority": priority,
         "enqueued_at": _now_iso(),
+        "enqueued_ts": time.time(),
         "attempts": 0,
     }
-    redis_client.rpush(SMS_QUEUE, json.dumps(job))
+
+
+def _push(target, queue_name: str, lane: str, raws: list[str]) -> None:
+    """Append raw jobs to a lane under the configured backend."""
+    if _streams():
+        for raw in raws:
+            target.xadd(stream_key(queue_name, lane), {"job": raw})
+    else:
+        target.rpush(lane_key(queue_name, lane), *raws)
+
+
+def enqueue_jobs(queue_name: str, jobs: list[dict], pipe=None, run_at: datetime | float | None = None) -> None:
+    """Push jobs to their lanes, one command per lane (per job for streams).
+
+    Pass ``pipe`` to join the caller's pipeline. With ``run_at`` in the
+    future the jobs are scheduled instead.
+    """
+    if run_at is not None and _epoch(run_at) > time.time():
+        score = _epoch(run_at)
+        (pipe or redis_client).zadd(scheduled_key(queue_name), {json.dumps(job): score for job in jobs})
+        return
+    by_lane: dict[str, list[str]] = {}
+    for job in jobs:
+        by_lane.setdefault(_lane_of(job), []).append(json.dumps(job))
+    # XADD takes one entry per call, so batch those into a pipeline
+    batch = pipe is None and _streams()
+    target = redis_client.pipeline(transaction=False) if batch else pipe or redis_client
+    for lane, raws in by_lane.items():
+        _push(target, queue_name, lane, raws)
+    if batch:
+        target.execute()
+
+
+def _enqueue_one(queue_name: str, job: dict, run_at, dedupe_key: str | None) -> str:
+    if dedupe_key is None:
+        enqueue_jobs(queue_name, [job], run_at=run_at)
+        return job["id"]
+    return enqueue_unique(queue_name, job, rk("queue", queue_name, "dedupe", dedupe_key), run_at=run_at)
+
+
+def push_email_job(
+    email_type: str,
+    to_email: str,
+    data: dict,
+    job_id: str | None = None,
+    priority: str | None = None,
+    run_at: datetime | float | None = None,
+    dedupe_key: str | None = None,
+) -> str:
+    job = new_job("email", email_type, {"to": to_email}, data, job_id, priority)
+    return _enqueue_one("email", job, run_at, dedupe_key)
+
+
+def push_sms_job(
+    sms_type: str,
+    mobile: str,
+    data: dict,
+    job_id: str | None = None,
+    priority: str | None = None,
+    run_at: datetime | float | None = None,
+    dedupe_key: str | None = None,
+) -> str:
+    job = new_job("sms", sms_type, {"mobile": mobile}, data, job_id, priority)
+    return _enqueue_one("sms", job, run_at, dedupe_key)
+
+
+def push_newsletter_job(
+    job_type: str,
+    data: dict,
+    job_id: str | None = None,
+    run_at: datetime | float | None = None,
+    dedupe_key: str | None = None,
+) -> str:
+    job = new_job("newsletter", job_type, {}, data, job_id)
+    return _enqueue_one("newsletter", job, run_at, dedupe_key)
+
+
+# Lua counterpart of _push for scripts that hand jobs to a lane; callers
+# pass the backend so the same script serves lists and streams
+LUA_PUSH = """
+local function push(backend, key, raw)
+    if backend == 'streams' then
+        redis.call('XADD', key, '*', 'job', raw)
+    else
+        redis.call('RPUSH', key, raw)
+    end
+end
+"""
+
+# Move up to ARGV[2] jobs scored <= ARGV[1] from the scheduled set KEYS[1]
+# to the tail of their lane (KEYS[2..4] = high, normal, low); ARGV[3] = backend
+PROMOTE_SCRIPT = LUA_PUSH + """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local lanes = {high = KEYS[2], normal = KEYS[3], low = KEYS[4]}
+for _, raw in ipairs(due) do
+    redis.call('ZREM', KEYS[1], raw)
+    local ok, job = pcall(cjson.decode, raw)
+    local dest = KEYS[3]
+    if ok and type(job) == 'table' and lanes[job.priority] then
+        dest = lanes[job.priority]
+    end
+    push(ARGV[3], dest, raw)
+end
+return #due
+"""
+_promote = None
+
+
+def promote_due_jobs(queue_name: str, limit: int = 1000, now: float | None = None) -> int:
+    """Move scheduled jobs whose time has come onto their lanes. Returns how many moved."""
+    global _promote
+    if _promote is None:
+        _promote = redis_client.register_script(PROMOTE_SCRIPT)
+    keys = [scheduled_key(queue_name), *_lane_keys(queue_name)]
+    args = [time.time() if now is None else now, limit, settings.QUEUE_BACKEND]
+    return int(_promote(keys=keys, args=args) or 0)
+
+
+# Push one job only if no job holds the dedupe key KEYS[1]; the key is
+# claimed with the job id for ARGV[3] seconds in the same call, so two
+# producers racing on one key push once and a failed push claims nothing.
+# KEYS[2] is the job's lane, or the scheduled set when ARGV[5] is a score.
+# ARGV: backend, job id, ttl, raw job, score or ''. Returns the holder's id.
+ENQUEUE_UNIQUE_SCRIPT = LUA_PUSH + """
+local holder = redis.call('GET', KEYS[1])
+if holder then
+    return holder
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', tonumber(ARGV[3]))
+if ARGV[5] ~= '' then
+    redis.call('ZADD', KEYS[2], tonumber(ARGV[5]), ARGV[4])
+else
+    push(ARGV[1], KEYS[2], ARGV[4])
+end
+return ARGV[2]
+"""
+_enqueue_unique = None
+
+
+def enqueue_unique(
+    queue_name: str,
+    job: dict,
+    key: str,
+    ttl: int | None = None,
+    run_at: datetime | float | None = None,
+) -> str:
+    """Enqueue a job unless the dedupe ``key`` (a full Redis key) was claimed
+    by another job in the last ``ttl`` seconds (JOB_IDEMPOTENCY_TTL).
+
+    Returns the id of the job holding the key: this job's id if it was
+    enqueued, the earlier job's otherwise.
+    """
+    global _enqueue_unique
+    if _enqueue_unique is None:
+        _enqueue_unique = redis_client.register_script(ENQUEUE_UNIQUE_SCRIPT)
+    score = ""
+    if run_at is not None and _epoch(run_at) > time.time():
+        score, dest = _epoch(run_at), scheduled_key(queue_name)
+    elif _streams():
+        dest = stream_key(queue_name, _lane_of(job))
+    else:
+        dest = lane_key(queue_name, _lane_of(job))
+    ttl = ttl or settings.JOB_IDEMPOTENCY_TTL
+    args = [settings.QUEUE_BACKEND, job["id"], ttl, json.dumps(job), score]
+    return _enqueue_unique(keys=[key, dest], args=args)
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: half the step fixed, half random, capped."""
+    step = min(settings.QUEUE_RETRY_MAX_SECONDS, settings.QUEUE_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return step / 2 + random.uniform(0, step / 2)
+
+
+# Move the head of the first non-empty lane (KEYS[1..n-1], in order) to the
+# processing list KEYS[n]
+RESERVE_SCRIPT = """
+for i = 1, #KEYS - 1 do
+    local raw = redis.call('LMOVE', KEYS[i], KEYS[#KEYS], 'LEFT', 'RIGHT')
+    if raw then return raw end
+end
+return false
+"""
+_reserve = None
+
+# Streams backend: read the next new entry of the first non-empty lane stream
+# (KEYS, in order) for consumer ARGV[2] of group ARGV[1].
+# Returns {lane index, entry id, raw job}.
+STREAM_RESERVE_SCRIPT = """
+for i = 1, #KEYS do
+    local reply = redis.call('XREADGROUP', 'GROUP', ARGV[1], ARGV[2], 'COUNT', 1, 'STREAMS', KEYS[i], '>')
+    if reply then
+        local entry = reply[1][2][1]
+        for j = 1, #entry[2], 2 do
+            if entry[2][j] == 'job' then return {i, entry[1], entry[2][j + 1]} end
+        end
+    end
+end
+return false
+"""
+_stream_reserve = None
+
+
+def _stream_handle(lane: str, entry_id: str) -> str:
+    return f"{lane}:{entry_id}"
+
+
+def _parse_stream_handle(queue_name: str, handle: str) -> tuple[str, str]:
+    lane, entry_id = handle.split(":", 1)
+    return stream_key(queue_name, lane), entry_id
+
+
+def _reserve_stream_job(
+    queue_name: str, worker_id: str, timeout: float, order: list[str]
+) -> tuple[str, dict] | None:
+    global _stream_reserve
+    if _stream_reserve is None:
+        _stream_reserve = redis_client.register_script(STREAM_RESERVE_SCRIPT)
+    group = settings.QUEUE_STREAM_GROUP
+    deadline = time.monotonic() + timeout
+    while True:
+        reply = _stream_reserve(keys=_lane_keys(queue_name, order), args=[group, worker_id])
+        if reply:
+            index, entry_id, raw = reply
+            return _stream_handle(order[int(index) - 1], entry_id), json.loads(raw)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        # Wake immediately for high-priority work, re-check other lanes periodically
+        block_ms = max(1, int(min(IDLE_POLL_SECONDS, remaining) * 1000))
+        reply = redis_client.xreadgroup(
+            group, worker_id, {stream_key(queue_name, "high"): ">"}, count=1, block=block_ms
+        )
+        if reply:
+            entry_id, fields = reply[0][1][0]
+            return _stream_handle("high", entry_id), json.loads(fields["job"])
+
+
+def ensure_consumer_groups(queue_name: str) -> None:
+    """Create the consumer group on every lane stream (streams backend only). Idempotent."""
+    if not _streams():
+        return
+    for key in _lane_keys(queue_name):
+        try:
+            # From id 0 so jobs added before the first worker started are read too
+            redis_client.xgroup_create(key, settings.QUEUE_STREAM_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+
+def reserve_job(
+    queue_name: str, worker_id: str, timeout: float, order: list[str] | None = None
+) -> tuple[str, dict] | None:
+    """Atomically move the next job into this worker's processing list.
+
+    Lanes are tried in ``order`` (default: by priority). Returns (raw, job);
+    ``raw`` is needed to ack/retry/fail the job. Under the streams backend
+    the job is instead delivered to consumer ``worker_id`` of the group and
+    ``raw`` is an opaque handle to the entry.
+    """
+    if _streams():
+        return _reserve_stream_job(queue_name, worker_id, timeout, list(order or LANES))
+    global _reserve
+    if _reserve is None:
+        _reserve = redis_client.register_script(RESERVE_SCRIPT)
+    processing = processing_key(queue_name, worker_id)
+    keys = [lane_key(queue_name, lane) for lane in (order or LANES)] + [processing]
+    deadline = time.monotonic() + timeout
+    while True:
+        raw = _reserve(keys=keys)
+        if not raw:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # Wake immediately for high-priority work, re-check other lanes periodically
+            raw = redis_client.blmove(
+                lane_key(queue_name, "high"), processing, min(IDLE_POLL_SECONDS, remaining), "LEFT", "RIGHT"
+            )
+        if raw:
+            return raw, json.loads(raw)
+
+
+def _release(target, queue_name: str, worker_id: str, raw: str) -> None:
+    """Drop the reserved copy of a job: LREM it, or XACK + XDEL the stream entry."""
+    if _streams():
+        key, entry_id = _parse_stream_handle(queue_name, raw)
+        target.xack(key, settings.QUEUE_STREAM_GROUP, entry_id)
+        target.xdel(key, entry_id)
+    else:
+        target.lrem(processing_key(queue_name, worker_id), 1, raw)
+
+
+def processed_key(queue_name: str, job_id: str) -> str:
+    return rk("queue", queue_name, "done", job_id)
+
+
+def was_processed(queue_name: str, job_id: str | None) -> bool:
+    """Whether a job with this id completed within QUEUE_PROCESSED_TTL."""
+    return bool(job_id) and bool(redis_client.exists(processed_key(queue_name, job_id)))
+
+
+def ack_job(queue_name: str, worker_id: str, raw: str, job_id: str | None = None) -> None:
+    """Release a completed job. With ``job_id`` the id is also remembered
+    (see was_processed) so a redelivered copy of the job is not run again."""
+    if not _streams() and not job_id:
+        redis_client.lrem(processing_key(queue_name, worker_id), 1, raw)
+        return
+    pipe = redis_client.pipeline(transaction=True)
+    if job_id:
+        pipe.set(processed_key(queue_name, job_id), 1, ex=settings.QUEUE_PROCESSED_TTL)
+    _release(pipe, queue_name, worker_id, raw)
+    pipe.execute()
+
+
+def retry_job(queue_name: str, worker_id: str, raw: str, job: dict, delay: float = 0) -> None:
+    """Put an updated copy of the job back and release the reserved one.
+
+    With ``delay`` the copy is scheduled that many seconds ahead instead.
+    """
+    pipe = redis_client.pipeline(transaction=True)
+    if delay > 0:
+        pipe.zadd(scheduled_key(queue_name), {json.dumps(job): time.time() + delay})
+    else:
+        _push(pipe, queue_name, _lane_of(job), [json.dumps(job)])
+    _release(pipe, queue_name, worker_id, raw)
+    pipe.execute()
+
+
+def fail_job(
+    queue_name: str, worker_id: str, raw: str, job: dict, error: str, error_type: str = "Error"
+) -> None:
+    """Move a reserved job to the dead letter stream, trimming it to QUEUE_DLQ_MAXLEN."""
+    job = {**job, "failed_at": _now_iso(), "error": error}
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.xadd(
+        _dlq_key(queue_name),
+        {"job": json.dumps(job), "error_type": error_type},
+        maxlen=settings.QUEUE_DLQ_MAXLEN,
+        approximate=True,
+    )
+    _release(pipe, queue_name, worker_id, raw)
+    pipe.execute()
+
+
+def heartbeat(queue_name: str, worker_id: str, held=()) -> None:
+    """Mark the worker alive. Under streams, ``held`` (reserved handles) are
+    re-claimed by the worker so slow jobs do not look idle to the reaper."""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zadd(workers_key(queue_name), {worker_id: time.time()})
+    if _streams():
+        by_key: dict[str, list[str]] = {}
+        for handle in held:
+            key, entry_id = _parse_stream_handle(queue_name, handle)
+            by_key.setdefault(key, []).append(entry_id)
+        for key, ids in by_key.items():
+            pipe.xclaim(key, settings.QUEUE_STREAM_GROUP, worker_id, 0, ids, justid=True)
+    pipe.execute()
+
+
+def unregister_worker(queue_name: str, worker_id: str) -> None:
+    """Graceful shutdown: hand back anything still reserved and stop heartbeating."""
+    if _streams():
+        for key in _lane_keys(queue_name):
+            _run_stream_script("release", key, [settings.QUEUE_STREAM_GROUP, worker_id])
+        redis_client.zrem(workers_key(queue_name), worker_id)
+        return
+    # A deadline beyond any timestamp makes the worker count as stale
+    _reap_script(keys=_reap_keys(queue_name, worker_id), args=[worker_id, 2 ** 53])
+
+
+# Requeue a silent worker's processing list at the head of each job's lane
+# (oldest first) and forget the worker. The heartbeat is re-checked inside
+# the script so two reapers, or a worker that just came back, cannot race it.
+# KEYS: workers zset, processing list, high, normal, low lanes
+REAP_SCRIPT = """
+local beat = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if beat and tonumber(beat) >= tonumber(ARGV[2]) then
+    return 0
+end
+local lanes = {high = KEYS[3], normal = KEYS[4], low = KEYS[5]}
+local moved = 0
+while true do
+    local raw = redis.call('RPOP', KEYS[2])
+    if not raw then break end
+    local ok, job = pcall(cjson.decode, raw)
+    local dest = KEYS[4]
+    if ok and type(job) == 'table' and lanes[job.priority] then
+        dest = lanes[job.priority]
+    end
+    redis.call('LPUSH', dest, raw)
+    moved = moved + 1
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+return moved
+"""
+_reap = None
+
+
+def _reap_keys(queue_name: str, worker_id: str) -> list[str]:
+    return [
+        workers_key(queue_name),
+        processing_key(queue_name, worker_id),
+        *(lane_key(queue_name, lane) for lane in LANES),
+    ]
+
+
+def _reap_script(keys: list[str], args: list) -> int:
+    global _reap
+    if _reap is None:
+        _reap = redis_client.register_script(REAP_SCRIPT)
+    return int(_reap(keys=keys, args=args) or 0)
+
+
+# Streams backend: ack and delete a pending entry, re-adding its job as a
+# fresh entry at the tail so any consumer of the group can read it
+LUA_REQUEUE_ENTRY = """
+local function requeue(key, group, id, fields)
+    for i = 1, #(fields or {}), 2 do
+        if fields[i] == 'job' then redis.call('XADD', key, '*', 'job', fields[i + 1]) end
+    end
+    redis.call('XACK', key, group, id)
+    redis.call('XDEL', key, id)
+end
+"""
+
+# XAUTOCLAIM every entry of stream KEYS[1] idle for ARGV[2] ms in group
+# ARGV[1] to the reaper's own consumer ARGV[3] and requeue it
+STREAM_REAP_SCRIPT = LUA_REQUEUE_ENTRY + """
+local moved, cursor = 0, '0-0'
+repeat
+    local reply = redis.call('XAUTOCLAIM', KEYS[1], ARGV[1], ARGV[3], ARGV[2], cursor, 'COUNT', 100)
+    cursor = reply[1]
+    for _, entry in ipairs(reply[2]) do
+        requeue(KEYS[1], ARGV[1], entry[1], entry[2])
+        moved = moved + 1
+    end
+until cursor == '0-0'
+redis.call('XGROUP', 'DELCONSUMER', KEYS[1], ARGV[1], ARGV[3])
+return moved
+"""
+
+# Requeue everything pending for consumer ARGV[2] of group ARGV[1] in stream
+# KEYS[1], then remove the consumer
+STREAM_RELEASE_SCRIPT = LUA_REQUEUE_ENTRY + """
+local moved = 0
+repeat
+    local pending = redis.call('XPENDING', KEYS[1], ARGV[1], '-', '+', 100, ARGV[2])
+    for _, p in ipairs(pending) do
+        local entry = redis.call('XRANGE', KEYS[1], p[1], p[1])[1]
+        requeue(KEYS[1], ARGV[1], p[1], entry and entry[2])
+        moved = moved + 1
+    end
+until #pending == 0
+redis.call('XGROUP', 'DELCONSUMER', KEYS[1], ARGV[1], ARGV[2])
+return moved
+"""
+_stream_scripts: dict = {}
+
+
+def _run_stream_script(name: str, key: str, args: list) -> int:
+    if name not in _stream_scripts:
+        source = STREAM_REAP_SCRIPT if name == "reap" else STREAM_RELEASE_SCRIPT
+        _stream_scripts[name] = redis_client.register_script(source)
+    return int(_stream_scripts[name](keys=[key], args=args) or 0)
+
+
+def _reap_stream_jobs(queue_name: str, timeout: float) -> int:
+    group = settings.QUEUE_STREAM_GROUP
+    idle_ms = int(timeout * 1000)
+    moved = 0
+    for key in _lane_keys(queue_name):
+        moved += _run_stream_script("reap", key, [group, idle_ms, f"reaper-{uuid.uuid4().hex[:8]}"])
+        # Forget consumers that went away with nothing pending; live ones re-register on read
+        for consumer in redis_client.xinfo_consumers(key, group):
+            if consumer["pending"] == 0 and consumer["idle"] >= idle_ms:
+                redis_client.xgroup_delconsumer(key, group, consumer["name"])
+    redis_client.zremrangebyscore(workers_key(queue_name), "-inf", time.time() - timeout)
+    return moved
+
+
+def reap_stuck_jobs(queue_name: str, visibility_timeout: float | None = None) -> int:
+    """Requeue jobs held by workers whose heartbeat is older than the visibility timeout.
+
+    Under the streams backend: requeue entries not acked within the timeout.
+    """
+    timeout = settings.QUEUE_VISIBILITY_TIMEOUT if visibility_timeout is None else visibility_timeout
+    if _streams():
+        return _reap_stream_jobs(queue_name, timeout)
+    deadline = time.time() - timeout
+    moved = 0
+    for worker_id in redis_client.zrangebyscore(workers_key(queue_name), "-inf", deadline):
+        moved += _reap_script(keys=_reap_keys(queue_name, worker_id), args=[worker_id, deadline])
+    return moved
+
+
+def _stream_group(reply) -> dict:
+    """Our group's entry in an XINFO GROUPS reply ({} if the stream or group is missing)."""
+    if isinstance(reply, Exception):
+        return {}
+    return next((g for g in reply if g["name"] == settings.QUEUE_STREAM_GROUP), {})
+
+
+def _stream_queue_stats() -> dict:
+    pipe = redis_client.pipeline(transaction=False)
+    for name in QUEUE_NAMES:
+        for lane in LANES:
+            pipe.xlen(stream_key(name, lane))
+            pipe.xinfo_groups(stream_key(name, lane))
+        pipe.xlen(_dlq_key(name))
+        pipe.zcard(scheduled_key(name))
+    replies = iter(pipe.execute(raise_on_error=False))
+
+    stats = {}
+    for name in QUEUE_NAMES:
+        lanes, processing = {}, 0
+        for lane in LANES:
+            length, group = next(replies), _stream_group(next(replies))
+            # Acked entries are deleted, so the stream holds waiting + pending ones
+            lanes[lane] = length - group.get("pending", 0)
+            processing += group.get("pending", 0)
+        stats[name] = {
+            "pending": sum(lanes.values()),
+            "lanes": lanes,
+            "processing": processing,
+            "dead_letter": next(replies),
+            "scheduled": next(replies),
+        }
+    return stats
+
+
+def get_consumer_groups(queue_name: str) -> dict:
+    """Streams backend: per lane, the group's lag and pending count and each consumer's backlog."""
+    group = settings.QUEUE_STREAM_GROUP
+    pipe = redis_client.pipeline(transaction=False)
+    for lane in LANES:
+        pipe.xlen(stream_key(queue_name, lane))
+        pipe.xinfo_groups(stream_key(queue_name, lane))
+        pipe.xinfo_consumers(stream_key(queue_name, lane), group)
+    replies = iter(pipe.execute(raise_on_error=False))
+
+    lanes = {}
+    for lane in LANES:
+        length, info, consumers = next(replies), _stream_group(next(replies)), next(replies)
+        pending = info.get("pending", 0)
+        lag = info.get("lag")
+        lanes[lane] = {
+            "group": group,
+            # XINFO reports no lag when it cannot tell; fall back to undelivered entries
+            "lag": lag if lag is not None else max(length - pending, 0),
+            "pending": pending,
+            "consumers": {} if isinstance(consumers, Exception) else {
+                c["name"]: {"pending": c["pending"], "idle_ms": c["idle"]} for c in consumers
+            },
+        }
+    return lanes
 
 
 def get_queue_stats() -> dict:
-    return {
-        "email": {
-            "pending": redis_client.llen(EMAIL_QUEUE),
-            "processing": redis_client.scard(EMAIL_PROCESSING),
-            "dlq": redis_client.llen(EMAIL_DLQ),
-        },
-        "sms": {
-            "pending": redis_client.llen(SMS_QUEUE),
-            "processing": redis_client.scard(SMS_PROCESSING),
-            "dlq": redis_client.llen(SMS_DLQ),
-        },
-    }
+    """Depths of every queue in two round trips."""
+    if _streams():
+        return _stream_queue_stats()
+    pipe = redis_client.pipeline(transaction=False)
+    for name in QUEUE_NAMES:
+        for lane in LANES:
+            pipe.llen(lane_key(name, lane))
+        pipe.xlen(_dlq_key(name))
+        pipe.zcard(scheduled_key(name))
+        pipe.zrange(workers_key(name), 0, -1)
+    replies = iter(pipe.execute())
+
+    stats, workers = {}, {}
+    for name in QUEUE_NAMES:
+        lanes = {lane: next(replies) for lane in LANES}
+        stats[name] = {
+            "pending": sum(lanes.values()),
+            "lanes": lanes,
+            "processing": 0,
+            "dead_letter": next(replies),
+            "scheduled": next(replies),
+        }
+        workers[name] = next(replies)
+
+    if any(workers.values()):
+        pipe = redis_client.pipeline(transaction=False)
+        for name, ids in workers.items():
+            for worker_id in ids:
+                pipe.llen(processing_key(name, worker_id))
+        replies = iter(pipe.execute())
+        for name, ids in workers.items():
+            stats[name]["processing"] = sum(next(replies) for _ in ids)
+    return stats
 
 
 def _dlq_key(queue_name: str) -> str:
-    return EMAIL_DLQ if queue_name == "email" else SMS_DLQ
+    return rk("queue", queue_name, "dead")
 
 
-def _queue_key(queue_name: str) -> str:
-    return EMAIL_QUEUE if queue_name == "email" else SMS_QUEUE
+def _legacy_dlq_key(queue_name: str) -> str:
+    return rk("queue", queue_name, "dlq")
 
 
-def get_dead_letter_jobs(queue_name: str) -> list[dict]:
-    raw = redis_client.lrange(_dlq_key(queue_name), 0, -1)
-    jobs = []
-    for r in raw:
+def migrate_legacy_dlq(queue_name: str) -> int:
+    """Move entries of the old list-based DLQ into the stream. Safe to run concurrently."""
+    moved = 0
+    while (raw := redis_client.lpop(_legacy_dlq_key(queue_name))) is not None:
         try:
-            jobs.append(json.loads(r))
+            error_type = json.loads(raw).get("error_type", "Error")
         except Exception:
-            jobs.append({"raw": r})
-    return jobs
-
-
-def retry_dead_letter_job(queue_name: str, index: int) -> bool:
-    dlq = _dlq_key(queue_name)
-    items = redis_client.lrange(dlq, 0, -1)
-    if index < 0 or index >= len(items):
-        return False
-    job_str = items.pop(index)
-    # Push back to main queue
-    redis_client.rpush(_queue_key(queue_name), job_str)
-    # Rebuild DLQ list
-    redis_client.delete(dlq)
-    for item in items:
-        redis_client.rpush(dlq, item)
-    return True
+            error_type = "Error"
+        redis_client.xadd(_dlq_key(queue_name), {"job": raw, "error_type": error_type})
+        moved += 1
+    return moved
+
+
+def _dead_letter_entry(entry_id: str, fields: dict) -> dict:
+    try:
+        job = json.loads(fields.get("job", ""))
+    except Exception:
+        job = {"raw": fields.get("job")}
+    return {**job, "dlq_id": entry_id, "error_type": fields.get("error_type")}
+
+
+def get_dead_letter_jobs(queue_name: str, count: int = 50, before: str | None = None) -> list[dict]:
+    """One page of dead-lettered jobs, newest first.
+
+    Pass the ``dlq_id`` of the last job of a page as ``before`` to get the next one.
+    """
+    end = f"({before}" if before else "+"
+    entries = redis_client.xrevrange(_dlq_key(queue_name), end, "-", count=count)
+    return [_dead_letter_entry(entry_id, fields) for entry_id, fields in entries]
+
+
+# Requeue dead-lettered entries onto their lane, deleting each entry in the
+# same call so concurrent retries of one entry cannot both push it: a job is
+# only pushed if this call is the one that removed its entry.
+# KEYS: dlq stream; ARGV: backend, then (entry id, lane key, job) triples
+REQUEUE_DEAD_SCRIPT = LUA_PUSH + """
+local moved = 0
+for n = 2, #ARGV, 3 do
+    if redis.call('XDEL', KEYS[1], ARGV[n]) == 1 then
+        push(ARGV[1], ARGV[n + 1], ARGV[n + 2])
+        moved = moved + 1
+    end
+end
+return moved
+"""
+_requeue_dead = None
+
+
+def _requeue_dead_letter(queue_name: str, entries: list[tuple[str, dict]]) -> int:
+    """Requeue the given ``(entry_id, fields)`` DLQ entries with attempts reset.
+
+    The job is patched here rather than in Lua: cjson would turn empty lists
+    in the payload into objects. Entries whose job does not decode stay put.
+    """
+    global _requeue_dead
+    if _requeue_dead is None:
+        _requeue_dead = redis_client.register_script(REQUEUE_DEAD_SCRIPT)
+    args = [settings.QUEUE_BACKEND]
+    for entry_id, fields in entries:
+        try:
+            job = json.loads(fields.get("job") or "")
+        except ValueError:
+            continue
+        if not isinstance(job, dict):
+            continue
+        for field in ("error", "failed_at", "failedAt"):
+            job.pop(field, None)
+        job["attempts"] = 0
+        args += [entry_id, _lane_keys(queue_name, [_lane_of(job)])[0], json.dumps(job)]
+    if len(args) == 1:
+        return 0
+    return int(_requeue_dead(keys=[_dlq_key(queue_name)], args=args) or 0)
+
+
+def retry_dead_letter_job(queue_name: str, entry_id: str) -> bool:
+    """Requeue one dead-lettered job by its ``dlq_id``."""
+    entries = redis_client.xrange(_dlq_key(queue_name), entry_id, entry_id)
+    return _requeue_dead_letter(queue_name, entries) == 1
+
+
+def replay_dead_letter_jobs(
+    queue_name: str,
+    error_type: str | None = None,
+    since: datetime | float | None = None,
+    until: datetime | float | None = None,
+    limit: int = 1000,
+) -> int:
+    """Requeue up to ``limit`` dead-lettered jobs, oldest first, matching the filters.
+
+    ``since``/``until`` bound the time the job was dead-lettered (stream ids
+    are millisecond timestamps, so the range is read directly).
+    """
+    start = str(int(_epoch(since) * 1000)) if since is not None else "-"
+    end = str(int(_epoch(until) * 1000)) if until is not None else "+"
+    replayed = 0
+    while replayed < limit:
+        entries = redis_client.xrange(_dlq_key(queue_name), start, end, count=DLQ_PAGE_SIZE)
+        if not entries:
+            break
+        matching = [
+            (entry_id, fields) for entry_id, fields in entries
+            if error_type is None or fields.get("error_type") == error_type
+        ][: limit - replayed]
+        if matching:
+            replayed += _requeue_dead_letter(queue_name, matching)
+        start = f"({entries[-1][0]}"
+    return replayed
 
 
 def clear_dead_letter_queue(queue_name: str) -> int:
-    dlq = _dlq_key(queue_name)
-    count = redis_client.llen(dlq)
-    if count:
-        redis_client.delete(dlq)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.xlen(_dlq_key(queue_name))
+    pipe.delete(_dlq_key(queue_name))
+    count, _ = pipe.execute()
     return count
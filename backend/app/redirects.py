@@ -0,0 +1,172 @@
+"""In-memory SEO redirect engine.
+
+Active SEORedirect rows are compiled into a RedirectTable: a dict for exact
+source paths plus a path-segment trie for prefix rules (source ending in
+``/*``; a ``*`` in the target is replaced by the unmatched remainder).
+RedirectMiddleware matches each request against the current table in
+O(path length) without touching the database.
+
+The table is rebuilt on startup, whenever an admin change is published on
+REDIRECTS_CHANNEL, and every REDIRECTS_RELOAD_INTERVAL seconds as a safety
+net for missed messages. Rebuilds swap the table reference atomically.
+"""
+import logging
+import threading
+from dataclasses import dataclass, field
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .database import SessionLocal
+from .models import SEORedirect
+from .redis_client import publish, redis_client
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+REDIRECTS_CHANNEL = "events:redirects"
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+@dataclass
+class _Node:
+    children: dict = field(default_factory=dict)
+    rule: tuple[str, int] | None = None
+
+
+def normalize_path(path: str) -> str:
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+    return path
+
+
+class RedirectTable:
+    """Immutable once built; lookups are safe from any thread."""
+
+    def __init__(self, rules: list[tuple[str, str, int]]):
+        self.exact: dict[str, tuple[str, int]] = {}
+        self.root = _Node()
+        for source, target, status in rules:
+            status = status if status in REDIRECT_STATUSES else 301
+            if source.endswith("/*"):
+                node = self.root
+                for segment in source[:-2].strip("/").split("/"):
+                    if segment:
+                        node = node.children.setdefault(segment, _Node())
+                node.rule = (target, status)
+            else:
+                self.exact[normalize_path(source)] = (target, status)
+
+    def __len__(self) -> int:
+        return len(self.exact) + self._count(self.root)
+
+    def _count(self, node: _Node) -> int:
+        return (node.rule is not None) + sum(self._count(c) for c in node.children.values())
+
+    def match(self, path: str) -> tuple[str, int] | None:
+        """Return (location, status) for ``path`` or None. Exact rules win over prefixes."""
+        path = normalize_path(path)
+        hit = self.exact.get(path)
+        if hit:
+            return hit
+
+        segments = [s for s in path.strip("/").split("/") if s]
+        node, best, depth = self.root, self.root.rule, 0
+        for i, segment in enumerate(segments):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.rule is not None:
+                best, depth = node.rule, i + 1
+        if best is None:
+            return None
+        target, status = best
+        if "*" in target:
+            target = target.replace("*", "/".join(segments[depth:]), 1)
+        return target, status
+
+
+def load_rules(db: Session) -> list[tuple[str, str, int]]:
+    rows = db.execute(
+        select(SEORedirect.source_path, SEORedirect.target_path, SEORedirect.http_status)
+        .where(SEORedirect.is_active == True)
+        .order_by(SEORedirect.id)
+    ).all()
+    return [(source, target, status or 301) for source, target, status in rows]
+
+
+class RedirectEngine:
+    def __init__(self):
+        self.table = RedirectTable([])
+        self._listener: threading.Thread | None = None
+
+    def load(self, db: Session) -> None:
+        self.table = RedirectTable(load_rules(db))
+
+    def reload(self) -> None:
+        db = SessionLocal()
+        try:
+            self.load(db)
+            logger.info(f"Loaded {len(self.table)} SEO redirects")
+        except Exception as e:
+            logger.error(f"Failed to load SEO redirects: {e}")
+        finally:
+            db.close()
+
+    def match(self, path: str) -> tuple[str, int] | None:
+        return self.table.match(path)
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIRECTS_CHANNEL)
+                while True:
+                    # A timeout with no message doubles as the periodic reload
+                    pubsub.get_message(timeout=settings.REDIRECTS_RELOAD_INTERVAL)
+                    self.reload()
+            except Exception as e:
+                logger.warning(f"Redirect listener error, periodic reload only: {e}")
+                threading.Event().wait(settings.REDIRECTS_RELOAD_INTERVAL)
+                self.reload()
+
+    def start(self) -> None:
+        self.reload()
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name="redirect-listener", daemon=True)
+            self._listener.start()
+
+
+redirect_engine = RedirectEngine()
+
+
+def notify_redirects_changed() -> None:
+    """Tell every API process to rebuild its redirect table."""
+    publish(REDIRECTS_CHANNEL, {"reload": True})
+
+
+class RedirectMiddleware:
+    """Pure ASGI middleware answering matched GET/HEAD requests with a redirect."""
+
+    def __init__(self, app, engine: RedirectEngine = redirect_engine):
+        self.app = app
+        self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        hit = self.engine.match(scope["path"])
+        if hit is None:
+            return await self.app(scope, receive, send)
+
+        location, status = hit
+        query = scope.get("query_string", b"")
+        if query and "?" not in location:
+            location = f"{location}?{query.decode('latin-1')}"
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"location", location.encode("utf-8")), (b"content-length", b"0")],
+        })
+        await send({"type": "http.response.body", "body": b""})
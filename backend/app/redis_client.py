@@ -3,7 +3,10 @@ For advanced async patterns see docs/08-REDIS-ARCHITECTURE.md; this keeps
 integration simple with existing sync endpoints while exposing core features.
 """
 import json
+import random
+import threading
 import time
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Callable
 from .config import get_settings
 
@@ -18,11 +21,17 @@ class MockRedis:
     def incr(self, key, amount=1) -> int: return 1
     def expire(self, key, ttl) -> bool: return True
     def ttl(self, key) -> int: return -1
-    def pipeline(self): return MockPipeline()
+    def exists(self, *keys) -> int: return 0
+    def pipeline(self, transaction=True): return MockPipeline()
     def zincrby(self, key, amount, member) -> float: return float(amount)
     def zrevrange(self, key, start, end, withscores=False) -> list: return []
+    def zrangebyscore(self, key, min, max) -> list: return []
+    def mget(self, keys) -> list: return []
     def sadd(self, key, *members) -> int: return 0
-    def scan_iter(self, match=None): return iter([])
+    def pfadd(self, key, *values) -> int: return 0
+    def pfcount(self, *keys) -> int: return 0
+    def pfmerge(self, dest, *sources) -> bool: return True
+    def scan_iter(self, match=None, count=None): return iter([])
     def lpush(self, key, *values) -> int: return 0
     def llen(self, key) -> int: return 0
     def publish(self, channel, message) -> int: return 0
@@ -122,16 +131,195 @@ def rate_limit(identifier: str, limit: int, window_seconds: int) -> tuple[bool,
 
 
 # Offer click tracking + trending
+# Unique viewers are HyperLogLogs (~0.81% error, <=12KB each) bucketed per
+# UTC day and ISO week, plus an all-time sketch. Exact counts, where really
+# needed, come from offer_clicks (COUNT(DISTINCT user_id)).
+VIEWERS_DAILY_TTL = 60 * 60 * 24 * 35
+VIEWERS_WEEKLY_TTL = 60 * 60 * 24 * 400
+VIEWERS_RANGE_TTL = 300  # PFMERGE results cached for repeated range queries
+
+
+def _viewers_key(offer_id: int, bucket: str) -> str:
+    return rk("offer", str(offer_id), "viewers", bucket)
+
+
+def _day_bucket(day: date) -> str:
+    return f"d{day:%Y%m%d}"
+
+
+def _week_bucket(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"w{year}{week:02d}"
+
+
+class HotKeyTracker:
+    """Decides which offers get sharded click counters.
+
+    Each process counts its own clicks per offer in a sliding one-second
+    window; crossing HOT_KEY_THRESHOLD promotes the offer for HOT_KEY_TTL
+    seconds in the shared ``offers:hot`` sorted set (score = expiry), so
+    every process starts sharding. The promoted set is re-read at most
+    every HOT_KEY_REFRESH_SECONDS.
+    """
+
+    def __init__(self, threshold: int, ttl: int, refresh_seconds: float):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.refresh_seconds = refresh_seconds
+        self._window = 0
+        self._counts: dict[int, int] = {}
+        self._hot: set[int] = set()
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, offer_id: int) -> bool:
+        """Count a click; returns True if this click just crossed the threshold."""
+        window = int(time.time())
+        with self._lock:
+            if window != self._window:
+                self._window = window
+                self._counts = {}
+            count = self._counts.get(offer_id, 0) + 1
+            self._counts[offer_id] = count
+        return count == self.threshold and offer_id not in self._hot
+
+    def promote(self, pipe, offer_id: int) -> None:
+        pipe.zadd(rk("offers", "hot"), {str(offer_id): time.time() + self.ttl})
+        self._hot.add(offer_id)
+
+    def is_hot(self, offer_id: int) -> bool:
+        now = time.time()
+        if now - self._refreshed_at >= self.refresh_seconds:
+            self._refreshed_at = now
+            try:
+                self._hot = {int(i) for i in redis_client.zrangebyscore(rk("offers", "hot"), now, "+inf")}
+            except Exception:
+                pass
+        return offer_id in self._hot
+
+
+hot_keys = HotKeyTracker(
+    threshold=settings.HOT_KEY_THRESHOLD,
+    ttl=settings.HOT_KEY_TTL,
+    refresh_seconds=settings.HOT_KEY_REFRESH_SECONDS,
+)
+
+
+def _click_counter_key(offer_id: int) -> str:
+    """Plain counter, or a random shard of it while the offer is hot."""
+    key = rk("offer", str(offer_id), "clicks")
+    if settings.CLICK_COUNTER_SHARDS > 1 and hot_keys.is_hot(offer_id):
+        return rk(key, f"s{random.randrange(settings.CLICK_COUNTER_SHARDS)}")
+    return key
+
+
 def track_offer_click(offer_id: int, user_id: int | None = None) -> None:
+    """Record a click in one pipelined round trip."""
     try:
-        redis_client.incr(rk("offer", str(offer_id), "clicks"))
-        redis_client.zincrby(rk("offers", "trending"), 1, str(offer_id))
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incr(_click_counter_key(offer_id))
+        pipe.zincrby(rk("offers", "trending"), 1, str(offer_id))
         if user_id:
-            redis_client.sadd(rk("offer", str(offer_id), "viewers"), str(user_id))
+            today = datetime.now(timezone.utc).date()
+            daily = _viewers_key(offer_id, _day_bucket(today))
+            weekly = _viewers_key(offer_id, _week_bucket(today))
+            pipe.pfadd(daily, str(user_id))
+            pipe.expire(daily, VIEWERS_DAILY_TTL)
+            pipe.pfadd(weekly, str(user_id))
+            pipe.expire(weekly, VIEWERS_WEEKLY_TTL)
+            pipe.pfadd(_viewers_key(offer_id, "all"), str(user_id))
+        if hot_keys.record(offer_id):
+            hot_keys.promote(pipe, offer_id)
+        pipe.execute()
     except Exception:
         return
 
 
+def get_offer_click_count(offer_id: int) -> int:
+    """Total clicks: the plain counter plus every shard (an offer may have been hot before)."""
+    key = rk("offer", str(offer_id), "clicks")
+    keys = [key] + [rk(key, f"s{i}") for i in range(settings.CLICK_COUNTER_SHARDS)]
+    try:
+        return sum(int(v) for v in redis_client.mget(keys) if v)
+    except Exception:
+        return 0
+
+
+def _range_buckets(start: date, end: date) -> list[str]:
+    """Cover [start, end] with whole ISO weeks where possible and days elsewhere."""
+    buckets = []
+    day = start
+    while day <= end:
+        week_end = day + timedelta(days=6)
+        if day.isoweekday() == 1 and week_end <= end:
+            buckets.append(_week_bucket(day))
+            day = week_end + timedelta(days=1)
+        else:
+            buckets.append(_day_bucket(day))
+            day += timedelta(days=1)
+    return buckets
+
+
+def offer_unique_viewers(offer_id: int, start: date | None = None, end: date | None = None) -> int:
+    """Approximate distinct viewers of an offer; all-time when no range is given.
+
+    Multi-bucket ranges are PFMERGEd into a short-lived key so dashboards
+    repeating the same range pay for the merge once.
+    """
+    try:
+        if start is None:
+            return int(redis_client.pfcount(_viewers_key(offer_id, "all")))
+        end = end or datetime.now(timezone.utc).date()
+        keys = [_viewers_key(offer_id, b) for b in _range_buckets(start, end)]
+        if len(keys) == 1:
+            return int(redis_client.pfcount(keys[0]))
+        merged = _viewers_key(offer_id, f"range:{start:%Y%m%d}:{end:%Y%m%d}")
+        if not redis_client.exists(merged):
+            redis_client.pfmerge(merged, *keys)
+            redis_client.expire(merged, VIEWERS_RANGE_TTL)
+        return int(redis_client.pfcount(merged))
+    except Exception:
+        return 0
+
+
+def _memory_usage(key: str) -> int:
+    """MEMORY USAGE of a key, or 0 where the command is unavailable (some managed Redis)."""
+    try:
+        return redis_client.memory_usage(key) or 0
+    except Exception:
+        return 0
+
+
+def migrate_viewer_sets(delete_sets: bool = True) -> dict:
+    """Fold legacy ``offer:{id}:viewers`` sets into the all-time HyperLogLogs.
+
+    Sets carry no timestamps, so members only land in the all-time sketch.
+    Returns key count and Redis memory before/after for reporting.
+    """
+    report = {"offers": 0, "members": 0, "set_bytes": 0, "hll_bytes": 0}
+    for key in redis_client.scan_iter(match=rk("offer", "*", "viewers"), count=1000):
+        if redis_client.type(key) != "set":
+            continue
+        offer_id = key.split(":")[1]
+        hll_key = _viewers_key(int(offer_id), "all")
+        report["set_bytes"] += _memory_usage(key)
+        batch = []
+        for member in redis_client.sscan_iter(key, count=1000):
+            batch.append(member)
+            if len(batch) >= 1000:
+                redis_client.pfadd(hll_key, *batch)
+                report["members"] += len(batch)
+                batch = []
+        if batch:
+            redis_client.pfadd(hll_key, *batch)
+            report["members"] += len(batch)
+        report["hll_bytes"] += _memory_usage(hll_key)
+        report["offers"] += 1
+        if delete_sets:
+            redis_client.delete(key)
+    return report
+
+
 def get_trending_offer_ids(limit: int = 10) -> list[int]:
     try:
         ids = redis_client.zrevrange(rk("offers", "trending"), 0, limit - 1)
@@ -172,14 +360,7 @@ def leaderboard_top(limit: int = 10) -> list[tuple[int, float]]:
         return []
 
 
-# Queues / PubSub
-def enqueue(queue_name: str, payload: Any) -> None:
-    try:
-        redis_client.lpush(queue_name, json.dumps(payload))
-    except Exception:
-        return
-
-
+# PubSub
 def publish(channel: str, payload: Any) -> None:
     try:
         redis_client.publish(channel, json.dumps(payload))
@@ -21,7 +21,7 @@ from .audit_log import AuditLogRead
 from .user_session import UserSessionRead, UserSessionCreate
 from .user_kyc import UserKYCRead, UserKCCreate
 from .merchant_commission import MerchantCommissionRead, MerchantCommissionCreate
-from .offer_view import OfferViewRead, OfferViewCreate
+from .offer_view import OfferViewRead, OfferViewCreate, OfferViewAccepted
 from .inventory import InventoryRead, InventoryUpdate
 from .payment import PaymentRead, PaymentCreate
 from .withdrawal import WithdrawalRead, WithdrawalCreate
@@ -12,3 +12,7 @@ class OfferViewRead(BaseModel):
 class OfferViewCreate(BaseModel):
     offer_id: int
     user_id: int | None = None
+
+class OfferViewAccepted(BaseModel):
+    event_id: str
+    buffered: bool
@@ -12,10 +12,12 @@ Environment Variables Required:
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+from collections import deque
 from datetime import datetime, timezone
-from typing import AsyncIterator, Dict, Any
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional
 
 import httpx
 
@@ -37,6 +39,48 @@ CUELINKS_API_KEY = os.getenv("CUELINKS_API_KEY")
 CUELINKS_PUBLISHER_ID = os.getenv("CUELINKS_PUBLISHER_ID")
 CUELINKS_BASE_URL = "https://api.cuelinks.com"
 
+# Paging: rows per request, and page requests kept in flight ahead of the
+# page being consumed (page N+1 downloads while N is imported)
+PAGE_SIZE = 500
+PAGE_PREFETCH = int(os.getenv("AFFILIATE_PAGE_PREFETCH", "2"))
+
+Page = List[Dict[str, Any]]
+
+
+async def prefetch_pages(
+    fetch_page: Callable[[int], Awaitable[Optional[Page]]],
+    prefetch: int = PAGE_PREFETCH,
+) -> AsyncIterator[Page]:
+    """Yield pages 0, 1, 2, ... in order while the next ``prefetch`` pages are
+    already being requested.
+
+    ``fetch_page`` returns a page's rows, or None when the request failed.
+    Paging stops after the first short, empty or failed page; requests made
+    past the end are cancelled.
+    """
+    ahead: deque[asyncio.Task] = deque()
+    number = 0
+    try:
+        while True:
+            while len(ahead) <= prefetch:
+                ahead.append(asyncio.create_task(fetch_page(number)))
+                number += 1
+            rows = await ahead.popleft()
+            if rows:
+                yield rows
+            if not rows or len(rows) < PAGE_SIZE:
+                return
+    finally:
+        for task in ahead:
+            task.cancel()
+        await asyncio.gather(*ahead, return_exceptions=True)
+
+
+async def _flatten(pages: AsyncIterator[Page]) -> AsyncIterator[Dict[str, Any]]:
+    async for page in pages:
+        for row in page:
+            yield row
+
 
 class AdmitadClient:
     """Admitad API client with OAuth2 authentication."""
@@ -80,13 +124,13 @@ class AdmitadClient:
             
             return self.access_token
     
-    async def fetch_transactions(
+    async def fetch_pages(
         self,
         start_date: datetime,
         end_date: datetime,
         status: str = "approved",
-    ) -> AsyncIterator[Dict[str, Any]]:
-        """Fetch transactions from Admitad API.
+    ) -> AsyncIterator[Page]:
+        """Fetch transactions from Admitad API, one page at a time.
         
         Args:
             start_date: Start date for transaction query
@@ -94,7 +138,7 @@ class AdmitadClient:
             status: Transaction status filter (approved, pending, declined)
             
         Yields:
-            Transaction dictionaries
+            Lists of transaction dictionaries
         """
         if not all([self.client_id, self.client_secret, self.refresh_token]):
             logger.warning("Admitad credentials not configured, skipping...")
@@ -109,26 +153,19 @@ class AdmitadClient:
                 "date_start": start_date.strftime("%d.%m.%Y"),
                 "date_end": end_date.strftime("%d.%m.%Y"),
                 "status": status,
-                "limit": 500,
-                "offset": 0,
+                "limit": PAGE_SIZE,
             }
             
             async with httpx.AsyncClient(timeout=60) as client:
-                while True:
-                    response = await client.get(url, headers=headers, params=params)
+                async def fetch_page(number: int) -> Optional[Page]:
+                    response = await client.get(url, headers=headers, params={**params, "offset": number * PAGE_SIZE})
                     
                     if response.status_code != 200:
                         logger.error(f"Admitad API error: {response.status_code} {response.text}")
-                        break
-                    
-                    data = response.json()
-                    results = data.get("results", [])
-                    
-                    if not results:
-                        break
+                        return None
                     
-                    for row in results:
-                        yield {
+                    return [
+                        {
                             "external_id": str(row.get("action_id")),
                             "status": row.get("status"),
                             "commission_amount": float(row.get("payment", 0) or 0),
@@ -138,15 +175,23 @@ class AdmitadClient:
                             "transaction_date": row.get("action_date"),
                             "network": "admitad",
                         }
-                    
-                    # Pagination
-                    if len(results) < params["limit"]:
-                        break
-                    
-                    params["offset"] += params["limit"]
+                        for row in response.json().get("results", [])
+                    ]
+                
+                async for page in prefetch_pages(fetch_page):
+                    yield page
         
         except Exception as e:
             logger.error(f"Admitad fetch failed: {e}", exc_info=True)
+    
+    def fetch_transactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        status: str = "approved",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Fetch transactions from Admitad API, one at a time."""
+        return _flatten(self.fetch_pages(start_date, end_date, status))
 
 
 class VCommissionClient:
@@ -156,13 +201,13 @@ class VCommissionClient:
         self.api_key = api_key
         self.base_url = VCOMMISSION_BASE_URL
     
-    async def fetch_transactions(
+    async def fetch_pages(
         self,
         start_date: datetime,
         end_date: datetime,
         status: str = "approved",
-    ) -> AsyncIterator[Dict[str, Any]]:
-        """Fetch transactions from VCommission API.
+    ) -> AsyncIterator[Page]:
+        """Fetch transactions from VCommission API, one page at a time.
         
         Args:
             start_date: Start date for transaction query
@@ -170,7 +215,7 @@ class VCommissionClient:
             status: Transaction status filter
             
         Yields:
-            Transaction dictionaries
+            Lists of transaction dictionaries
         """
         if not self.api_key:
             logger.warning("VCommission API key not configured, skipping...")
@@ -183,26 +228,19 @@ class VCommissionClient:
                 "start_date": start_date.strftime("%Y-%m-%d"),
                 "end_date": end_date.strftime("%Y-%m-%d"),
                 "status": status,
-                "page": 1,
-                "limit": 500,
+                "limit": PAGE_SIZE,
             }
             
             async with httpx.AsyncClient(timeout=60) as client:
-                while True:
-                    response = await client.get(url, params=params)
+                async def fetch_page(number: int) -> Optional[Page]:
+                    response = await client.get(url, params={**params, "page": number + 1})
                     
                     if response.status_code != 200:
                         logger.error(f"VCommission API error: {response.status_code} {response.text}")
-                        break
-                    
-                    data = response.json()
-                    transactions = data.get("transactions", [])
-                    
-                    if not transactions:
-                        break
+                        return None
                     
-                    for row in transactions:
-                        yield {
+                    return [
+                        {
                             "external_id": str(row.get("transaction_id")),
                             "status": row.get("status"),
                             "commission_amount": float(row.get("commission", 0) or 0),
@@ -212,15 +250,23 @@ class VCommissionClient:
                             "transaction_date": row.get("transaction_date"),
                             "network": "vcommission",
                         }
-                    
-                    # Pagination
-                    if len(transactions) < params["limit"]:
-                        break
-                    
-                    params["page"] += 1
+                        for row in response.json().get("transactions", [])
+                    ]
+                
+                async for page in prefetch_pages(fetch_page):
+                    yield page
         
         except Exception as e:
             logger.error(f"VCommission fetch failed: {e}", exc_info=True)
+    
+    def fetch_transactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        status: str = "approved",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Fetch transactions from VCommission API, one at a time."""
+        return _flatten(self.fetch_pages(start_date, end_date, status))
 
 
 class CueLinksClient:
@@ -235,13 +281,13 @@ class CueLinksClient:
         self.publisher_id = publisher_id
         self.base_url = CUELINKS_BASE_URL
     
-    async def fetch_transactions(
+    async def fetch_pages(
         self,
         start_date: datetime,
         end_date: datetime,
         status: str = "approved",
-    ) -> AsyncIterator[Dict[str, Any]]:
-        """Fetch transactions from CueLinks API.
+    ) -> AsyncIterator[Page]:
+        """Fetch transactions from CueLinks API, one page at a time.
         
         Args:
             start_date: Start date for transaction query
@@ -249,7 +295,7 @@ class CueLinksClient:
             status: Transaction status filter
             
         Yields:
-            Transaction dictionaries
+            Lists of transaction dictionaries
         """
         if not all([self.api_key, self.publisher_id]):
             logger.warning("CueLinks credentials not configured, skipping...")
@@ -263,31 +309,25 @@ class CueLinksClient:
                 "startDate": start_date.strftime("%Y-%m-%d"),
                 "endDate": end_date.strftime("%Y-%m-%d"),
                 "status": status,
-                "page": 1,
-                "limit": 500,
+                "limit": PAGE_SIZE,
             }
             
             async with httpx.AsyncClient(timeout=60) as client:
-                while True:
-                    response = await client.get(url, headers=headers, params=params)
+                async def fetch_page(number: int) -> Optional[Page]:
+                    response = await client.get(url, headers=headers, params={**params, "page": number + 1})
                     
                     if response.status_code != 200:
                         logger.error(f"CueLinks API error: {response.status_code} {response.text}")
-                        break
+                        return None
                     
                     data = response.json()
                     
                     if data.get("status") != "success":
                         logger.error(f"CueLinks API returned error: {data.get('message')}")
-                        break
+                        return None
                     
-                    transactions = data.get("data", {}).get("transactions", [])
-                    
-                    if not transactions:
-                        break
-                    
-                    for row in transactions:
-                        yield {
+                    return [
+                        {
                             "external_id": str(row.get("transactionId")),
                             "status": row.get("status"),
                             "commission_amount": float(row.get("publisherCommission", 0) or 0),
@@ -297,15 +337,23 @@ class CueLinksClient:
                             "transaction_date": row.get("transactionDate"),
                             "network": "cuelinks",
                         }
-                    
-                    # Pagination
-                    if len(transactions) < params["limit"]:
-                        break
-                    
-                    params["page"] += 1
+                        for row in data.get("data", {}).get("transactions", [])
+                    ]
+                
+                async for page in prefetch_pages(fetch_page):
+                    yield page
         
         except Exception as e:
             logger.error(f"CueLinks fetch failed: {e}", exc_info=True)
+    
+    def fetch_transactions(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        status: str = "approved",
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Fetch transactions from CueLinks API, one at a time."""
+        return _flatten(self.fetch_pages(start_date, end_date, status))
 
 
 # Convenience functions for workers
@@ -1,30 +1,63 @@
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from ..models import AffiliateTransaction, CashbackEvent, AffiliateClick, AffiliateMerchantMap
 from ..services.affiliate_clients import AdmitadClient, VCommissionClient, CueLinksClient
 from ..config import get_settings
-from typing import List
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
 import asyncio
 from datetime import datetime, timedelta
 from ..metrics import observe_affiliate_sync
 
 settings = get_settings()
 
-async def fetch_all():
-    """Fetch transactions from all affiliate networks for the last 30 days."""
+Batch = List[Tuple[str, dict]]
+
+# Ids per lookup query, well below the Postgres 65535 bind parameter limit
+LOOKUP_CHUNK = 5000
+
+async def fetch_all() -> AsyncIterator[Batch]:
+    """Fetch transactions from all affiliate networks for the last 30 days.
+
+    The networks are fetched concurrently, each prefetching its next pages
+    (affiliate_clients.PAGE_PREFETCH), and every page is yielded as a batch of
+    (network, transaction) pairs as soon as it arrives. At most one page per
+    network waits for the importer, so nothing accumulates in memory.
+    """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=30)
     
-    admitad = AdmitadClient(settings.ADMITAD_CLIENT_ID, settings.ADMITAD_CLIENT_SECRET, settings.ADMITAD_TOKEN)
-    vcom = VCommissionClient(settings.VCOMMISSION_API_KEY)
-    cuelinks = CueLinksClient(settings.CUELINKS_API_KEY)
-    results = []
-    async for tx in admitad.fetch_transactions(start_date, end_date):
-        results.append(("admitad", tx))
-    async for tx in vcom.fetch_transactions(start_date, end_date):
-        results.append(("vcommission", tx))
-    async for tx in cuelinks.fetch_transactions(start_date, end_date):
-        results.append(("cuelinks", tx))
-    return results
+    clients = {
+        "admitad": AdmitadClient(settings.ADMITAD_CLIENT_ID, settings.ADMITAD_CLIENT_SECRET, settings.ADMITAD_TOKEN),
+        "vcommission": VCommissionClient(settings.VCOMMISSION_API_KEY),
+        "cuelinks": CueLinksClient(settings.CUELINKS_API_KEY),
+    }
+    pages: asyncio.Queue = asyncio.Queue(maxsize=len(clients))
+
+    async def pump(network, client):
+        async for page in client.fetch_pages(start_date, end_date):
+            await pages.put([(network, tx) for tx in page])
+
+    pumps = [asyncio.create_task(pump(network, client)) for network, client in clients.items()]
+
+    async def fetch_networks():
+        try:
+            await asyncio.gather(*pumps)
+        finally:
+            await pages.put(None)
+
+    fetching = asyncio.create_task(fetch_networks())
+    try:
+        while (batch := await pages.get()) is not None:
+            yield batch
+        await fetching  # Surface a failed network
+    finally:
+        # gather does not cancel the other networks when one fails, and they
+        # may be blocked on pages.put with nobody left to read
+        for task in (fetching, *pumps):
+            task.cancel()
+        await asyncio.gather(fetching, *pumps, return_exceptions=True)
 
 STATUS_MAP = {
     "pending": "pending",
@@ -35,76 +68,123 @@ STATUS_MAP = {
 }
 
 async def async_sync_affiliate_transactions(db: Session) -> dict:
-    """Async version for use when event loop is already running."""
-    results = await fetch_all()
-    return _process_results(db, results)
+    """Async version for use when event loop is already running.
+
+    Each fetched page is imported and committed as it arrives, in a worker
+    thread so the blocking database calls do not stall the fetches."""
+    imported = updated = total = 0
+    async for batch in fetch_all():
+        batch_imported, batch_updated = await asyncio.to_thread(_import_batch, db, batch)
+        imported += batch_imported
+        updated += batch_updated
+        total += len(batch)
+    # Metrics
+    try:
+        observe_affiliate_sync(imported=imported, updated=updated, total_fetched=total)
+    except Exception:
+        pass
+    return {"imported": imported, "updated": updated, "total": total}
+
+def _import_batch(db: Session, batch: Batch) -> Tuple[int, int]:
+    counts = _process_results(db, batch)
+    db.commit()
+    return counts
 
 def sync_affiliate_transactions(db: Session) -> dict:
     """Sync version - only use when no event loop is running."""
     try:
-        results = asyncio.run(fetch_all())
+        asyncio.get_running_loop()
     except RuntimeError:
-        results = []
-    return _process_results(db, results)
+        return asyncio.run(async_sync_affiliate_transactions(db))
+    return {"imported": 0, "updated": 0, "total": 0}
 
-def _process_results(db: Session, results: list) -> dict:
+def _resolve_clicks(db: Session, external_ids: Set[str]) -> Dict[str, Tuple[int, Optional[int]]]:
+    """Map external click ids to (click id, user id), the latest click winning."""
+    found = {}
+    ids = sorted(external_ids)
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        rows = db.execute(
+            select(AffiliateClick.external_click_id, AffiliateClick.id, AffiliateClick.user_id)
+            .where(AffiliateClick.external_click_id.in_(ids[start:start + LOOKUP_CHUNK]))
+            .order_by(AffiliateClick.id)
+        )
+        for external_id, click_id, user_id in rows:
+            found[external_id] = (click_id, user_id)
+    return found
+
+def _resolve_merchants(db: Session, keys: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """Map (network, external merchant id) to merchant id, the latest mapping winning."""
+    found = {}
+    pairs = sorted(keys)
+    for start in range(0, len(pairs), LOOKUP_CHUNK):
+        rows = db.execute(
+            select(AffiliateMerchantMap.network, AffiliateMerchantMap.external_merchant_id, AffiliateMerchantMap.merchant_id)
+            .where(tuple_(AffiliateMerchantMap.network, AffiliateMerchantMap.external_merchant_id).in_(pairs[start:start + LOOKUP_CHUNK]))
+            .order_by(AffiliateMerchantMap.id)
+        )
+        for network, external_id, merchant_id in rows:
+            found[(network, external_id)] = merchant_id
+    return found
+
+def _process_results(db: Session, results: Batch) -> Tuple[int, int]:
+    """Upsert one batch of fetched transactions; returns (imported, updated).
+
+    The batch's clicks and merchant maps are resolved with one query each,
+    then every row goes out in multi-row INSERT ... ON CONFLICT
+    (external_transaction_id) DO UPDATE statements that only touch rows whose
+    status changed. RETURNING yields exactly the inserted and changed rows: rows
+    stamped with this batch's imported_at are new, and rows whose
+    confirmed_at is this batch's timestamp were confirmed by it and get a
+    cashback event, all inserted in one statement.
+    """
+    now = datetime.utcnow()
+    # A transaction repeated within the batch: its last state wins
+    latest = {raw["external_id"]: (network, raw) for network, raw in results}
+    clicks = _resolve_clicks(db, {raw["click_ext_id"] for _, raw in latest.values() if raw.get("click_ext_id")})
+    merchants = _resolve_merchants(
+        db, {(network, raw["merchant_ext_id"]) for network, raw in latest.values() if raw.get("merchant_ext_id")}
+    )
+
+    rows = []
+    for external_id, (network, raw) in latest.items():
+        status = STATUS_MAP.get(raw.get("status", "pending"), "pending")
+        click_id, user_id = clicks.get(raw.get("click_ext_id"), (None, None))
+        rows.append({
+            "network": network,
+            "external_transaction_id": external_id,
+            "status": status,
+            # The network clients report the commission as commission_amount
+            "amount": raw.get("amount", raw.get("commission_amount", 0)) or 0,
+            "click_id": click_id,
+            "user_id": user_id,
+            "merchant_id": merchants.get((network, raw.get("merchant_ext_id"))),
+            "imported_at": now,
+            "confirmed_at": now if status == "confirmed" else None,
+        })
+
+    upsert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+    table = AffiliateTransaction.__table__
+    stmt = upsert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.external_transaction_id],
+        set_={
+            "status": stmt.excluded.status,
+            # Keeps the first confirmation, so a later flip back to confirmed pays no second cashback
+            "confirmed_at": func.coalesce(table.c.confirmed_at, stmt.excluded.confirmed_at),
+        },
+        where=table.c.status != stmt.excluded.status,
+    ).returning(table.c.user_id, table.c.amount, table.c.imported_at, table.c.confirmed_at)
     imported = 0
     updated = 0
-    for network, raw in results:
-        status = STATUS_MAP.get(raw.get("status", "pending"), "pending")
-        external_id = raw["external_id"]
-        click_ext_id = raw.get("click_ext_id")
-        merchant_ext_id = raw.get("merchant_ext_id")
-
-        existing = db.query(AffiliateTransaction).filter_by(external_transaction_id=external_id).first()
-        if existing:
-            if existing.status != status:
-                existing.status = status
-                updated += 1
-                if status == "confirmed" and not existing.confirmed_at:
-                    existing.confirmed_at = existing.imported_at
-                    # Create cashback event if becomes confirmed
-                    if existing.user_id:
-                        db.add(CashbackEvent(user_id=existing.user_id, amount=existing.amount, status="confirmed"))
-            continue
-
-        click = None
-        if click_ext_id:
-            click = (
-                db.query(AffiliateClick)
-                .filter_by(external_click_id=click_ext_id)
-                .order_by(AffiliateClick.id.desc())
-                .first()
-            )
-
-        merchant_id = None
-        if merchant_ext_id:
-            m_map = (
-                db.query(AffiliateMerchantMap)
-                .filter_by(network=network, external_merchant_id=merchant_ext_id)
-                .order_by(AffiliateMerchantMap.id.desc())
-                .first()
-            )
-            if m_map:
-                merchant_id = m_map.merchant_id
-
-        tx = AffiliateTransaction(
-            network=network,
-            external_transaction_id=external_id,
-            status=status,
-            amount=raw.get("amount", 0) or 0,
-            click_id=click.id if click else None,
-            user_id=click.user_id if click else None,
-            merchant_id=merchant_id,
-        )
-        db.add(tx)
-        imported += 1
-        if status == "confirmed" and tx.user_id:
-            db.add(CashbackEvent(user_id=tx.user_id, amount=tx.amount, status="confirmed"))
-    db.commit()
-    # Metrics
-    try:
-        observe_affiliate_sync(imported=imported, updated=updated, total_fetched=len(results))
-    except Exception:
-        pass
-    return {"imported": imported, "updated": updated, "total": len(results)}
+    cashback = []
+    # Executed with a parameter list, SQLAlchemy sends multi-row VALUES pages of one cached statement
+    for user_id, amount, imported_at, confirmed_at in (db.execute(stmt, rows) if rows else []):
+        if imported_at == now:
+            imported += 1
+        else:
+            updated += 1
+        if confirmed_at == now and user_id:
+            cashback.append({"user_id": user_id, "amount": amount, "status": "confirmed"})
+    if cashback:
+        db.execute(insert(CashbackEvent), cashback)
+    return imported, updated
@@ -0,0 +1,125 @@
+"""Monthly range-partition maintenance for append-only event tables.
+
+offer_clicks, offer_views, analytics_events and audit_logs are partitioned by
+RANGE (created_at) with one child table per month named ``<table>_pYYYYMM``
+plus a ``<table>_default`` catch-all (see the partition_event_tables
+migration). This module pre-creates upcoming months and detaches + drops
+months that fall outside the retention window, so retention is a metadata
+operation instead of a row-by-row DELETE.
+"""
+import logging
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from ..config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def retention_months() -> dict[str, int]:
+    """Months of data kept per partitioned table."""
+    return {
+        "offer_clicks": settings.EVENT_RETENTION_MONTHS,
+        "offer_views": settings.EVENT_RETENTION_MONTHS,
+        "analytics_events": settings.EVENT_RETENTION_MONTHS,
+        "audit_logs": settings.AUDIT_LOG_RETENTION_MONTHS,
+    }
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + (value.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def parse_partition_month(table: str, name: str) -> date | None:
+    suffix = name[len(table) + 2:] if name.startswith(f"{table}_p") else ""
+    if len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return date(int(suffix[:4]), int(suffix[4:]), 1)
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return bool(conn.scalar(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table AND c.relnamespace = current_schema()::regnamespace"
+        ),
+        {"table": table},
+    ))
+
+
+def list_partitions(conn: Connection, table: str) -> list[str]:
+    rows = conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table AND parent.relnamespace = current_schema()::regnamespace"
+        ),
+        {"table": table},
+    )
+    return [r[0] for r in rows]
+
+
+def create_month_partition(conn: Connection, table: str, month: date) -> bool:
+    """Create the partition for ``month`` if missing. Returns True when created."""
+    name = partition_name(table, month)
+    if name in list_partitions(conn, table):
+        return False
+    conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+    return True
+
+
+def drop_expired_partitions(conn: Connection, table: str, keep_months: int, today: date | None = None) -> list[str]:
+    """Detach and drop monthly partitions entirely older than the retention window."""
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc).date()), -keep_months)
+    dropped = []
+    for name in sorted(list_partitions(conn, table)):
+        month = parse_partition_month(table, name)
+        if month is None or add_months(month, 1) > cutoff:
+            continue
+        conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+        conn.execute(text(f'DROP TABLE "{name}"'))
+        dropped.append(name)
+    return dropped
+
+
+def maintain_partitions(engine: Engine, months_ahead: int | None = None, today: date | None = None) -> dict:
+    """Pre-create upcoming partitions and drop expired ones for every partitioned table.
+
+    Safe to run repeatedly; tables that are not (yet) partitioned are skipped.
+    """
+    if engine.dialect.name != "postgresql":
+        return {}
+    months_ahead = settings.PARTITION_PREMAKE_MONTHS if months_ahead is None else months_ahead
+    current = month_start(today or datetime.now(timezone.utc).date())
+    summary = {}
+    for table, keep_months in retention_months().items():
+        # One transaction per table keeps DETACH/DROP locks short
+        with engine.begin() as conn:
+            if not is_partitioned(conn, table):
+                continue
+            created = [
+                partition_name(table, add_months(current, i))
+                for i in range(months_ahead + 1)
+                if create_month_partition(conn, table, add_months(current, i))
+            ]
+            dropped = drop_expired_partitions(conn, table, keep_months, today=current)
+        summary[table] = {"created": created, "dropped": dropped}
+        if created or dropped:
+            logger.info(f"Partitions for {table}: created={created} dropped={dropped}")
+    return summary
@@ -0,0 +1,80 @@
+"""Email and SMS templates, compiled once per process.
+
+Email bodies are Jinja2 files under app/templates/email (<type>.html for the
+notification jobs, service/ for app.email); subjects and SMS texts are the
+one-liners below. Everything is compiled by preload() (at import, so worker
+processes start warm) and never re-checked on disk, so rendering a job only
+substitutes its own fields into a compiled template. HTML is autoescaped.
+
+Campaign bodies are not rendered here: app.newsletter loads each campaign's
+HTML once per process and SendGrid substitutes the per-recipient tags
+(-name-, -email-), so a batch costs the same whatever the body size.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemLoader, Template, select_autoescape
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(["html"]),
+    auto_reload=False,  # Compiled templates are never re-stat'ed per render
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+text_env = Environment(autoescape=False)
+
+EMAIL_SUBJECTS = {
+    "welcome": "Welcome to CouponAli! 🎉",
+    "otp": "Your OTP: {{ otp | default('XXXXXX') }}",
+    "order_confirmation": "Order Confirmed - {{ order_number | default('XXXXXX') }}",
+    "cashback_confirmed": "Cashback Credited to Your Wallet 💰",
+    "withdrawal_processed": "Withdrawal Processed Successfully ✅",
+    "password_reset": "Reset Your Password",
+    "gift_card_delivery": "Your Gift Card Code is Ready 🎁",
+    "voucher_codes": "Your Voucher Codes - {{ order_number | default('XXXXXX') }}",
+}
+DEFAULT_SUBJECT = "Notification from CouponAli"
+
+SMS_MESSAGES = {
+    "otp": "Your OTP for CouponAli is {{ otp | default('XXXXXX') }}. Valid for 10 minutes. Do not share with anyone.",
+    "order_confirmation": "Order {{ order_number | default('XXXXXX') }} confirmed! Amount: ₹{{ total_amount | default('0') }}. Your voucher codes are ready. Check your email or app.",
+    "cashback_credited": "₹{{ amount | default('0') }} cashback credited to your CouponAli wallet from {{ merchant_name | default('merchant') }}. Total balance: ₹{{ wallet_balance | default('0') }}",
+    "withdrawal_processed": "Withdrawal of ₹{{ amount | default('0') }} processed successfully. It will be credited to your account within 24 hours.",
+}
+DEFAULT_SMS = "{{ message | default('Notification from CouponAli') }}"
+
+_subjects: dict[str, Template] = {}
+_sms: dict[str, Template] = {}
+_html: dict[str, Template] = {}
+
+
+def preload() -> None:
+    """Compile every template; later renders never touch the filesystem."""
+    _subjects.update({name: text_env.from_string(source) for name, source in EMAIL_SUBJECTS.items()})
+    _sms.update({name: text_env.from_string(source) for name, source in SMS_MESSAGES.items()})
+    _sms[""] = text_env.from_string(DEFAULT_SMS)
+    for name in env.list_templates(extensions=["html"]):
+        _html[name] = env.get_template(name)
+
+
+def render_email(email_type: str, data: dict) -> tuple[str, str]:
+    """Subject and HTML body of a notification email; unknown types get the generic one."""
+    subject = _subjects.get(email_type)
+    html = _html.get(f"email/{email_type}.html") or _html["email/generic.html"]
+    return (subject.render(data) if subject else DEFAULT_SUBJECT), html.render(data)
+
+
+def render_sms(sms_type: str, data: dict) -> str:
+    return (_sms.get(sms_type) or _sms[""]).render(data)
+
+
+def render(name: str, **context) -> str:
+    """Render a template file by path, e.g. ``email/service/welcome.html``."""
+    return (_html.get(name) or env.get_template(name)).render(context)
+
+
+preload()
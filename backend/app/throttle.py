@@ -0,0 +1,137 @@
+"""Provider throttling for the notification workers.
+
+Token buckets live in Redis (throttle:<provider>, a hash of tokens and last
+refill time) so every worker process shares one per-provider budget; the
+refill uses the Redis clock, so hosts with skewed clocks agree. Circuit
+breakers are per process: a provider that keeps failing stops the consume
+loop for its queue until a cooldown passes, then single probe jobs decide
+whether to close it again.
+"""
+from __future__ import annotations
+
+import time
+
+from .config import get_settings
+from .redis_client import redis_client, rk
+
+settings = get_settings()
+
+# Requests/second and burst per provider; a rate of 0 disables throttling
+PROVIDER_LIMITS = {
+    "sendgrid": (settings.SENDGRID_RATE_LIMIT, settings.SENDGRID_RATE_BURST),
+    "msg91": (settings.MSG91_RATE_LIMIT, settings.MSG91_RATE_BURST),
+}
+
+
+class ProviderError(Exception):
+    """A provider answered a send with a non-success status."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Refill KEYS[1] at ARGV[1] tokens/s up to ARGV[2], then take ARGV[3] tokens.
+# Returns "0" when granted, else the seconds until enough tokens exist (the
+# bucket is left untouched then, so waiters do not starve each other).
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local rate, burst, want = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+if tokens < want then
+    return tostring((want - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens - want, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return '0'
+"""
+_bucket = None
+
+
+def take_token(provider: str, tokens: int = 1) -> float:
+    """Take tokens from the provider's shared bucket.
+
+    Returns 0 when granted, otherwise how long to wait before asking again.
+    Fails open when Redis is unavailable.
+    """
+    global _bucket
+    rate, burst = PROVIDER_LIMITS.get(provider, (0, 0))
+    if rate <= 0:
+        return 0.0
+    if _bucket is None:
+        _bucket = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+    try:
+        return float(_bucket(keys=[rk("throttle", provider)], args=[rate, max(burst, tokens), tokens]))
+    except Exception:
+        return 0.0
+
+
+class CircuitBreaker:
+    """Closed -> open after ``threshold`` consecutive failures -> half-open
+    after the cooldown, where one probe at a time is let through. A good
+    probe closes the breaker; a failed one reopens it with double the
+    cooldown (up to ``max_cooldown``).
+    """
+
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(
+        self,
+        threshold: int | None = None,
+        cooldown: float | None = None,
+        max_cooldown: float | None = None,
+        clock=time.monotonic,
+    ):
+        self.threshold = threshold or settings.PROVIDER_BREAKER_THRESHOLD
+        self.base_cooldown = cooldown or settings.PROVIDER_BREAKER_COOLDOWN
+        self.max_cooldown = max_cooldown or settings.PROVIDER_BREAKER_MAX_COOLDOWN
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow(self) -> bool:
+        """Whether the caller may take a job now. In half-open state a True
+        answer reserves the probe; hand it back with release() if unused."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.cooldown:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def release(self) -> None:
+        self.probing = False
+
+    def retry_after(self) -> float:
+        """Seconds until allow() may say yes again."""
+        if self.state == self.OPEN:
+            return max(0.0, self.opened_at + self.cooldown - self.clock())
+        return 0.0
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._open()
+        elif self.state == self.CLOSED and self.failures >= self.threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self.opened_at = self.clock()
+        self.probing = False
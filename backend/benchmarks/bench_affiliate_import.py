@@ -0,0 +1,199 @@
+"""Benchmark: affiliate transaction import, per-row queries vs set-based upsert.
+
+"per-row" is the old _process_results loop, kept below: a SELECT for the
+existing transaction, the click and the merchant map of every row, then
+an ORM add. "bulk" is app.tasks.affiliate_sync._process_results: two
+lookups, then multi-row INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+pages and one cashback INSERT per batch. Each run imports --transactions
+new rows (half of them confirmed), then re-imports them with every pending
+one now approved. Statements sent to the database are counted too.
+
+Defaults to a file-backed SQLite database; pass --url to point at Postgres
+(the tables must already exist there, e.g. via alembic upgrade head).
+
+Usage:
+    python -m benchmarks.bench_affiliate_import [--transactions 100000] [--batch 5000] [--url postgresql://...]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, delete, event, insert
+from sqlalchemy.orm import Session
+
+from app.database import Base, _normalize_url
+from app.models import (
+    AffiliateClick,
+    AffiliateMerchantMap,
+    AffiliateTransaction,
+    CashbackEvent,
+    Merchant,
+    User,
+)
+from app.tasks.affiliate_sync import STATUS_MAP, _process_results
+
+MERCHANTS = 200
+
+
+def legacy_process(db: Session, results: list) -> tuple[int, int]:
+    imported = 0
+    updated = 0
+    for network, raw in results:
+        status = STATUS_MAP.get(raw.get("status", "pending"), "pending")
+        external_id = raw["external_id"]
+        click_ext_id = raw.get("click_ext_id")
+        merchant_ext_id = raw.get("merchant_ext_id")
+
+        existing = db.query(AffiliateTransaction).filter_by(external_transaction_id=external_id).first()
+        if existing:
+            if existing.status != status:
+                existing.status = status
+                updated += 1
+                if status == "confirmed" and not existing.confirmed_at:
+                    existing.confirmed_at = existing.imported_at
+                    if existing.user_id:
+                        db.add(CashbackEvent(user_id=existing.user_id, amount=existing.amount, status="confirmed"))
+            continue
+
+        click = None
+        if click_ext_id:
+            click = (
+                db.query(AffiliateClick)
+                .filter_by(external_click_id=click_ext_id)
+                .order_by(AffiliateClick.id.desc())
+                .first()
+            )
+
+        merchant_id = None
+        if merchant_ext_id:
+            m_map = (
+                db.query(AffiliateMerchantMap)
+                .filter_by(network=network, external_merchant_id=merchant_ext_id)
+                .order_by(AffiliateMerchantMap.id.desc())
+                .first()
+            )
+            if m_map:
+                merchant_id = m_map.merchant_id
+
+        tx = AffiliateTransaction(
+            network=network,
+            external_transaction_id=external_id,
+            status=status,
+            amount=raw.get("amount", 0) or 0,
+            click_id=click.id if click else None,
+            user_id=click.user_id if click else None,
+            merchant_id=merchant_id,
+        )
+        db.add(tx)
+        imported += 1
+        if status == "confirmed" and tx.user_id:
+            db.add(CashbackEvent(user_id=tx.user_id, amount=tx.amount, status="confirmed"))
+    return imported, updated
+
+
+def _setup(url: str | None, transactions: int):
+    if url:
+        engine = create_engine(_normalize_url(url))
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench_affiliate.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine, tables=[
+            User.__table__, Merchant.__table__, AffiliateClick.__table__, AffiliateMerchantMap.__table__,
+            AffiliateTransaction.__table__, CashbackEvent.__table__,
+        ])
+    tag = time.time_ns()
+    with Session(engine) as db:
+        user = User(email=f"bench-{tag}@example.com", full_name="Bench", referral_code=f"B{tag}", password_hash="x")
+        merchant = Merchant(name=f"Bench Merchant {tag}", slug=f"bench-{tag}")
+        db.add_all([user, merchant])
+        db.flush()
+        db.execute(insert(AffiliateMerchantMap), [
+            {"network": "admitad", "external_merchant_id": f"{tag}-M{m}", "merchant_id": merchant.id}
+            for m in range(MERCHANTS)
+        ])
+        # Every other transaction comes from a tracked click
+        db.execute(insert(AffiliateClick), [
+            {"user_id": user.id, "merchant_id": merchant.id, "network": "admitad", "external_click_id": f"{tag}-C{i}"}
+            for i in range(0, transactions, 2)
+        ])
+        db.commit()
+        return engine, tag, user.id
+
+
+def _batches(tag: int, prefix: str, transactions: int, batch: int, approve_all: bool):
+    rows = [
+        ("admitad", {
+            "external_id": f"{tag}-{prefix}{i}",
+            "status": "approved" if approve_all or i % 2 else "pending",
+            "amount": 25.0,
+            "merchant_ext_id": f"{tag}-M{i % MERCHANTS}",
+            "click_ext_id": f"{tag}-C{i}" if i % 2 == 0 else None,
+        })
+        for i in range(transactions)
+    ]
+    return [rows[i:i + batch] for i in range(0, transactions, batch)]
+
+
+def _run(engine, process, batches) -> tuple[float, int, int]:
+    """Import the batches, committing each; returns (rows/s, statements, changed rows)."""
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    changed = 0
+    start = time.perf_counter()
+    with Session(engine) as db:
+        for batch in batches:
+            imported, updated = process(db, batch)
+            changed += imported + updated
+            db.commit()
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    return sum(len(b) for b in batches) / elapsed, statements, changed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=5000, help="rows per committed batch")
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    engine, tag, user_id = _setup(args.url, args.transactions)
+    # Per-row is orders of magnitude slower; a smaller sample is representative
+    sample = min(args.transactions, 10000)
+    results = {}
+    for name, process, count, prefix in (
+        ("per-row", legacy_process, sample, "L"),
+        ("bulk", _process_results, args.transactions, "B"),
+    ):
+        fresh = _run(engine, process, _batches(tag, prefix, count, args.batch, approve_all=False))
+        again = _run(engine, process, _batches(tag, prefix, count, args.batch, approve_all=True))
+        results[name] = (count, fresh, again)
+
+    with Session(engine) as db:
+        db.execute(delete(CashbackEvent).where(CashbackEvent.user_id == user_id))
+        db.execute(delete(AffiliateTransaction).where(AffiliateTransaction.external_transaction_id.like(f"{tag}-%")))
+        db.execute(delete(AffiliateClick).where(AffiliateClick.user_id == user_id))
+        db.execute(delete(AffiliateMerchantMap).where(AffiliateMerchantMap.external_merchant_id.like(f"{tag}-%")))
+        db.commit()
+
+    print(f"database:   {engine.url.render_as_string(hide_password=True)}")
+    print(f"batch:      {args.batch} rows per commit")
+    for name, (count, fresh, again) in results.items():
+        print(
+            f"{name:<8} {count:>7} rows: import {fresh[0]:9.0f} rows/s ({fresh[1]:>6} statements), "
+            f"re-import {again[0]:9.0f} rows/s ({again[1]:>6} statements, {again[2]} updated)"
+        )
+    speedup = results["bulk"][1][0] / results["per-row"][1][0]
+    print(f"bulk import is {speedup:.0f}x per-row")
+
+
+if __name__ == "__main__":
+    main()
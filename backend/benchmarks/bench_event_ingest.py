@@ -0,0 +1,107 @@
+"""Benchmark: sustained click/view events per second, per-row commits vs batched flushes.
+
+"per-row" mirrors the old create_view path (ORM add + commit + refresh per
+event); "batched" is what workers.event_flusher does (app.ingest.write_events
+plus one commit per batch). When Redis is reachable the stream append rate
+of app.ingest.ingest_event is reported too.
+
+Defaults to a file-backed SQLite database; pass --url to point at Postgres
+(the tables must already exist there, e.g. via alembic upgrade head).
+
+Usage:
+    python -m benchmarks.bench_event_ingest [--events 20000] [--batch 5000] [--url postgresql://...]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, delete
+from sqlalchemy.orm import Session
+
+from app import ingest
+from app.database import Base, _normalize_url
+from app.models import Merchant, Offer, OfferClick, OfferView, User
+
+
+def _setup(url: str | None):
+    if url:
+        engine = create_engine(_normalize_url(url))
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench_ingest.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine, tables=[
+            User.__table__, Merchant.__table__, Offer.__table__, OfferView.__table__, OfferClick.__table__,
+        ])
+    with Session(engine) as db:
+        merchant = Merchant(name="Bench Merchant", slug=f"bench-{time.time_ns()}", is_active=True)
+        db.add(merchant)
+        db.flush()
+        offer = Offer(merchant_id=merchant.id, title="Bench Offer", is_active=True)
+        db.add(offer)
+        db.commit()
+        return engine, offer.id
+
+
+def _per_row(engine, offer_id: int, events: int) -> float:
+    start = time.perf_counter()
+    with Session(engine) as db:
+        for _ in range(events):
+            view = OfferView(offer_id=offer_id)
+            db.add(view)
+            db.commit()
+            db.refresh(view)
+    return events / (time.perf_counter() - start)
+
+
+def _batched(engine, offer_id: int, events: int, batch: int) -> float:
+    payload = [ingest.new_event("view" if i % 2 else "click", offer_id) for i in range(events)]
+    start = time.perf_counter()
+    with Session(engine) as db:
+        for i in range(0, events, batch):
+            ingest.write_events(db, payload[i:i + batch])
+            db.commit()
+    return events / (time.perf_counter() - start)
+
+
+def _stream_append(offer_id: int, events: int) -> float | None:
+    start = time.perf_counter()
+    for _ in range(events):
+        if ingest.ingest_event("view", offer_id) is None:
+            return None
+    rate = events / (time.perf_counter() - start)
+    ingest.redis_client.delete(ingest.EVENT_STREAM)
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=5000)
+    parser.add_argument("--url", default=None, help="database URL (default: temporary SQLite file)")
+    args = parser.parse_args()
+
+    engine, offer_id = _setup(args.url)
+    # Per-row is orders of magnitude slower; a smaller sample is representative
+    per_row = _per_row(engine, offer_id, min(args.events, 2000))
+    batched = _batched(engine, offer_id, args.events, args.batch)
+    appended = _stream_append(offer_id, min(args.events, 5000))
+
+    with Session(engine) as db:
+        db.execute(delete(OfferView).where(OfferView.offer_id == offer_id))
+        db.execute(delete(OfferClick).where(OfferClick.offer_id == offer_id))
+        db.commit()
+
+    print(f"database:           {engine.url.render_as_string(hide_password=True)}")
+    print(f"per-row commit:     {per_row:10.0f} events/s")
+    print(f"batched ({args.batch:>5}):    {batched:10.0f} events/s ({batched / per_row:.0f}x)")
+    if appended is None:
+        print("stream append:      skipped (Redis unavailable)")
+    else:
+        print(f"stream append:      {appended:10.0f} events/s (single client, one round trip each)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark: email/SMS queue throughput, legacy BLPOP+SADD vs reliable BLMOVE.
+
+"legacy" replays the old worker path (BLPOP, SADD raw job to the shared
+processing set, SREM on completion); "reliable" is app.queue as used by
+workers.runner now (BLMOVE into the worker's processing list,
+LREM on ack). Each run pushes --jobs jobs, then drains them with --workers
+threads doing no-op sends, so the numbers are pure queue overhead.
+
+Needs a real Redis (REDIS_URL); pass --fake to run against fakeredis
+instead, which is only useful as a smoke test since it has no network hop.
+
+Usage:
+    python -m benchmarks.bench_queue_reliability [--jobs 20000] [--workers 4] [--fake]
+"""
+from __future__ import annotations
+
+import argparse
+import threading
+import time
+
+from app import queue
+from app import redis_client as rc
+from app.redis_client import rk
+
+LEGACY_PROCESSING = rk("queue", "email", "processing")
+
+
+def _reset(r) -> None:
+    for key in list(r.scan_iter(match=rk("queue", "email*"))):
+        r.delete(key)
+
+
+def _fill(jobs: int) -> None:
+    for i in range(jobs):
+        queue.push_email_job("bench", f"user{i}@example.com", {"i": i})
+
+
+def _legacy_worker(r, done: list[float]) -> None:
+    while True:
+        item = r.blpop(queue.EMAIL_QUEUE, timeout=1)
+        if item is None:
+            return
+        _, raw = item
+        r.sadd(LEGACY_PROCESSING, raw)
+        r.srem(LEGACY_PROCESSING, raw)
+        done.append(time.perf_counter())
+
+
+def _reliable_worker(worker_id: str, done: list[float]) -> None:
+    queue.heartbeat("email", worker_id)
+    while True:
+        reserved = queue.reserve_job("email", worker_id, timeout=1)
+        if reserved is None:
+            queue.unregister_worker("email", worker_id)
+            return
+        queue.ack_job("email", worker_id, reserved[0])
+        done.append(time.perf_counter())
+
+
+def _drain(workers: int, target) -> tuple[int, float]:
+    done: list[float] = []
+    threads = [threading.Thread(target=target, args=(i, done)) for i in range(workers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Workers exit on an empty poll; time up to the last completed job
+    return len(done), max(done, default=start) - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--fake", action="store_true", help="use fakeredis instead of REDIS_URL")
+    args = parser.parse_args()
+
+    if args.fake:
+        import fakeredis
+
+        rc.redis_client = queue.redis_client = fakeredis.FakeRedis(decode_responses=True)
+    elif isinstance(rc.redis_client, rc.MockRedis):
+        raise SystemExit("Redis unavailable; start Redis or pass --fake")
+    r = queue.redis_client
+
+    _reset(r)
+    _fill(args.jobs)
+    legacy_done, legacy_secs = _drain(args.workers, lambda i, done: _legacy_worker(r, done))
+
+    _reset(r)
+    _fill(args.jobs)
+    reliable_done, reliable_secs = _drain(args.workers, lambda i, done: _reliable_worker(f"bench-{i}", done))
+    _reset(r)
+
+    legacy = legacy_done / legacy_secs
+    reliable = reliable_done / reliable_secs
+    print(f"redis:              {'fakeredis' if args.fake else rc.settings.REDIS_URL}")
+    print(f"jobs x workers:     {args.jobs} x {args.workers}")
+    print(f"legacy BLPOP+SADD:  {legacy:10.0f} jobs/s (3 round trips per job, loses jobs on crash)")
+    print(f"reliable BLMOVE:    {reliable:10.0f} jobs/s (2 round trips per job) ({reliable / legacy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Benchmark: end-to-end queue throughput and latency under a mock provider.
+
+Jobs are submitted with the real producer path (app.jobs.submit) and
+consumed by the real runner loop (workers.runner.consume with the token
+bucket and circuit breaker) and email/SMS handlers, which post to a local
+mock provider running in its own process. The mock answers every request
+after --latency-ms (+-50% uniform jitter) and fails --error-rate of them
+with --error-status.
+
+Each concurrency setting gets a fresh queue. Reported per setting:
+- throughput of completed jobs (sent or dead-lettered)
+- enqueue-to-sent latency p50/p99/max
+- retries and the DLQ rate
+
+Retries run without backoff (QUEUE_RETRY_BASE_SECONDS=0) so dead letters
+show up within the run. --json writes the results for comparing runs.
+
+With --rate 0 (default) all jobs are queued up front: throughput is the
+ceiling, latency mostly backlog. With --rate N the producer submits N
+jobs/s while workers drain, giving service latency at that load.
+
+Needs a real Redis (REDIS_URL); pass --fake to run against fakeredis
+instead, which is only useful as a smoke test since it has no network hop.
+
+Usage:
+    python -m benchmarks.bench_queue_throughput [--jobs 5000] [--concurrency 10,50,200]
+        [--queue email|sms] [--latency-ms 50] [--error-rate 0.05] [--rate 0]
+        [--attempts 3] [--json results.json] [--fake]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import platform
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app import jobs, queue, throttle
+from app import redis_client as rc
+from app.redis_client import rk
+from workers import email_sms_worker as worker
+from workers import runner
+
+JOB_SPECS = {"email": jobs.WELCOME_EMAIL, "sms": jobs.WITHDRAWAL_REQUESTED_SMS}
+PAYLOADS = {"email": {"user_name": "Bench"}, "sms": {"amount": 100, "method": "upi"}}
+
+
+# ---------------- Mock provider ----------------
+
+def _serve_provider(port: multiprocessing.Queue, latency: float, error_rate: float, error_status: int) -> None:
+    class Provider(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real providers
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if latency:
+                time.sleep(latency * random.uniform(0.5, 1.5))
+            ok = 202 if self.path.startswith("/v3/") else 200  # SendGrid accepts with 202, MSG91 with 200
+            status = error_status if random.random() < error_rate else ok
+            body = b'{"errors": [{"message": "injected"}]}' if status != ok else b""
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Provider)
+    server.daemon_threads = True
+    port.put(server.server_address[1])
+    server.serve_forever()
+
+
+def start_provider(latency: float, error_rate: float, error_status: int) -> tuple[multiprocessing.Process, str]:
+    port: multiprocessing.Queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_serve_provider, args=(port, latency, error_rate, error_status), daemon=True
+    )
+    process.start()
+    return process, f"http://127.0.0.1:{port.get(timeout=10)}"
+
+
+# ---------------- Run ----------------
+
+def _reset(r, queue_name: str) -> None:
+    for pattern in (rk("queue", f"{queue_name}*"), rk("job", "idem", queue_name, "*")):
+        for key in list(r.scan_iter(match=pattern)):
+            r.delete(key)
+
+
+def _produce(queue_name: str, jobs_total: int, rate: float) -> None:
+    spec, payload = JOB_SPECS[queue_name], PAYLOADS[queue_name]
+    start = time.perf_counter()
+    for i in range(jobs_total):
+        if rate:
+            ahead = start + i / rate - time.perf_counter()
+            if ahead > 0:
+                time.sleep(ahead)
+        to = f"user{i}@example.com" if queue_name == "email" else f"+9198{i:08d}"
+        jobs.submit(spec, payload, to=to)
+
+
+async def _run_once(queue_name: str, provider_url: str, concurrency: int, jobs_total: int, rate: float) -> dict:
+    spec = jobs.QUEUES[queue_name]
+    latencies: list[float] = []
+    counts = {"dead": 0, "retried": 0}
+    fail_job, retry_job = runner.fail_job, runner.retry_job
+
+    def counting_fail(*args, **kwargs):
+        counts["dead"] += 1
+        return fail_job(*args, **kwargs)
+
+    def counting_retry(*args, **kwargs):
+        counts["retried"] += 1
+        return retry_job(*args, **kwargs)
+
+    runner.fail_job, runner.retry_job = counting_fail, counting_retry
+    dispatch = runner.dispatch(queue_name)
+
+    async def timed(job: dict) -> None:
+        await dispatch(job)
+        latencies.append(time.time() - job["enqueued_ts"])
+
+    breaker = throttle.CircuitBreaker(cooldown=1, max_cooldown=5)
+    handler = runner.guarded(spec.provider, breaker, timed)
+    client = worker._provider_client(provider_url, {}, concurrency)
+    worker.clients[spec.provider] = client
+
+    producer = threading.Thread(target=_produce, args=(queue_name, jobs_total, rate))
+    stop = asyncio.Event()
+    inflight: set[asyncio.Task] = set()
+    start = time.perf_counter()
+    producer.start()
+    consumer = asyncio.create_task(
+        runner.consume(queue_name, "bench", handler, concurrency, stop, inflight, breaker)
+    )
+    try:
+        while len(latencies) + counts["dead"] < jobs_total:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+    finally:
+        stop.set()
+        await consumer
+        producer.join()
+        await client.aclose()
+        runner.fail_job, runner.retry_job = fail_job, retry_job
+
+    latencies.sort()
+    ms = [x * 1000 for x in latencies] or [0.0]
+    return {
+        "concurrency": concurrency,
+        "jobs": jobs_total,
+        "seconds": round(elapsed, 3),
+        "throughput": round(jobs_total / elapsed, 1),
+        "p50_ms": round(statistics.median(ms), 2),
+        "p99_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.99))], 2),
+        "max_ms": round(ms[-1], 2),
+        "sent": len(latencies),
+        "retried": counts["retried"],
+        "dead": counts["dead"],
+        "dlq_rate": round(counts["dead"] / jobs_total, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--concurrency", default="10,50,200", help="comma-separated in-flight limits to compare")
+    parser.add_argument("--queue", choices=sorted(JOB_SPECS), default="email")
+    parser.add_argument("--latency-ms", type=float, default=50, help="mean mock provider latency")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="share of sends the mock fails")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=0, help="producer jobs/s; 0 queues everything up front")
+    parser.add_argument("--rate-limit", type=float, default=0, help="provider token bucket req/s; 0 disables")
+    parser.add_argument("--attempts", type=int, default=3, help="sends per job before it is dead-lettered")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--fake", action="store_true", help="use fakeredis instead of REDIS_URL")
+    args = parser.parse_args()
+
+    if args.fake:
+        import fakeredis
+
+        fake = fakeredis.FakeRedis(decode_responses=True)
+        rc.redis_client = queue.redis_client = throttle.redis_client = fake
+    elif isinstance(rc.redis_client, rc.MockRedis):
+        raise SystemExit("Redis unavailable; start Redis or pass --fake")
+    r = queue.redis_client
+
+    settings = queue.settings
+    settings.QUEUE_RETRY_BASE_SECONDS = 0
+    settings.QUEUE_MAX_ATTEMPTS = args.attempts
+    provider = jobs.QUEUES[args.queue].provider
+    throttle.PROVIDER_LIMITS[provider] = (args.rate_limit, max(int(args.rate_limit), 1))
+    logging.disable(logging.CRITICAL)
+
+    process, provider_url = start_provider(args.latency_ms / 1000, args.error_rate, args.error_status)
+    results = []
+    try:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            _reset(r, args.queue)
+            r.delete(rk("throttle", provider))
+            results.append(asyncio.run(_run_once(args.queue, provider_url, concurrency, args.jobs, args.rate)))
+            _reset(r, args.queue)
+    finally:
+        process.terminate()
+
+    config = {
+        "queue": args.queue,
+        "jobs": args.jobs,
+        "latency_ms": args.latency_ms,
+        "error_rate": args.error_rate,
+        "error_status": args.error_status,
+        "rate": args.rate,
+        "rate_limit": args.rate_limit,
+        "attempts": args.attempts,
+        "backend": settings.QUEUE_BACKEND,
+        "redis": "fakeredis" if args.fake else settings.REDIS_URL,
+        "python": platform.python_version(),
+    }
+    print(f"redis:    {config['redis']} ({config['backend']})")
+    print(f"provider: {args.latency_ms:.0f} ms, {args.error_rate:.1%} errors ({args.error_status}), {args.attempts} attempts")
+    print(f"{'concurrency':>11} {'jobs/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'retries':>8} {'dlq':>7}")
+    for row in results:
+        print(
+            f"{row['concurrency']:>11} {row['throughput']:>9.1f} {row['p50_ms']:>9.1f} "
+            f"{row['p99_ms']:>9.1f} {row['retried']:>8} {row['dlq_rate']:>7.2%}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Microbenchmark: per-request CPU of rebuilt select() vs prebuilt statements.
+
+Compares the old pattern (construct a select() per request and let SQLAlchemy
+derive its cache key) against the module-level statements in
+app.api.v1.offers / app.api.v1.merchants executed with bound parameters.
+Runs against in-memory SQLite so the numbers isolate Python-side overhead.
+
+Usage:
+    python -m benchmarks.bench_statement_cache [--iterations 5000]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import Merchant, Offer
+from app.api.v1.offers import FEATURED_OFFERS_STMT, GET_OFFER_STMT, _list_offers_stmts
+from app.api.v1.merchants import MERCHANT_BY_SLUG_STMT, ACTIVE_OFFERS_COUNT_STMT
+
+
+def _seed(session: Session) -> None:
+    for m in range(20):
+        merchant = Merchant(name=f"Merchant {m}", slug=f"merchant-{m}", is_active=True)
+        session.add(merchant)
+        session.flush()
+        for o in range(10):
+            session.add(Offer(merchant_id=merchant.id, title=f"Offer {m}-{o}", is_active=True, priority=o))
+    session.commit()
+
+
+def _rebuilt(db: Session) -> None:
+    db.execute(
+        select(Offer, Merchant).join(Merchant).where(Offer.is_active == True)
+        .order_by(Offer.priority.desc(), Offer.created_at.desc()).offset(0).limit(20)
+    ).all()
+    db.scalar(select(func.count()).select_from(Offer).where(Offer.is_active == True))
+    db.execute(
+        select(Offer, Merchant).join(Merchant).where(Offer.is_active == True)
+        .order_by(Offer.priority.desc(), Offer.created_at.desc()).limit(12)
+    ).all()
+    db.execute(select(Offer, Merchant).join(Merchant).where(Offer.id == 7)).first()
+    merchant = db.scalar(select(Merchant).where(Merchant.slug == "merchant-3", Merchant.is_active == True))
+    db.scalar(select(func.count(Offer.id)).where(Offer.merchant_id == merchant.id, Offer.is_active == True))
+
+
+def _prebuilt(db: Session) -> None:
+    query, count_query = _list_offers_stmts(None, False, False, False)
+    db.execute(query, {"offset": 0, "limit": 20}).all()
+    db.scalar(count_query)
+    db.execute(FEATURED_OFFERS_STMT, {"limit": 12}).all()
+    db.execute(GET_OFFER_STMT, {"offer_id": 7}).first()
+    merchant = db.scalar(MERCHANT_BY_SLUG_STMT, {"slug": "merchant-3"})
+    db.scalar(ACTIVE_OFFERS_COUNT_STMT, {"merchant_id": merchant.id})
+
+
+def _measure(engine, fn, iterations: int) -> float:
+    with Session(engine) as db:
+        for _ in range(200):  # warm SQLAlchemy's compiled cache
+            fn(db)
+        start = time.process_time()
+        for _ in range(iterations):
+            fn(db)
+        return (time.process_time() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Merchant.__table__, Offer.__table__])
+    with Session(engine) as session:
+        _seed(session)
+
+    rebuilt = _measure(engine, _rebuilt, args.iterations)
+    prebuilt = _measure(engine, _prebuilt, args.iterations)
+    saved = rebuilt - prebuilt
+    print(f"iterations:        {args.iterations} (6 queries each)")
+    print(f"rebuilt select():  {rebuilt * 1e6:8.1f} us CPU / request")
+    print(f"prebuilt stmts:    {prebuilt * 1e6:8.1f} us CPU / request")
+    print(f"saved:             {saved * 1e6:8.1f} us CPU / request ({saved / rebuilt:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Benchmark: per-job email/SMS rendering, f-string dicts vs precompiled templates.
+
+"legacy" is the worker's old path, kept verbatim below: every job built the
+f-strings of all templates in a dict and picked one. "compiled" is
+app.templating: templates compiled once per process, each job only renders
+its own. The campaign section times one newsletter batch payload (1000
+recipients) for growing campaign HTML: the body is loaded once per process
+and personalised by SendGrid substitutions, so the cost should not grow with
+the body; a per-recipient Jinja render of the same HTML is shown for scale.
+
+Usage:
+    python -m benchmarks.bench_templates [--jobs 20000] [--batch 1000]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.newsletter import sendgrid_payload
+from app.templating import render_email, render_sms, text_env
+
+JOB = {
+    "type": "order_confirmation",
+    "data": {
+        "user_name": "Asha",
+        "order_number": "ORD-1042",
+        "total_amount": 530.0,
+        "items_count": 2,
+        "order_url": "https://app.example.com/orders/1042",
+    },
+}
+
+
+def legacy_email_subject(email_type: str, data: dict) -> str:
+    """Get email subject based on type."""
+    subjects = {
+        "welcome": "Welcome to CouponAli! 🎉",
+        "otp": f"Your OTP: {data.get('otp', 'XXXXXX')}",
+        "order_confirmation": f"Order Confirmed - {data.get('order_number', 'XXXXXX')}",
+        "cashback_confirmed": "Cashback Credited to Your Wallet 💰",
+        "withdrawal_processed": "Withdrawal Processed Successfully ✅",
+        "password_reset": "Reset Your Password",
+        "gift_card_delivery": "Your Gift Card Code is Ready 🎁",
+    }
+    return subjects.get(email_type, "Notification from CouponAli")
+
+
+def legacy_email_html(email_type: str, data: dict) -> str:
+    """Get email HTML content based on type."""
+    templates = {
+        "welcome": f"""
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <h1 style="color: #4F46E5;">Welcome to CouponAli! 🎉</h1>
+                <p>Hi {data.get('user_name', 'there')},</p>
+                <p>Thank you for joining CouponAli - India's best cashback & coupon platform!</p>
+                <div style="background: #F3F4F6; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3>Get Started:</h3>
+                    <ul>
+                        <li>Browse 1000+ stores and offers</li>
+                        <li>Get cashback on every purchase</li>
+                        <li>Redeem your earnings via UPI/Bank</li>
+                    </ul>
+                </div>
+                {f'<div style="background: #DBEAFE; padding: 20px; border-radius: 8px; margin: 20px 0;"><h3>Verify Your Email</h3><p>Click the button below to verify your email address:</p><a href="{data.get("verification_url")}" style="background: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block; margin: 10px 0;">Verify Email</a><p style="font-size: 12px; color: #666;">Link expires in 24 hours</p></div>' if data.get('verification_url') else ''}
+                <p>Happy saving!<br>Team CouponAli</p>
+            </div>
+        """,
+        "otp": f"""
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <h1 style="color: #4F46E5;">Your OTP Code</h1>
+                <p>Hi {data.get('user_name', 'there')},</p>
+                <p>Your one-time password (OTP) is:</p>
+                <div style="background: #F3F4F6; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center;">
+                    <h2 style="font-size: 32px; letter-spacing: 8px; color: #4F46E5; margin: 0;">{data.get('otp', 'XXXXXX')}</h2>
+                </div>
+                <p>This OTP is valid for 10 minutes.</p>
+                <p style="color: #DC2626;">⚠️ Do not share this OTP with anyone.</p>
+                <p>Team CouponAli</p>
+            </div>
+        """,
+        "order_confirmation": f"""
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <h1 style="color: #059669;">Order Confirmed! ✅</h1>
+                <p>Hi {data.get('user_name', 'there')},</p>
+                <p>Your order <strong>{data.get('order_number', 'XXXXXX')}</strong> has been confirmed.</p>
+                <div style="background: #F3F4F6; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3>Order Details:</h3>
+                    <p><strong>Order Number:</strong> {data.get('order_number', 'XXXXXX')}</p>
+                    <p><strong>Total Amount:</strong> ₹{data.get('total_amount', '0')}</p>
+                    <p><strong>Items:</strong> {data.get('items_count', 1)}</p>
+                </div>
+                <p><a href="{data.get('order_url', '#')}" style="background: #059669; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">View Order & Vouchers</a></p>
+                <p style="margin-top: 30px;">Thank you for your purchase!<br>Team CouponAli</p>
+            </div>
+        """,
+        "cashback_confirmed": f"""
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <h1 style="color: #059669;">Cashback Credited! 💰</h1>
+                <p>Hi {data.get('user_name', 'there')},</p>
+                <p>Great news! Your cashback has been credited to your wallet.</p>
+                <div style="background: #D1FAE5; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3>Cashback Details:</h3>
+                    <p><strong>Amount:</strong> ₹{data.get('amount', '0')}</p>
+                    <p><strong>Merchant:</strong> {data.get('merchant_name', 'N/A')}</p>
+                    <p><strong>New Balance:</strong> ₹{data.get('wallet_balance', '0')}</p>
+                </div>
+                <p><a href="{data.get('wallet_url', '#')}" style="background: #059669; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">View Wallet</a></p>
+                <p style="margin-top: 30px;">Keep shopping and earning!<br>Team CouponAli</p>
+            </div>
+        """,
+        "withdrawal_processed": f"""
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <h1 style="color: #059669;">Withdrawal Processed! ✅</h1>
+                <p>Hi {data.get('user_name', 'there')},</p>
+                <p>Your withdrawal request has been processed successfully.</p>
+                <div style="background: #F3F4F6; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3>Withdrawal Details:</h3>
+                    <p><strong>Amount:</strong> ₹{data.get('amount', '0')}</p>
+                    <p><strong>Method:</strong> {data.get('method', 'UPI')}</p>
+                    <p><strong>Account:</strong> {data.get('account', 'N/A')}</p>
+                </div>
+                <p>The amount will be credited to your account within 24-48 hours.</p>
+                <p style="margin-top: 30px;">Thank you!<br>Team CouponAli</p>
+            </div>
+        """,
+        "gift_card_delivery": f"""
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <h1 style="color: #4F46E5;">Your Gift Card 🎁</h1>
+                <p>Hi {data.get('user_name', 'there')},</p>
+                <p>Here is your gift card code. Use it at checkout to redeem its value.</p>
+                <div style="background: #F3F4F6; padding: 24px; border-radius: 10px; margin: 20px 0; text-align: center;">
+                    <h2 style="letter-spacing: 4px; font-size: 28px; color: #4F46E5; margin: 0;">{data.get('code','XXXX-XXXX')}</h2>
+                    <p style="margin-top:12px; font-size:16px;">Value: <strong>₹{data.get('value','0')}</strong></p>
+                </div>
+                {f'<p>This card expires on <strong>{data.get("expires_at")}</strong>.</p>' if data.get('expires_at') else ''}
+                <p style="font-size:12px; color:#555;">Keep this code secure. Treat it like cash.</p>
+                <p>Happy saving!<br>Team CouponAli</p>
+            </div>
+        """,
+        "password_reset": f"""
+            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <h1 style="color: #4F46E5;">Reset Your Password</h1>
+                <p>Hi {data.get('user_name', 'there')},</p>
+                <p>We received a request to reset your password. Click the button below to choose a new one:</p>
+                <div style="background: #EEF2FF; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center;">
+                    <a href="{data.get('reset_url', '#')}" style="background: #4F46E5; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">Reset Password</a>
+                    <p style="font-size: 12px; color: #555; margin-top: 12px;">Link expires in 30 minutes.</p>
+                </div>
+                <p>If you did not request this change, you can safely ignore this email.</p>
+                <p>Stay secure,<br>Team CouponAli</p>
+            </div>
+        """,
+    }
+    return templates.get(email_type, f"<p>{data.get('message', 'Notification from CouponAli')}</p>")
+
+
+def legacy_sms_message(sms_type: str, data: dict) -> str:
+    """Get SMS message based on type."""
+    templates = {
+        "otp": f"Your OTP for CouponAli is {data.get('otp', 'XXXXXX')}. Valid for 10 minutes. Do not share with anyone.",
+        "order_confirmation": f"Order {data.get('order_number', 'XXXXXX')} confirmed! Amount: ₹{data.get('total_amount', '0')}. Your voucher codes are ready. Check your email or app.",
+        "cashback_credited": f"₹{data.get('amount', '0')} cashback credited to your CouponAli wallet from {data.get('merchant_name', 'merchant')}. Total balance: ₹{data.get('wallet_balance', '0')}",
+        "withdrawal_processed": f"Withdrawal of ₹{data.get('amount', '0')} processed successfully. It will be credited to your account within 24 hours.",
+    }
+    return templates.get(sms_type, data.get("message", "Notification from CouponAli"))
+
+
+def _per_job_us(fn, jobs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(jobs):
+        fn()
+    return (time.perf_counter() - start) / jobs * 1e6
+
+
+def _campaign_html(kb: int) -> str:
+    block = '<p style="font-family: Arial;">Deals of the week, handpicked for -name-.</p>\n'
+    return "<html><body>" + block * (kb * 1024 // len(block)) + "</body></html>"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=1000, help="recipients per campaign batch")
+    args = parser.parse_args()
+    data = JOB["data"]
+
+    legacy = _per_job_us(
+        lambda: (legacy_email_subject(JOB["type"], data), legacy_email_html(JOB["type"], data)), args.jobs
+    )
+    compiled = _per_job_us(lambda: render_email(JOB["type"], data), args.jobs)
+    legacy_sms = _per_job_us(lambda: legacy_sms_message(JOB["type"], data), args.jobs)
+    compiled_sms = _per_job_us(lambda: render_sms(JOB["type"], data), args.jobs)
+    print(f"jobs:               {args.jobs}")
+    print(f"email legacy:       {legacy:8.1f} us/job")
+    print(f"email compiled:     {compiled:8.1f} us/job ({legacy / compiled:.2f}x)")
+    print(f"sms legacy:         {legacy_sms:8.1f} us/job")
+    print(f"sms compiled:       {compiled_sms:8.1f} us/job ({legacy_sms / compiled_sms:.2f}x)")
+
+    recipients = [{"id": i, "email": f"user{i}@example.com", "name": f"User {i}"} for i in range(args.batch)]
+    print(f"campaign batch of {args.batch} recipients:")
+    for kb in (10, 100, 500):
+        content = {"subject": "Weekly deals", "html": _campaign_html(kb), "text": None}
+        start = time.perf_counter()
+        sendgrid_payload(1, content, recipients, "noreply@couponali.com", "CouponAli")
+        shared = (time.perf_counter() - start) * 1e3
+        template = text_env.from_string(content["html"].replace("-name-", "{{ name }}"))
+        start = time.perf_counter()
+        for r in recipients:
+            template.render(name=r["name"])
+        per_recipient = (time.perf_counter() - start) * 1e3
+        print(f"  {kb:4d} KB body:     shared body {shared:8.2f} ms/batch, per-recipient render {per_recipient:8.2f} ms/batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Convert legacy offer:{id}:viewers Redis sets into HyperLogLogs and report the memory saved.
+
+Usage:
+    python scripts/migrate_viewer_sets.py [--keep-sets]
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from app.redis_client import MockRedis, migrate_viewer_sets, redis_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keep-sets", action="store_true", help="leave the original sets in place")
+    args = parser.parse_args()
+    if isinstance(redis_client, MockRedis):
+        print("Redis is not reachable (check REDIS_URL); nothing migrated")
+        return
+
+    report = migrate_viewer_sets(delete_sets=not args.keep_sets)
+    saved = report["set_bytes"] - report["hll_bytes"]
+    print(f"Migrated {report['offers']} offers ({report['members']} viewer ids)")
+    print(f"Sets:         {report['set_bytes'] / 1024:10.1f} KiB")
+    print(f"HyperLogLogs: {report['hll_bytes'] / 1024:10.1f} KiB")
+    if report["set_bytes"]:
+        print(f"Saved:        {saved / 1024:10.1f} KiB ({saved / report['set_bytes']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
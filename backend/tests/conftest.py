@@ -8,7 +8,7 @@ import redis
 from app.redis_client import rk
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db
 from app.config import get_settings
 
 settings = get_settings()
@@ -60,6 +60,7 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -1,9 +1,10 @@
 """Tests for admin endpoints: merchants, offers, products, withdrawals, analytics."""
 import pytest
+from unittest.mock import patch
 from fastapi import status
 from tests.factories import create_merchant, create_offer, create_product, create_user
 from app.security import create_access_token
-from app.models import Withdrawal, Order
+from app.models import Withdrawal, Order, Offer
 
 
 @pytest.fixture
@@ -99,3 +100,27 @@ class TestAdminAnalytics:
         data = resp.json()["data"]
         assert "series" in data
         assert data["period_days"] == 7
+
+    def test_offer_analytics_reports_unique_viewers(self, client, db_session, admin_header):
+        merchant = create_merchant(db_session, "ViewersMerchant")
+        offer = Offer(merchant_id=merchant.id, title="Viewers Offer", is_active=True)
+        db_session.add(offer)
+        db_session.commit()
+        with patch("app.api.v1.admin.get_offer_click_count", return_value=12), \
+                patch("app.api.v1.admin.offer_unique_viewers", side_effect=[9, 4]) as viewers:
+            resp = client.get(
+                f"/api/v1/admin/analytics/offers/{offer.id}",
+                params={"days": 7},
+                headers=admin_header,
+            )
+        assert resp.status_code == status.HTTP_200_OK
+        data = resp.json()["data"]
+        assert data["clicks"] == 12
+        assert data["unique_users"] == 9
+        assert data["unique_users_period"] == 4
+        start, end = viewers.call_args_list[1].args[1:]
+        assert (end - start).days == 6
+
+    def test_offer_analytics_unknown_offer(self, client, admin_header):
+        resp = client.get("/api/v1/admin/analytics/offers/999999", headers=admin_header)
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
@@ -44,7 +44,7 @@ def test_affiliate_sync_imports_transactions(db_session: Session, seed_entities,
     tx_id = f"TX{uuid.uuid4().hex[:8]}"
 
     async def fake_fetch_all():
-        return [
+        yield [
             ("admitad", {
                 "external_id": tx_id,
                 "status": "approved",
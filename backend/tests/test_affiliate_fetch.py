@@ -0,0 +1,85 @@
+"""Tests for concurrent affiliate network fetching and page prefetch."""
+import asyncio
+import time
+
+import pytest
+
+from app.services.affiliate_clients import PAGE_SIZE, prefetch_pages
+from app.tasks import affiliate_sync
+
+
+@pytest.mark.asyncio
+async def test_prefetch_pages_requests_ahead_and_stops_at_short_page():
+    requested = []
+    consumed = []
+
+    async def fetch_page(number):
+        requested.append(number)
+        await asyncio.sleep(0.01)
+        return [{"n": number}] * (PAGE_SIZE if number < 3 else 10)
+
+    async for page in prefetch_pages(fetch_page, prefetch=2):
+        consumed.append(page[0]["n"])
+        if page[0]["n"] == 0:
+            assert requested == [0, 1, 2]  # The next pages download while page 0 is processed
+
+    assert consumed == [0, 1, 2, 3]
+    assert requested == [0, 1, 2, 3, 4, 5]  # Requests past the end are cancelled
+
+
+@pytest.mark.asyncio
+async def test_prefetch_pages_stops_on_failed_page():
+    async def fetch_page(number):
+        return None if number == 1 else [{}] * PAGE_SIZE
+
+    pages = [page async for page in prefetch_pages(fetch_page, prefetch=1)]
+    assert len(pages) == 1
+
+
+class FakeNetwork:
+    def __init__(self, *args, **kwargs):
+        self.name = type(self).__name__
+
+    async def fetch_pages(self, start_date, end_date):
+        for page in range(2):
+            await asyncio.sleep(0.05)
+            yield [{"external_id": f"{self.name}-{page}-{i}"} for i in range(3)]
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_streams_networks_concurrently(monkeypatch):
+    for name in ("AdmitadClient", "VCommissionClient", "CueLinksClient"):
+        monkeypatch.setattr(affiliate_sync, name, type(name, (FakeNetwork,), {}))
+
+    start = time.perf_counter()
+    batches = [batch async for batch in affiliate_sync.fetch_all()]
+    elapsed = time.perf_counter() - start
+
+    assert len(batches) == 6 and all(len(batch) == 3 for batch in batches)
+    assert {network for batch in batches for network, _ in batch} == {"admitad", "vcommission", "cuelinks"}
+    assert elapsed < 0.25  # Sequential fetching would take 0.3s
+
+
+class EndlessNetwork(FakeNetwork):
+    async def fetch_pages(self, start_date, end_date):
+        while True:
+            yield [{"external_id": self.name}]
+
+
+class FailingNetwork(FakeNetwork):
+    async def fetch_pages(self, start_date, end_date):
+        yield [{"external_id": self.name}]
+        raise RuntimeError("network down")
+
+
+@pytest.mark.asyncio
+async def test_fetch_all_cancels_other_networks_when_one_fails(monkeypatch):
+    monkeypatch.setattr(affiliate_sync, "AdmitadClient", type("AdmitadClient", (FailingNetwork,), {}))
+    monkeypatch.setattr(affiliate_sync, "VCommissionClient", type("VCommissionClient", (EndlessNetwork,), {}))
+    monkeypatch.setattr(affiliate_sync, "CueLinksClient", type("CueLinksClient", (EndlessNetwork,), {}))
+
+    with pytest.raises(RuntimeError, match="network down"):
+        async for batch in affiliate_sync.fetch_all():
+            await asyncio.sleep(0)
+
+    assert asyncio.all_tasks() == {asyncio.current_task()}
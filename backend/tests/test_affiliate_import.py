@@ -0,0 +1,73 @@
+"""Tests for the set-based affiliate transaction upsert."""
+import uuid
+
+import pytest
+
+from app.models import AffiliateClick, AffiliateMerchantMap, AffiliateTransaction, CashbackEvent, Merchant, User
+from app.tasks.affiliate_sync import _process_results
+
+
+@pytest.fixture
+def seeded(db_session):
+    suffix = uuid.uuid4().hex[:6]
+    user = User(email=f"import-{suffix}@example.com", full_name="Import User", referral_code=f"IMP{suffix}", password_hash="x", is_active=True)
+    merchant = Merchant(name=f"Import Merchant {suffix}", slug=f"import-merchant-{suffix}")
+    db_session.add_all([user, merchant])
+    db_session.flush()
+    db_session.add_all([
+        AffiliateMerchantMap(network="admitad", external_merchant_id="M1", merchant_id=merchant.id),
+        AffiliateClick(user_id=user.id, merchant_id=merchant.id, network="admitad", external_click_id=f"C-{suffix}"),
+    ])
+    db_session.flush()
+    return {"user": user, "merchant": merchant, "click": f"C-{suffix}"}
+
+
+def _tx(external_id, status, click=None, amount=10.0):
+    return ("admitad", {
+        "external_id": external_id,
+        "status": status,
+        "commission_amount": amount,
+        "merchant_ext_id": "M1",
+        "click_ext_id": click,
+    })
+
+
+def _cashback(db_session, user):
+    return db_session.query(CashbackEvent).filter_by(user_id=user.id).all()
+
+
+def test_new_transactions_resolve_click_and_merchant(db_session, seeded):
+    ids = [f"T{uuid.uuid4().hex[:8]}" for _ in range(2)]
+    imported, updated = _process_results(db_session, [
+        _tx(ids[0], "approved", seeded["click"], 42.5),
+        _tx(ids[1], "pending"),
+    ])
+
+    assert (imported, updated) == (2, 0)
+    confirmed = db_session.query(AffiliateTransaction).filter_by(external_transaction_id=ids[0]).one()
+    assert confirmed.user_id == seeded["user"].id
+    assert confirmed.merchant_id == seeded["merchant"].id
+    assert confirmed.status == "confirmed" and confirmed.confirmed_at is not None
+    assert float(confirmed.amount) == 42.5
+    pending = db_session.query(AffiliateTransaction).filter_by(external_transaction_id=ids[1]).one()
+    assert pending.user_id is None and pending.merchant_id == seeded["merchant"].id
+    assert [float(c.amount) for c in _cashback(db_session, seeded["user"])] == [42.5]
+
+
+def test_status_changes_update_and_confirm_once(db_session, seeded):
+    tx_id = f"T{uuid.uuid4().hex[:8]}"
+    assert _process_results(db_session, [_tx(tx_id, "pending", seeded["click"])]) == (1, 0)
+    assert _process_results(db_session, [_tx(tx_id, "pending", seeded["click"])]) == (0, 0)
+    assert _process_results(db_session, [_tx(tx_id, "approved", seeded["click"])]) == (0, 1)
+    assert len(_cashback(db_session, seeded["user"])) == 1
+
+    # Flipping back to confirmed keeps the first confirmation and pays nothing more
+    assert _process_results(db_session, [_tx(tx_id, "declined", seeded["click"])]) == (0, 1)
+    assert _process_results(db_session, [_tx(tx_id, "confirmed", seeded["click"])]) == (0, 1)
+    assert len(_cashback(db_session, seeded["user"])) == 1
+
+
+def test_repeated_transaction_in_batch_keeps_last_state(db_session, seeded):
+    tx_id = f"T{uuid.uuid4().hex[:8]}"
+    assert _process_results(db_session, [_tx(tx_id, "pending"), _tx(tx_id, "rejected")]) == (1, 0)
+    assert db_session.query(AffiliateTransaction).filter_by(external_transaction_id=tx_id).one().status == "rejected"
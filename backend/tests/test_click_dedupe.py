@@ -0,0 +1,104 @@
+"""Tests for Bloom-filter click dedupe and bot filtering."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import bloom as bloom_module
+from app import ingest
+from app.bloom import WindowedBloomFilter
+from app.models import Merchant, Offer
+
+
+class _FakeBitmaps:
+    """Just enough of redis-py's register_script to run the bloom scripts' logic."""
+
+    def __init__(self):
+        self.bits: dict[str, set[int]] = {}
+
+    def register_script(self, source):
+        if source == bloom_module.ADD_SCRIPT:
+            def add(keys, args):
+                self.bits.setdefault(keys[0], set()).update(int(p) for p in args[1:])
+                return 1
+            return add
+
+        def contains(keys, args):
+            positions = [int(p) for p in args]
+            return int(any(all(p in self.bits.get(key, set()) for p in positions) for key in keys))
+        return contains
+
+
+@pytest.fixture
+def bloom():
+    fake = _FakeBitmaps()
+    with patch("app.bloom.redis_client", fake):
+        yield WindowedBloomFilter("t", window_seconds=30, capacity=1000, fp_rate=0.01, max_bytes=1 << 20)
+
+
+def test_sizing_matches_target_fp_rate(bloom):
+    assert bloom.hashes == 7
+    assert bloom.effective_fp_rate == pytest.approx(0.01, rel=0.05)
+
+
+def test_memory_budget_caps_bitmap():
+    capped = WindowedBloomFilter("t", window_seconds=30, capacity=1000000, fp_rate=0.001, max_bytes=1024)
+    assert capped.bits == 8192
+    assert capped.effective_fp_rate > 0.001
+
+
+def test_duplicate_within_window_and_next_window(bloom):
+    assert bloom.contains("1:ip:a", now=0) is False
+    bloom.add("1:ip:a", now=0)
+    assert bloom.contains("1:ip:a", now=10) is True
+    assert bloom.contains("1:ip:a", now=40) is True  # previous window still consulted
+    assert bloom.contains("2:ip:a", now=40) is False
+
+
+def test_expires_after_two_windows(bloom):
+    bloom.add("1:ip:a", now=0)
+    assert bloom.contains("1:ip:a", now=65) is False
+
+
+def test_click_visitor_prefers_user_then_ip_and_user_agent():
+    assert ingest.click_visitor(7, "10.0.0.1", "Mozilla/5.0") == "u:7"
+    assert ingest.click_visitor(None, "10.0.0.1", "Mozilla/5.0 (iPhone)") != ingest.click_visitor(
+        None, "10.0.0.1", "Mozilla/5.0 (Android)"
+    )
+
+
+def test_click_counts_as_seen_only_once_remembered(bloom):
+    with patch.object(ingest, "click_dedupe", bloom):
+        assert ingest.filter_click(1, "ip:a", "Mozilla/5.0") is None
+        assert ingest.filter_click(1, "ip:a", "Mozilla/5.0") is None  # e.g. retried after a 503
+        ingest.remember_click(1, "ip:a")
+        assert ingest.filter_click(1, "ip:a", "Mozilla/5.0") == "duplicate"
+
+
+def test_filter_click_drops_bots_and_fails_open():
+    assert ingest.filter_click(1, "ip:a", "Googlebot/2.1") == "bot"
+    assert ingest.filter_click(1, "ip:a", None) == "bot"
+    broken = MagicMock(side_effect=ConnectionError)
+    with patch.object(ingest.click_dedupe, "contains", broken), patch.object(ingest.click_dedupe, "add", broken):
+        assert ingest.filter_click(1, "ip:a", "Mozilla/5.0") is None
+        ingest.remember_click(1, "ip:a")
+
+
+def test_click_refused_with_503_is_counted_on_retry(client, db_session, bloom):
+    merchant = Merchant(name="Dedupe Merchant", slug="dedupe-merchant", is_active=True)
+    db_session.add(merchant)
+    db_session.flush()
+    offer = Offer(merchant_id=merchant.id, title="Dedupe Offer", is_active=True)
+    db_session.add(offer)
+    db_session.flush()
+    headers = {"User-Agent": "Mozilla/5.0", "X-Real-IP": "203.0.113.9"}
+
+    with patch.object(ingest, "click_dedupe", bloom), \
+            patch("app.api.v1.offers.track_offer_click"):
+        with patch.object(ingest, "_append", return_value=None):
+            assert client.post(f"/api/v1/offers/{offer.id}/click", headers=headers).status_code == 503
+        with patch.object(ingest, "_append", return_value="1-0"):
+            retried = client.post(f"/api/v1/offers/{offer.id}/click", headers=headers).json()
+            repeated = client.post(f"/api/v1/offers/{offer.id}/click", headers=headers).json()
+
+    assert retried["data"]["click_id"] is not None
+    assert repeated["data"]["click_id"] is None
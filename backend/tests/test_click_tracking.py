@@ -0,0 +1,45 @@
+"""Tests for pipelined click tracking and hot-offer counter sharding."""
+from unittest.mock import MagicMock, patch
+
+from app import redis_client as rc
+
+
+def _tracker(threshold=3):
+    return rc.HotKeyTracker(threshold=threshold, ttl=600, refresh_seconds=3600)
+
+
+def test_click_is_one_pipeline_round_trip():
+    fake = MagicMock()
+    with patch.object(rc, "redis_client", fake), patch.object(rc, "hot_keys", _tracker()):
+        rc.track_offer_click(7, user_id=99)
+
+    pipe = fake.pipeline.return_value
+    pipe.execute.assert_called_once()
+    pipe.incr.assert_called_once_with("offer:7:clicks")
+    fake.incr.assert_not_called()
+    fake.zincrby.assert_not_called()
+
+
+def test_offer_is_promoted_and_sharded_after_threshold():
+    fake = MagicMock()
+    fake.zrangebyscore.return_value = []
+    tracker = _tracker(threshold=3)
+    with patch.object(rc, "redis_client", fake), patch.object(rc, "hot_keys", tracker):
+        for _ in range(3):
+            rc.track_offer_click(7)
+        pipe = fake.pipeline.return_value
+        pipe.zadd.assert_called_once()
+        assert list(pipe.zadd.call_args.args[1]) == ["7"]
+
+        rc.track_offer_click(7)
+    key = pipe.incr.call_args.args[0]
+    assert key.startswith("offer:7:clicks:s")
+
+
+def test_click_count_sums_shards():
+    fake = MagicMock()
+    fake.mget.return_value = ["10", None, "3", "2"] + [None] * (rc.settings.CLICK_COUNTER_SHARDS - 3)
+    with patch.object(rc, "redis_client", fake):
+        assert rc.get_offer_click_count(7) == 15
+    keys = fake.mget.call_args.args[0]
+    assert keys[0] == "offer:7:clicks" and keys[1] == "offer:7:clicks:s0"
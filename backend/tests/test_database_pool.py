@@ -0,0 +1,53 @@
+"""Tests for engine pool configuration and pool metrics."""
+import sqlite3
+
+from prometheus_client import REGISTRY
+
+from app import database
+from app.database import InstrumentedQueuePool
+
+
+def _sample(name, pool):
+    return REGISTRY.get_sample_value(name, {"pool": pool})
+
+
+def test_engine_uses_pool_and_echo_settings(monkeypatch):
+    for name, value in {
+        "DATABASE_POOL_SIZE": 7,
+        "DATABASE_MAX_OVERFLOW": 3,
+        "DATABASE_POOL_TIMEOUT": 12,
+        "DATABASE_POOL_RECYCLE": 600,
+        "DATABASE_ECHO": True,
+    }.items():
+        monkeypatch.setattr(database.settings, name, value)
+
+    engine = database._build_engine("postgresql+psycopg://user:pw@localhost/app", "configured")
+
+    assert isinstance(engine.pool, InstrumentedQueuePool)
+    assert engine.pool.metrics_label == "configured"
+    assert engine.pool.size() == 7
+    assert engine.pool._max_overflow == 3
+    assert engine.pool._timeout == 12
+    assert engine.pool._recycle == 600
+    assert engine.echo is True
+
+
+def test_checkout_metrics_follow_connect_and_release(tmp_path):
+    pool = InstrumentedQueuePool(lambda: sqlite3.connect(tmp_path / "pool.db"), pool_size=2, max_overflow=1)
+    pool.metrics_label = "metrics-test"
+    waits = _sample("app_db_pool_checkout_wait_seconds_count", "metrics-test") or 0
+
+    first = pool.connect()
+    second = pool.connect()
+    assert _sample("app_db_pool_checked_out", "metrics-test") == 2
+    assert _sample("app_db_pool_size", "metrics-test") == 2
+    assert _sample("app_db_pool_checkout_wait_seconds_count", "metrics-test") == waits + 2
+
+    third = pool.connect()
+    assert _sample("app_db_pool_checked_out", "metrics-test") == 3
+    assert _sample("app_db_pool_overflow", "metrics-test") == 1
+
+    for conn in (first, second, third):
+        conn.close()
+    assert _sample("app_db_pool_checked_out", "metrics-test") == 0
+    pool.dispose()
@@ -0,0 +1,121 @@
+"""Tests for read-replica routing in RoutingSession."""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, select, text, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+
+from app.database import ReplicaRouter, RoutingSession
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class Note(_Base):
+    __tablename__ = "notes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    body: Mapped[str] = mapped_column(String(50))
+
+
+def _engine(path, tag):
+    engine = create_engine(f"sqlite:///{path}")
+    _Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Note.__table__.insert(), {"body": tag})
+    return engine
+
+
+@pytest.fixture
+def router(tmp_path):
+    primary = _engine(tmp_path / "primary.db", "primary")
+    replicas = [_engine(tmp_path / f"replica{i}.db", f"replica{i}") for i in range(2)]
+    router = ReplicaRouter(primary, replicas, max_lag_seconds=5.0, check_interval=60)
+    for replica in router.replicas:
+        router._probe(replica)
+    return router
+
+
+def _session(router, **info):
+    return sessionmaker(class_=RoutingSession, router=router)(info=info)
+
+
+def _source(session):
+    return session.scalar(select(Note.body).order_by(Note.id).limit(1))
+
+
+def test_default_session_reads_primary(router):
+    with _session(router) as db:
+        assert _source(db) == "primary"
+
+
+def test_read_only_session_round_robins_replicas(router):
+    seen = set()
+    for _ in range(4):
+        with _session(router, read_only=True) as db:
+            seen.add(_source(db))
+    assert seen == {"replica0", "replica1"}
+
+
+def test_read_only_session_pins_one_replica(router):
+    with _session(router, read_only=True) as db:
+        assert len({_source(db) for _ in range(4)}) == 1
+
+
+def test_marked_statement_uses_replica(router):
+    with _session(router) as db:
+        body = db.scalar(select(Note.body).order_by(Note.id).limit(1).execution_options(use_replica=True))
+        assert body.startswith("replica")
+
+
+def test_writes_stick_to_primary(router):
+    with _session(router, read_only=True) as db:
+        db.add(Note(body="written"))
+        db.flush()
+        assert db.scalar(select(Note.body).where(Note.body == "written")) == "written"
+        db.commit()
+    with router.primary.connect() as conn:
+        assert conn.scalar(text("SELECT count(*) FROM notes WHERE body = 'written'")) == 1
+
+
+def test_lagging_or_unhealthy_replicas_fall_back_to_primary(router):
+    router.check_interval = 3600
+    for replica in router.replicas:
+        replica.checked_at = float("inf")
+    router.replicas[0].healthy = False
+    router.replicas[1].healthy = False
+    with _session(router, read_only=True) as db:
+        assert _source(db) == "primary"
+
+
+def test_unprobed_replicas_are_not_used(tmp_path):
+    primary = _engine(tmp_path / "primary.db", "primary")
+    router = ReplicaRouter(primary, [_engine(tmp_path / "replica.db", "replica")], 5.0, check_interval=60)
+    router.replicas[0].checked_at = float("inf")
+    with _session(router, read_only=True) as db:
+        assert _source(db) == "primary"
+
+
+def test_probe_runs_off_the_request_thread(router):
+    release = threading.Event()
+    probed = []
+
+    def slow_probe(replica):
+        probed.append(replica)
+        release.wait(5)
+
+    router._probe = slow_probe
+    router.check_interval = 0
+    start = time.perf_counter()
+    for _ in range(4):
+        assert router.get_read_engine() in {r.engine for r in router.replicas}
+    elapsed = time.perf_counter() - start
+    release.set()
+    for replica in router.replicas:
+        assert replica.probing.acquire(timeout=5)
+        replica.probing.release()
+
+    assert elapsed < 1  # Callers keep the last known state while probes are slow
+    assert len(probed) == 2  # One probe in flight per replica
@@ -0,0 +1,31 @@
+"""Tests for the email/SMS provider handlers."""
+import json
+
+import httpx
+import pytest
+
+from workers import email_sms_worker as worker
+
+
+@pytest.mark.asyncio
+async def test_process_email_uses_shared_client():
+    requests = []
+
+    def respond(request):
+        requests.append(request)
+        return httpx.Response(202)
+
+    async with httpx.AsyncClient(base_url="https://api.sendgrid.com", transport=httpx.MockTransport(respond)) as client:
+        await worker._process_email(client, {"type": "welcome", "to": "a@example.com", "data": {}})
+        await worker._process_email(client, {"type": "welcome", "to": "b@example.com", "data": {}})
+
+    assert [r.url.path for r in requests] == ["/v3/mail/send", "/v3/mail/send"]
+    assert json.loads(requests[1].content)["personalizations"][0]["to"][0]["email"] == "b@example.com"
+
+
+@pytest.mark.asyncio
+async def test_process_email_raises_on_provider_error():
+    transport = httpx.MockTransport(lambda request: httpx.Response(429, text="rate limited"))
+    async with httpx.AsyncClient(base_url="https://api.sendgrid.com", transport=transport) as client:
+        with pytest.raises(Exception, match="429"):
+            await worker._process_email(client, {"type": "welcome", "to": "a@example.com", "data": {}})
@@ -0,0 +1,105 @@
+"""Tests for buffered click/view ingestion."""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app import ingest
+from app.models import Merchant, Offer, OfferClick, OfferView, User
+from app.security import create_access_token
+
+
+def _offer(db):
+    merchant = Merchant(name="Ingest Merchant", slug="ingest-merchant", is_active=True)
+    db.add(merchant)
+    db.flush()
+    offer = Offer(merchant_id=merchant.id, title="Ingest Offer", is_active=True)
+    db.add(offer)
+    db.flush()
+    return offer
+
+
+def test_write_events_skips_redelivered_events(db_session):
+    offer = _offer(db_session)
+    events = [ingest.new_event("view", offer.id), ingest.new_event("click", offer.id)]
+
+    assert ingest.write_events(db_session, events) == {"view": 1, "click": 1}
+    db_session.commit()
+    # Same batch delivered again, as after a flusher crash before XACK
+    ingest.write_events(db_session, events)
+    db_session.commit()
+
+    assert db_session.scalar(select(func.count()).select_from(OfferView)) == 1
+    assert db_session.scalar(select(func.count()).select_from(OfferClick)) == 1
+    click = db_session.scalar(select(OfferClick))
+    assert click.event_id == events[1]["id"]
+
+
+def test_record_event_writes_directly_without_redis(db_session):
+    offer = _offer(db_session)
+    with patch.object(ingest, "_append", side_effect=ConnectionError):
+        event, buffered = ingest.record_event(db_session, "view", offer.id)
+
+    assert buffered is False
+    assert db_session.scalar(select(OfferView.event_id)) == event["id"]
+
+
+def test_view_endpoint_rejects_when_backlog_full(client, db_session):
+    offer = _offer(db_session)
+    with patch.object(ingest, "_append", return_value=None), \
+            patch("app.dependencies.settings.INTERNAL_API_KEY", "k"):
+        response = client.post("/api/v1/offer-views/", json={"offer_id": offer.id}, headers={"X-Internal-Key": "k"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.fixture
+def foreign_keys(db_session):
+    """Enforce foreign keys on the SQLite fallback too (Postgres always does)."""
+    if db_session.get_bind().dialect.name != "sqlite":
+        yield
+        return
+    db_session.execute(text("PRAGMA foreign_keys=ON"))
+    yield
+    # The pragma cannot be undone inside the open transaction; retire the connection
+    db_session.connection().invalidate()
+
+
+def test_write_valid_events_drops_event_for_missing_offer(db_session, foreign_keys):
+    offer = _offer(db_session)
+    good = [ingest.new_event("click", offer.id) for _ in range(5)]
+    bad = ingest.new_event("click", offer.id + 100000)
+    malformed = {"id": "x", "kind": "view"}
+
+    counts, rejected = ingest.write_valid_events(db_session, good[:2] + [bad] + good[2:] + [malformed])
+    db_session.commit()
+
+    assert rejected == [bad, malformed]
+    assert counts == {"click": 5}
+    assert set(db_session.scalars(select(OfferClick.event_id))) == {e["id"] for e in good}
+
+
+def test_authenticated_click_is_flushed_with_user_id(client, db_session):
+    offer = _offer(db_session)
+    user = User(email="clicker@example.com", full_name="Clicker", referral_code="CLICK1", password_hash="x", is_active=True)
+    db_session.add(user)
+    db_session.flush()
+    buffered = []
+
+    def append(event):
+        buffered.append(event)
+        return "1-0"
+
+    headers = {"Authorization": f"Bearer {create_access_token(str(user.id))}", "User-Agent": "Mozilla/5.0"}
+    with patch.object(ingest, "_append", side_effect=append), \
+            patch.object(ingest.click_dedupe, "contains", return_value=False), \
+            patch.object(ingest.click_dedupe, "add"), \
+            patch("app.api.v1.offers.track_offer_click") as track:
+        response = client.post(f"/api/v1/offers/{offer.id}/click", headers=headers)
+
+    assert response.status_code == 202
+    track.assert_called_once_with(offer.id, user.id)
+    # What workers.event_flusher does with the buffered entry
+    ingest.write_valid_events(db_session, buffered)
+    assert db_session.scalar(select(OfferClick.user_id).where(OfferClick.offer_id == offer.id)) == user.id
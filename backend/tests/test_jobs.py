@@ -0,0 +1,76 @@
+"""Tests for job definitions, payload validation and idempotent submission."""
+import json
+import time
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+
+from app import jobs
+from app.queue import lane_key, scheduled_key
+
+
+def test_build_job_validates_and_serializes_payload():
+    job = jobs.build_job(
+        jobs.WITHDRAWAL_REQUESTED_EMAIL,
+        {"user_name": "Asha", "amount": Decimal("250.50"), "method": "upi", "withdrawal_id": 7, "status": "pending"},
+        to="asha@example.com",
+    )
+    assert job["type"] == "withdrawal_requested"
+    assert job["to"] == "asha@example.com"
+    assert job["data"]["amount"] == 250.5
+    json.dumps(job)  # Decimals and datetimes are JSON-safe after validation
+
+    sms = jobs.build_job(jobs.WITHDRAWAL_REQUESTED_SMS, {"amount": 250, "method": "upi"}, to="+919876543210")
+    assert sms["mobile"] == "+919876543210" and "to" not in sms
+
+
+def test_build_job_rejects_bad_payloads():
+    with pytest.raises(ValidationError):
+        jobs.build_job(jobs.PASSWORD_RESET_EMAIL, {"user_name": "Asha"}, to="a@example.com")
+    with pytest.raises(ValidationError):
+        jobs.build_job(jobs.NEWSLETTER_WELCOME_EMAIL, {"name": "Asha", "typo": 1}, to="a@example.com")
+
+
+def test_build_job_keeps_optional_fields_unset():
+    job = jobs.build_job(jobs.WELCOME_EMAIL, {"user_name": "Asha"}, to="a@example.com")
+    assert job["data"] == {"user_name": "Asha"}
+
+
+def test_every_job_has_a_known_queue():
+    for (queue_name, _), spec in jobs.JOBS.items():
+        assert queue_name == spec.queue
+        assert queue_name in jobs.QUEUES or queue_name == "newsletter"
+
+
+class TestSubmit:
+    @pytest.fixture(autouse=True)
+    def clean_keys(self, redis_client):
+        pattern = jobs.idempotency_key(jobs.WELCOME_EMAIL, "*")
+        for key in redis_client.scan_iter(match=pattern):
+            redis_client.delete(key)
+        yield
+        for key in redis_client.scan_iter(match=pattern):
+            redis_client.delete(key)
+
+    def test_submit_enqueues_on_the_jobs_queue(self, redis_client):
+        job_id = jobs.submit(jobs.WELCOME_EMAIL, {"user_name": "Asha"}, to="a@example.com")
+        raw = redis_client.lrange(lane_key("email", "normal"), 0, -1)
+        assert [json.loads(r)["id"] for r in raw] == [job_id]
+
+    def test_same_key_enqueues_once(self, redis_client):
+        first = jobs.submit(jobs.WELCOME_EMAIL, {"user_name": "Asha"}, to="a@example.com", key="user-1")
+        second = jobs.submit(jobs.WELCOME_EMAIL, {"user_name": "Asha"}, to="a@example.com", key="user-1")
+        other = jobs.submit(jobs.WELCOME_EMAIL, {"user_name": "Ravi"}, to="b@example.com", key="user-2")
+
+        assert second == first
+        assert other != first
+        assert redis_client.llen(lane_key("email", "normal")) == 2
+
+    def test_key_is_claimed_with_the_push(self, redis_client):
+        job_id = jobs.submit(jobs.WELCOME_EMAIL, {"user_name": "Asha"}, to="a@example.com", key="user-1", run_at=time.time() + 60)
+
+        assert redis_client.get(jobs.idempotency_key(jobs.WELCOME_EMAIL, "user-1")) == job_id
+        assert redis_client.zcard(scheduled_key("email")) == 1
+        assert jobs.submit(jobs.WELCOME_EMAIL, {"user_name": "Asha"}, to="a@example.com", key="user-1") == job_id
+        assert redis_client.llen(lane_key("email", "normal")) == 0
@@ -0,0 +1,175 @@
+"""Tests for batched newsletter campaign delivery."""
+import json
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app import newsletter
+from app.models.newsletter import NewsletterCampaign, NewsletterDelivery, NewsletterSubscriber
+from workers import email_sms_worker as worker
+
+
+def _campaign(db, subscribers=3):
+    campaign = NewsletterCampaign(name="Diwali", subject="Big sale", html_content="<p>Hi -name-</p>")
+    db.add(campaign)
+    subs = [NewsletterSubscriber(email=f"s{i}@example.com", name=None if i == 0 else f"Sub {i}") for i in range(subscribers)]
+    db.add_all(subs)
+    db.flush()
+    return campaign, subs
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = MagicMock()
+    fake.get.return_value = None
+    monkeypatch.setattr(newsletter, "redis_client", fake)
+    return fake
+
+
+def _sending(db, campaign):
+    campaign.status = "sending"
+    db.flush()
+
+
+def _pushed(fake):
+    """Batch jobs and cursor values of each fan-out chunk, in order."""
+    pipe = fake.pipeline.return_value
+    batches = [[json.loads(job) for job in call.args[1:]] for call in pipe.rpush.call_args_list]
+    cursors = [call.args[1] for call in pipe.set.call_args_list]
+    return batches, cursors
+
+
+def _delivered(db, campaign):
+    return db.scalars(
+        select(NewsletterDelivery.subscriber_id)
+        .where(NewsletterDelivery.campaign_id == campaign.id)
+        .order_by(NewsletterDelivery.subscriber_id)
+    ).all()
+
+
+def test_fan_out_streams_chunks_with_checkpoint(db_session, fake_redis, monkeypatch):
+    monkeypatch.setattr(newsletter.settings, "NEWSLETTER_FANOUT_CHUNK", 2)
+    campaign, subs = _campaign(db_session, subscribers=5)
+    db_session.add(NewsletterSubscriber(email="gone@example.com", status="unsubscribed"))
+    _sending(db_session, campaign)
+
+    assert newsletter.fan_out_campaign(db_session, campaign.id) == 5
+
+    batches, cursors = _pushed(fake_redis)
+    assert [len(jobs) for jobs in batches] == [1, 1, 1]
+    assert [len(jobs[0]["data"]["recipients"]) for jobs in batches] == [2, 2, 1]
+    assert "html" not in json.dumps(batches)
+    assert cursors == [subs[1].id, subs[3].id, subs[4].id]
+    assert _delivered(db_session, campaign) == [s.id for s in subs]
+    assert campaign.status == "sent"
+    fake_redis.delete.assert_called_once_with(newsletter.fanout_cursor_key(campaign.id))
+
+
+def test_fan_out_resumes_after_cursor_and_drops_unpushed_rows(db_session, fake_redis):
+    campaign, subs = _campaign(db_session, subscribers=5)
+    _sending(db_session, campaign)
+    # Crash after chunk 3 was committed but before its jobs were pushed
+    fake_redis.get.return_value = str(subs[2].id)
+    db_session.add_all([
+        NewsletterDelivery(campaign_id=campaign.id, subscriber_id=s.id, status="queued") for s in subs[:4]
+    ])
+    db_session.flush()
+
+    assert newsletter.fan_out_campaign(db_session, campaign.id) == 2
+
+    batches, _ = _pushed(fake_redis)
+    assert [r["id"] for r in batches[0][0]["data"]["recipients"]] == [subs[3].id, subs[4].id]
+    assert _delivered(db_session, campaign) == [s.id for s in subs]
+
+
+def test_fan_out_stops_at_checkpoint(db_session, fake_redis, monkeypatch):
+    monkeypatch.setattr(newsletter.settings, "NEWSLETTER_FANOUT_CHUNK", 2)
+    campaign, subs = _campaign(db_session, subscribers=5)
+    _sending(db_session, campaign)
+
+    assert newsletter.fan_out_campaign(db_session, campaign.id, should_stop=lambda: True) == 2
+    assert campaign.status == "sending"
+    fake_redis.delete.assert_not_called()
+
+
+def test_mark_batch_sent_is_idempotent(db_session):
+    campaign, subs = _campaign(db_session)
+    db_session.add_all([NewsletterDelivery(campaign_id=campaign.id, subscriber_id=s.id, status="queued") for s in subs])
+    db_session.flush()
+    ids = [s.id for s in subs]
+
+    assert newsletter.mark_batch_sent(db_session, campaign.id, ids) == 3
+    assert newsletter.mark_batch_sent(db_session, campaign.id, ids) == 0
+    db_session.refresh(campaign)
+    assert campaign.sent_count == 3
+
+
+def test_sendgrid_payload_has_one_personalization_per_recipient():
+    content = {"subject": "Big sale", "html": "<p>Hi -name-</p>", "text": "Hi -name-"}
+    recipients = [{"id": 1, "email": "a@example.com", "name": None}, {"id": 2, "email": "b@example.com", "name": "Bee"}]
+
+    payload = newsletter.sendgrid_payload(7, content, recipients, "noreply@example.com", "Shop")
+
+    assert [p["substitutions"]["-name-"] for p in payload["personalizations"]] == ["there", "Bee"]
+    assert payload["personalizations"][1]["custom_args"] == {"campaign_id": "7", "subscriber_id": "2"}
+    assert [c["type"] for c in payload["content"]] == ["text/plain", "text/html"]
+
+
+@pytest.mark.asyncio
+async def test_worker_sends_batch_in_one_request(monkeypatch):
+    requests, recorded = [], []
+    monkeypatch.setattr(worker, "campaign_content", lambda cid: {"subject": "S", "html": "<p>-name-</p>", "text": None})
+    monkeypatch.setattr(worker, "record_batch_sent", lambda cid, ids: recorded.append((cid, ids)))
+    recipients = [{"id": i, "email": f"u{i}@example.com", "name": None} for i in range(1000)]
+    job = {"type": newsletter.NEWSLETTER_BATCH_JOB, "data": {"campaign_id": 7, "recipients": recipients}}
+
+    def respond(request):
+        requests.append(request)
+        return httpx.Response(202)
+
+    async with httpx.AsyncClient(base_url="https://api.sendgrid.com", transport=httpx.MockTransport(respond)) as client:
+        await worker._process_email(client, job)
+
+    assert len(requests) == 1
+    assert len(json.loads(requests[0].content)["personalizations"]) == 1000
+    assert recorded == [(7, list(range(1000)))]
+
+
+def test_scheduled_fan_out_starts_campaign_at_send_at(db_session, fake_redis):
+    campaign, subs = _campaign(db_session, subscribers=3)
+    campaign.status = "scheduled"
+    campaign.send_at = datetime(2030, 1, 1, 9, 30)
+    db_session.flush()
+
+    assert newsletter.fan_out_campaign(db_session, campaign.id, send_at=datetime(2030, 1, 1, 9, 0)) == 0
+    assert campaign.status == "scheduled"
+
+    assert newsletter.fan_out_campaign(db_session, campaign.id, send_at=campaign.send_at) == 3
+    assert campaign.total_recipients == 3
+    assert campaign.status == "sent"
+
+
+def test_fan_out_handler_requeues_when_worker_stops(monkeypatch):
+    from app import jobs
+    from workers import newsletter_fanout
+
+    calls = []
+
+    def fan_out_campaign(db, campaign_id, should_stop, send_at):
+        calls.append((campaign_id, send_at))
+        jobs.stopping.set()  # SIGTERM arrives mid fan-out
+        assert should_stop()
+        return 10
+
+    monkeypatch.setattr(newsletter_fanout, "fan_out_campaign", fan_out_campaign)
+    monkeypatch.setattr(newsletter_fanout, "SessionLocal", MagicMock)
+    job = {"id": "newsletter_a", "data": {"campaign_id": 7, "send_at": "2026-01-01T09:00:00"}}
+    try:
+        with pytest.raises(jobs.Requeue):
+            newsletter_fanout.fan_out(job)
+    finally:
+        jobs.stopping.clear()
+    assert calls == [(7, datetime(2026, 1, 1, 9, 0))]
@@ -0,0 +1,136 @@
+"""Tests for monthly partition naming, retention math and maintenance on Postgres."""
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.tasks import partitions
+from app.tasks.partitions import (
+    add_months,
+    list_partitions,
+    maintain_partitions,
+    month_start,
+    parse_partition_month,
+    partition_name,
+)
+from workers import cron_jobs
+
+SCHEMA = "partition_maintenance_test"
+
+
+def test_add_months_crosses_year_boundaries():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -13) == date(2024, 12, 1)
+
+
+def test_partition_name_round_trips():
+    name = partition_name("offer_clicks", date(2026, 3, 1))
+    assert name == "offer_clicks_p202603"
+    assert parse_partition_month("offer_clicks", name) == date(2026, 3, 1)
+
+
+def test_parse_ignores_default_and_foreign_partitions():
+    assert parse_partition_month("offer_clicks", "offer_clicks_default") is None
+    assert parse_partition_month("offer_views", "offer_clicks_p202603") is None
+
+
+def test_maintain_is_noop_off_postgres():
+    assert maintain_partitions(create_engine("sqlite://")) == {}
+
+
+@pytest.fixture
+def pg_engine(db_session):
+    """Engine whose search_path is a scratch schema, so partitioned tables don't clash with the app's."""
+    if db_session.bind.dialect.name != "postgresql":
+        pytest.skip("Postgres required for partition maintenance tests")
+    admin = db_session.bind.engine
+    with admin.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE'))
+        conn.execute(text(f'CREATE SCHEMA "{SCHEMA}"'))
+    engine = create_engine(admin.url, connect_args={"options": f"-csearch_path={SCHEMA}"})
+    yield engine
+    engine.dispose()
+    with admin.begin() as conn:
+        conn.execute(text(f'DROP SCHEMA IF EXISTS "{SCHEMA}" CASCADE'))
+
+
+def create_partitioned(engine, table, months):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f'CREATE TABLE "{table}" (id bigserial, created_at timestamp NOT NULL, '
+            f"PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)"
+        ))
+        conn.execute(text(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT'))
+        for month in months:
+            conn.execute(text(
+                f'CREATE TABLE "{partition_name(table, month)}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            ))
+
+
+def partitions_of(engine, table):
+    with engine.connect() as conn:
+        return set(list_partitions(conn, table))
+
+
+def test_maintain_creates_upcoming_and_drops_expired_partitions(pg_engine, monkeypatch):
+    monkeypatch.setattr(partitions.settings, "EVENT_RETENTION_MONTHS", 3)
+    current = date(2026, 10, 1)
+    create_partitioned(pg_engine, "offer_clicks", [add_months(current, i) for i in range(-5, 1)])
+
+    summary = maintain_partitions(pg_engine, months_ahead=2, today=date(2026, 10, 19))
+
+    # Only offer_clicks exists in the scratch schema; the other tables are skipped
+    assert set(summary) == {"offer_clicks"}
+    assert summary["offer_clicks"] == {
+        "created": ["offer_clicks_p202611", "offer_clicks_p202612"],
+        "dropped": ["offer_clicks_p202605", "offer_clicks_p202606"],
+    }
+    assert partitions_of(pg_engine, "offer_clicks") == {
+        "offer_clicks_default",
+        "offer_clicks_p202607",
+        "offer_clicks_p202608",
+        "offer_clicks_p202609",
+        "offer_clicks_p202610",
+        "offer_clicks_p202611",
+        "offer_clicks_p202612",
+    }
+    # A second run is a no-op
+    assert maintain_partitions(pg_engine, months_ahead=2, today=date(2026, 10, 19))["offer_clicks"] == {
+        "created": [],
+        "dropped": [],
+    }
+
+
+def test_clean_old_logs_drops_expired_audit_partitions(pg_engine, monkeypatch):
+    monkeypatch.setattr(cron_jobs, "engine", pg_engine)
+    monkeypatch.setattr(cron_jobs.settings, "AUDIT_LOG_RETENTION_MONTHS", 2)
+    current = month_start(datetime.now(timezone.utc).date())
+    create_partitioned(pg_engine, "audit_logs", [add_months(current, i) for i in range(-4, 1)])
+
+    cron_jobs.clean_old_logs()
+
+    assert partitions_of(pg_engine, "audit_logs") == {
+        "audit_logs_default",
+        partition_name("audit_logs", add_months(current, -2)),
+        partition_name("audit_logs", add_months(current, -1)),
+        partition_name("audit_logs", current),
+    }
+
+
+def test_clean_old_logs_deletes_rows_from_unpartitioned_table(pg_engine, monkeypatch):
+    monkeypatch.setattr(cron_jobs, "engine", pg_engine)
+    monkeypatch.setattr(cron_jobs.settings, "AUDIT_LOG_RETENTION_MONTHS", 2)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with pg_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE audit_logs (id serial PRIMARY KEY, created_at timestamp NOT NULL)"))
+        conn.execute(
+            text("INSERT INTO audit_logs (created_at) VALUES (:old), (:recent)"),
+            {"old": now - timedelta(days=90), "recent": now - timedelta(days=1)},
+        )
+
+    cron_jobs.clean_old_logs()
+
+    with pg_engine.connect() as conn:
+        remaining = conn.execute(text("SELECT created_at FROM audit_logs")).scalars().all()
+    assert remaining == [now - timedelta(days=1)]
@@ -0,0 +1,95 @@
+"""Query-plan regression tests: hot query shapes must use their composite/partial indexes."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, func, and_, desc, insert, text
+
+from app.models import Offer, OfferClick, OfferView, WalletTransaction, Order
+from tests.factories import create_merchant
+
+
+def _explain(db_session, stmt) -> str:
+    bind = db_session.get_bind()
+    sql = str(stmt.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+    if bind.dialect.name == "postgresql":
+        # Test tables are tiny; force the planner to show whether an index is usable at all
+        db_session.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = db_session.execute(text(f"EXPLAIN {sql}")).all()
+        return "\n".join(r[0] for r in rows)
+    rows = db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return "\n".join(str(r[-1]) for r in rows)
+
+
+@pytest.fixture
+def offer_stats(db_session):
+    """On Postgres, give the planner realistic offer statistics.
+
+    With empty, never-analyzed tables the featured and active partial indexes cost the
+    same, so the plan would depend on tie-breaking rather than on predicate selectivity.
+    """
+    if db_session.get_bind().dialect.name != "postgresql":
+        return
+    merchant = create_merchant(db_session, "PlanMerchant")
+    db_session.execute(insert(Offer), [
+        {"merchant_id": merchant.id, "title": f"Plan Offer {i}", "is_active": True,
+         "is_featured": i % 50 == 0, "is_exclusive": i % 50 == 1, "priority": i % 10}
+        for i in range(500)
+    ])
+    db_session.execute(text("ANALYZE offers"))
+
+
+cutoff = datetime(2025, 1, 1) - timedelta(days=7)
+
+HOT_QUERIES = [
+    (
+        "ix_offers_active_priority_created",
+        select(Offer.id)
+        .where(Offer.is_active == True)
+        .order_by(Offer.priority.desc(), Offer.created_at.desc())
+        .limit(20),
+    ),
+    (
+        "ix_offers_featured_priority_created",
+        select(Offer.id)
+        .where(and_(Offer.is_active == True, Offer.is_featured == True))
+        .order_by(Offer.priority.desc(), Offer.created_at.desc())
+        .limit(12),
+    ),
+    (
+        "ix_offer_clicks_offer_created",
+        select(func.count(OfferClick.id)).where(OfferClick.offer_id == 1, OfferClick.created_at >= cutoff),
+    ),
+    (
+        "ix_offer_clicks_user_created",
+        select(OfferClick.offer_id).where(OfferClick.user_id == 1, OfferClick.created_at >= cutoff),
+    ),
+    (
+        "ix_offer_views_offer_created",
+        select(func.count(OfferView.id)).where(OfferView.offer_id == 1, OfferView.created_at >= cutoff),
+    ),
+    (
+        "ix_wallet_transactions_user_created",
+        select(WalletTransaction.id)
+        .where(WalletTransaction.user_id == 1)
+        .order_by(desc(WalletTransaction.created_at))
+        .limit(20),
+    ),
+    (
+        "ix_orders_payment_status_created",
+        select(func.coalesce(func.sum(Order.total_amount), 0))
+        .where(and_(Order.payment_status == "paid", Order.created_at >= cutoff)),
+    ),
+    (
+        "ix_orders_user_created",
+        select(Order.id)
+        .where(Order.user_id == 1)
+        .order_by(desc(Order.created_at))
+        .limit(20),
+    ),
+]
+
+
+@pytest.mark.parametrize("index_name,stmt", HOT_QUERIES, ids=[name for name, _ in HOT_QUERIES])
+def test_hot_query_uses_index(db_session, offer_stats, index_name, stmt):
+    plan = _explain(db_session, stmt)
+    assert index_name in plan, plan
@@ -7,9 +7,28 @@ from app.queue import (
     push_email_job,
     push_sms_job,
     get_queue_stats,
+    heartbeat,
+    reserve_job,
+    ack_job,
+    retry_job,
+    reap_stuck_jobs,
+    processing_key,
+    lane_key,
+    LaneScheduler,
+    scheduled_key,
+    promote_due_jobs,
+    retry_delay,
+    fail_job,
     get_dead_letter_jobs,
     retry_dead_letter_job,
+    replay_dead_letter_jobs,
+    migrate_legacy_dlq,
     clear_dead_letter_queue,
+    ensure_consumer_groups,
+    get_consumer_groups,
+    stream_key,
+    unregister_worker,
+    was_processed,
 )
 
 
@@ -47,14 +66,15 @@ class TestQueueOperations:
 
         assert job_id.startswith("sms_")
 
-        # Verify job in queue
-        queue_length = redis_client.llen(rk("queue", "sms"))
+        # Verify job in queue (OTPs default to the high lane)
+        queue_length = redis_client.llen(lane_key("sms", "high"))
         assert queue_length == 1
 
         # Verify job structure
-        job_data = redis_client.lpop(rk("queue", "sms"))
+        job_data = redis_client.lpop(lane_key("sms", "high"))
         job = json.loads(job_data)
         assert job["type"] == "otp"
+        assert job["priority"] == "high"
         assert job["mobile"] == "+919876543210"
         assert job["data"]["otp"] == "123456"
 
@@ -68,6 +88,37 @@ class TestQueueOperations:
         assert job_id == custom_id
 
 
+class TestDeduplication:
+    """Test dedupe keys on enqueue and the processed-ids window."""
+
+    def test_dedupe_key_enqueues_once(self, redis_client):
+        """Test a retried request with the same dedupe key pushes one job."""
+        first = push_sms_job("order_confirmation", "+919876543210", {}, dedupe_key="order-42")
+        second = push_sms_job("order_confirmation", "+919876543210", {}, dedupe_key="order-42")
+        other = push_sms_job("order_confirmation", "+919876543210", {}, dedupe_key="order-43")
+
+        assert second == first
+        assert other != first
+        assert redis_client.llen(lane_key("sms", "normal")) == 2
+
+    def test_dedupe_key_covers_scheduled_jobs(self, redis_client):
+        """Test a scheduled job holds its dedupe key too."""
+        first = push_email_job("welcome", "a@example.com", {}, run_at=time.time() + 60, dedupe_key="user-1")
+        assert push_email_job("welcome", "a@example.com", {}, dedupe_key="user-1") == first
+        assert redis_client.zcard(scheduled_key("email")) == 1
+        assert get_queue_stats()["email"]["pending"] == 0
+
+    def test_ack_with_job_id_remembers_it(self, redis_client):
+        """Test a completed job id is recognised when redelivered."""
+        job_id = push_email_job("welcome", "a@example.com", {})
+        raw, job = reserve_job("email", "w1", timeout=1)
+        assert not was_processed("email", job_id)
+
+        ack_job("email", "w1", raw, job["id"])
+        assert was_processed("email", job_id)
+        assert redis_client.llen(processing_key("email", "w1")) == 0
+
+
 class TestQueueStats:
     """Test queue statistics and monitoring."""
 
@@ -94,85 +145,352 @@ class TestQueueStats:
         assert stats["email"]["pending"] == 3
         assert stats["sms"]["pending"] == 2
 
-    def test_processing_set(self, redis_client):
-        """Test processing set tracking."""
-        # Simulate worker adding to processing set
-        job_id = push_email_job("test", "test@example.com", {})
-        job_data = redis_client.lpop(rk("queue", "email"))
-        redis_client.sadd(rk("queue", "email", "processing"), job_data)
+    def test_processing_list(self, redis_client):
+        """Test reserved jobs are counted per worker processing list."""
+        push_email_job("test", "test@example.com", {})
+        heartbeat("email", "w1")
+        assert reserve_job("email", "w1", timeout=1) is not None
 
         stats = get_queue_stats()
+        assert stats["email"]["pending"] == 0
         assert stats["email"]["processing"] == 1
 
 
+class TestReliableDelivery:
+    """Test reservation, retry and recovery of stuck jobs."""
+
+    def test_identical_payloads_stay_distinct(self, redis_client):
+        """Test acking one of two identical jobs leaves the other reserved."""
+        push_email_job("test", "same@example.com", {})
+        push_email_job("test", "same@example.com", {})
+        raw1, job1 = reserve_job("email", "w1", timeout=1)
+        raw2, job2 = reserve_job("email", "w1", timeout=1)
+        assert job1["id"] != job2["id"]
+
+        ack_job("email", "w1", raw1)
+        assert redis_client.lrange(processing_key("email", "w1"), 0, -1) == [raw2]
+
+    def test_retry_requeues_updated_job(self, redis_client):
+        """Test retry releases the reservation and requeues the new attempt count."""
+        push_email_job("test", "test@example.com", {})
+        raw, job = reserve_job("email", "w1", timeout=1)
+        retry_job("email", "w1", raw, {**job, "attempts": 1})
+
+        assert redis_client.llen(processing_key("email", "w1")) == 0
+        assert json.loads(redis_client.lindex(rk("queue", "email"), 0))["attempts"] == 1
+
+    def test_reaper_requeues_jobs_of_dead_worker(self, redis_client):
+        """Test jobs held by a worker past the visibility timeout go back to the queue head."""
+        first = push_email_job("test", "a@example.com", {})
+        push_email_job("test", "b@example.com", {})
+        third = push_email_job("test", "c@example.com", {})
+        redis_client.zadd(rk("queue", "email", "workers"), {"dead": time.time() - 120})
+        reserve_job("email", "dead", timeout=1)
+
+        assert reap_stuck_jobs("email", visibility_timeout=60) == 1
+        assert redis_client.llen(processing_key("email", "dead")) == 0
+        ids = [json.loads(r)["id"] for r in redis_client.lrange(rk("queue", "email"), 0, -1)]
+        assert ids[0] == first and ids[-1] == third
+
+    def test_reaper_skips_live_worker(self, redis_client):
+        """Test a worker that is still heartbeating keeps its reservations."""
+        push_email_job("test", "test@example.com", {})
+        heartbeat("email", "alive")
+        reserve_job("email", "alive", timeout=1)
+
+        assert reap_stuck_jobs("email", visibility_timeout=60) == 0
+        assert redis_client.llen(processing_key("email", "alive")) == 1
+
+
+class TestPriorityLanes:
+    """Test priority lanes and weighted lane scheduling."""
+
+    def test_scheduler_shares_turns_by_weight(self):
+        """Test every lane gets turns in proportion to its weight."""
+        scheduler = LaneScheduler({"high": 6, "normal": 3, "low": 1})
+        firsts = [scheduler.order()[0] for _ in range(100)]
+        assert firsts.count("high") == 60
+        assert firsts.count("normal") == 30
+        assert firsts.count("low") == 10
+
+    def test_scheduler_falls_back_by_priority(self):
+        """Test the lanes after the chosen one are in priority order."""
+        scheduler = LaneScheduler({"high": 0, "normal": 0, "low": 1})
+        assert scheduler.order() == ["low", "high", "normal"]
+
+    def test_jobs_go_to_their_lane(self, redis_client):
+        """Test priority routing, including the per-type default."""
+        push_email_job("password_reset", "a@example.com", {})
+        push_email_job("welcome", "b@example.com", {})
+        push_email_job("welcome", "c@example.com", {}, priority="low")
+
+        assert redis_client.llen(lane_key("email", "high")) == 1
+        assert redis_client.llen(rk("queue", "email")) == 1
+        assert redis_client.llen(lane_key("email", "low")) == 1
+        assert get_queue_stats()["email"]["lanes"] == {"high": 1, "normal": 1, "low": 1}
+
+    def test_reserve_serves_high_lane_first(self, redis_client):
+        """Test a later high-priority job overtakes earlier normal ones."""
+        push_email_job("welcome", "b@example.com", {})
+        urgent = push_email_job("test", "a@example.com", {}, priority="high")
+
+        _, job = reserve_job("email", "w1", timeout=1)
+        assert job["id"] == urgent
+
+    def test_reaper_requeues_to_original_lane(self, redis_client):
+        """Test recovered jobs keep their priority."""
+        push_email_job("test", "a@example.com", {}, priority="high")
+        redis_client.zadd(rk("queue", "email", "workers"), {"dead": time.time() - 120})
+        reserve_job("email", "dead", timeout=1)
+
+        assert reap_stuck_jobs("email", visibility_timeout=60) == 1
+        assert redis_client.llen(lane_key("email", "high")) == 1
+
+
+class TestDelayedJobs:
+    """Test scheduled sends, retry backoff and promotion of due jobs."""
+
+    def test_retry_delay_grows_with_jitter(self, monkeypatch):
+        """Test backoff doubles per attempt, stays within [step/2, step] and is capped."""
+        from app.queue import settings
+
+        monkeypatch.setattr(settings, "QUEUE_RETRY_BASE_SECONDS", 10)
+        monkeypatch.setattr(settings, "QUEUE_RETRY_MAX_SECONDS", 60)
+        for attempts, step in [(1, 10), (2, 20), (3, 40), (4, 60), (9, 60)]:
+            delays = [retry_delay(attempts) for _ in range(50)]
+            assert all(step / 2 <= d <= step for d in delays)
+        assert len({retry_delay(1) for _ in range(10)}) > 1
+
+    def test_future_job_waits_in_scheduled_set(self, redis_client):
+        """Test a job with run_at in the future is not pending yet."""
+        push_email_job("welcome", "a@example.com", {}, run_at=time.time() + 3600)
+
+        stats = get_queue_stats()["email"]
+        assert stats["pending"] == 0
+        assert stats["scheduled"] == 1
+
+    def test_promote_moves_only_due_jobs_to_their_lane(self, redis_client):
+        """Test promotion respects run-at time and priority."""
+        now = time.time()
+        due = push_email_job("password_reset", "a@example.com", {}, run_at=now + 10)
+        push_email_job("welcome", "b@example.com", {}, run_at=now + 100)
+
+        assert promote_due_jobs("email", now=now + 20) == 1
+        assert json.loads(redis_client.lindex(lane_key("email", "high"), 0))["id"] == due
+        assert redis_client.zcard(scheduled_key("email")) == 1
+
+    def test_retry_with_delay_schedules_job(self, redis_client):
+        """Test a delayed retry leaves processing and lands in the scheduled set."""
+        push_email_job("test", "a@example.com", {})
+        raw, job = reserve_job("email", "w1", timeout=1)
+        retry_job("email", "w1", raw, {**job, "attempts": 1}, delay=30)
+
+        assert redis_client.llen(processing_key("email", "w1")) == 0
+        assert get_queue_stats()["email"]["pending"] == 0
+        assert redis_client.zcard(scheduled_key("email")) == 1
+
+
 class TestDeadLetterQueue:
     """Test dead letter queue functionality."""
 
+    def _dead_letter(self, n, error_type="ProviderError"):
+        """Reserve and fail n email jobs; returns their job ids."""
+        ids = []
+        for i in range(n):
+            push_email_job("test", f"user{i}@example.com", {})
+            raw, job = reserve_job("email", "w1", timeout=1)
+            fail_job("email", "w1", raw, {**job, "attempts": 3}, "Test error", error_type)
+            ids.append(job["id"])
+        return ids
+
     def test_get_dead_letter_jobs(self, redis_client):
         """Test retrieving failed jobs."""
-        # Add jobs to DLQ
-        failed_job = {
-            "id": "failed_123",
-            "type": "test",
-            "to": "test@example.com",
-            "data": {},
-            "attempts": 3,
-            "failedAt": "2025-01-01T00:00:00",
-            "error": "Test error",
-        }
-        redis_client.rpush(rk("queue", "email", "dlq"), json.dumps(failed_job))
-
-        # Retrieve DLQ jobs
+        ids = self._dead_letter(1)
+
         jobs = get_dead_letter_jobs("email")
         assert len(jobs) == 1
-        assert jobs[0]["id"] == "failed_123"
+        assert jobs[0]["id"] == ids[0]
         assert jobs[0]["error"] == "Test error"
+        assert jobs[0]["error_type"] == "ProviderError"
+        assert jobs[0]["dlq_id"]
+
+    def test_get_dead_letter_jobs_paginates_newest_first(self, redis_client):
+        """Test paging through the DLQ with the last dlq_id as cursor."""
+        ids = self._dead_letter(5)
+
+        first = get_dead_letter_jobs("email", count=2)
+        second = get_dead_letter_jobs("email", count=2, before=first[-1]["dlq_id"])
+        last = get_dead_letter_jobs("email", count=2, before=second[-1]["dlq_id"])
+        assert [j["id"] for j in first + second + last] == ids[::-1]
 
     def test_retry_dead_letter_job(self, redis_client):
         """Test retrying failed job."""
-        # Add failed job to DLQ
-        failed_job = {
-            "id": "retry_123",
-            "type": "test",
-            "to": "test@example.com",
-            "data": {},
-            "attempts": 3,
-            "failedAt": "2025-01-01T00:00:00",
-            "error": "Test error",
-        }
-        redis_client.rpush(rk("queue", "email", "dlq"), json.dumps(failed_job))
+        self._dead_letter(1)
+        entry = get_dead_letter_jobs("email")[0]
 
         # Retry the job
-        success = retry_dead_letter_job("email", 0)
+        success = retry_dead_letter_job("email", entry["dlq_id"])
         assert success is True
 
         # Verify job moved to main queue
-        assert redis_client.llen(rk("queue", "email", "dlq")) == 0
+        assert redis_client.xlen(rk("queue", "email", "dead")) == 0
         assert redis_client.llen(rk("queue", "email")) == 1
 
         # Verify attempts reset
         job_data = redis_client.lpop(rk("queue", "email"))
         job = json.loads(job_data)
+        assert job["id"] == entry["id"]
         assert job["attempts"] == 0
-        assert "failedAt" not in job
+        assert "failed_at" not in job
         assert "error" not in job
 
+    def test_retry_keeps_payload_types(self, redis_client):
+        """Test a requeued job keeps empty lists and nested values as stored."""
+        push_email_job("test", "user@example.com", {"items": [], "meta": {"tags": []}})
+        raw, job = reserve_job("email", "w1", timeout=1)
+        fail_job("email", "w1", raw, job, "Test error")
+        entry = get_dead_letter_jobs("email")[0]
+
+        assert retry_dead_letter_job("email", entry["dlq_id"]) is True
+        job = json.loads(redis_client.lpop(rk("queue", "email")))
+        assert job["data"] == {"items": [], "meta": {"tags": []}}
+
     def test_retry_nonexistent_job(self, redis_client):
         """Test retrying non-existent job."""
-        success = retry_dead_letter_job("email", 0)
+        success = retry_dead_letter_job("email", "0-1")
         assert success is False
 
+    def test_replay_filters_by_error_type_and_time(self, redis_client):
+        """Test bulk replay only requeues matching entries."""
+        self._dead_letter(3, error_type="Timeout")
+        self._dead_letter(2, error_type="BadRequest")
+        cutoff = time.time() + 60
+
+        assert replay_dead_letter_jobs("email", error_type="Timeout", since=cutoff) == 0
+        assert replay_dead_letter_jobs("email", error_type="Timeout", limit=2) == 2
+        assert replay_dead_letter_jobs("email", error_type="Timeout") == 1
+        assert redis_client.llen(rk("queue", "email")) == 3
+        assert {j["error_type"] for j in get_dead_letter_jobs("email")} == {"BadRequest"}
+
+    def test_dead_letter_retention_is_capped(self, redis_client, monkeypatch):
+        """Test the DLQ stream is trimmed to about QUEUE_DLQ_MAXLEN."""
+        from app.queue import settings
+
+        monkeypatch.setattr(settings, "QUEUE_DLQ_MAXLEN", 10)
+        job = {"id": "email_x", "type": "test", "attempts": 3}
+        for _ in range(300):
+            redis_client.rpush(processing_key("email", "w1"), json.dumps(job))
+            fail_job("email", "w1", json.dumps(job), job, "Test error")
+
+        assert 10 <= redis_client.xlen(rk("queue", "email", "dead")) < 300
+
+    def test_migrate_legacy_dlq(self, redis_client):
+        """Test entries of the old list DLQ are moved into the stream."""
+        redis_client.rpush(rk("queue", "email", "dlq"), json.dumps({"id": "old_1", "error": "x"}), "not json")
+
+        assert migrate_legacy_dlq("email") == 2
+        assert redis_client.llen(rk("queue", "email", "dlq")) == 0
+        assert [j.get("id") for j in get_dead_letter_jobs("email")] == [None, "old_1"]
+
     def test_clear_dead_letter_queue(self, redis_client):
         """Test clearing entire DLQ."""
-        # Add multiple failed jobs
-        for i in range(5):
-            failed_job = {"id": f"failed_{i}", "type": "test"}
-            redis_client.rpush(rk("queue", "email", "dlq"), json.dumps(failed_job))
+        self._dead_letter(5)
 
         # Clear DLQ
         count = clear_dead_letter_queue("email")
         assert count == 5
-        assert redis_client.llen(rk("queue", "email", "dlq")) == 0
+        assert redis_client.xlen(rk("queue", "email", "dead")) == 0
+
+
+class TestStreamsBackend:
+    """Test the consumer-group backend (QUEUE_BACKEND=streams)."""
+
+    @pytest.fixture
+    def streams(self, redis_client, monkeypatch):
+        from app.queue import settings
+
+        monkeypatch.setattr(settings, "QUEUE_BACKEND", "streams")
+        ensure_consumer_groups("email")
+        return redis_client
+
+    def test_reserve_and_ack(self, streams):
+        """Test a job is delivered to one consumer and deleted on ack."""
+        job_id = push_email_job("welcome", "a@example.com", {})
+
+        handle, job = reserve_job("email", "w1", timeout=1)
+        assert job["id"] == job_id
+        assert get_queue_stats()["email"]["processing"] == 1
+        assert reserve_job("email", "w2", timeout=0.1) is None
+
+        ack_job("email", "w1", handle)
+        assert streams.xlen(stream_key("email", "normal")) == 0
+        assert get_queue_stats()["email"]["processing"] == 0
+
+    def test_lanes_in_priority_order(self, streams):
+        """Test the high lane stream is read first."""
+        push_email_job("newsletter_welcome", "low@example.com", {})
+        push_email_job("password_reset", "high@example.com", {})
+
+        assert reserve_job("email", "w1", timeout=1)[1]["to"] == "high@example.com"
+        assert reserve_job("email", "w1", timeout=1)[1]["to"] == "low@example.com"
+
+    def test_reaper_requeues_idle_entries(self, streams):
+        """Test entries of a dead consumer are claimed back for others."""
+        job_id = push_email_job("welcome", "a@example.com", {})
+        reserve_job("email", "dead", timeout=1)
+        time.sleep(0.05)
+
+        assert reap_stuck_jobs("email", visibility_timeout=0.01) == 1
+        handle, job = reserve_job("email", "w2", timeout=1)
+        assert job["id"] == job_id
+        assert "dead" not in get_consumer_groups("email")["normal"]["consumers"]
+
+    def test_heartbeat_keeps_held_entries(self, streams):
+        """Test a live worker's slow job is not reaped."""
+        push_email_job("welcome", "a@example.com", {})
+        handle, _ = reserve_job("email", "w1", timeout=1)
+        time.sleep(0.2)
+        heartbeat("email", "w1", [handle])
+
+        assert reap_stuck_jobs("email", visibility_timeout=0.1) == 0
+
+    def test_unregister_hands_back_pending(self, streams):
+        """Test graceful shutdown requeues what the consumer still holds."""
+        push_email_job("welcome", "a@example.com", {})
+        reserve_job("email", "w1", timeout=1)
+
+        unregister_worker("email", "w1")
+        assert get_queue_stats()["email"]["pending"] == 1
+        assert reserve_job("email", "w2", timeout=1) is not None
+
+    def test_retry_and_dead_letter_replay_use_streams(self, streams):
+        """Test delayed retries and DLQ replays land back in the lane stream."""
+        push_email_job("welcome", "a@example.com", {})
+        handle, job = reserve_job("email", "w1", timeout=1)
+        retry_job("email", "w1", handle, {**job, "attempts": 1}, delay=30)
+        assert promote_due_jobs("email", now=time.time() + 60) == 1
+
+        handle, job = reserve_job("email", "w1", timeout=1)
+        fail_job("email", "w1", handle, job, "boom")
+        assert replay_dead_letter_jobs("email") == 1
+        assert get_queue_stats()["email"]["pending"] == 1
+
+    def test_dedupe_key_with_streams(self, streams):
+        """Test the dedupe script pushes to the lane stream."""
+        first = push_email_job("welcome", "a@example.com", {}, dedupe_key="user-1")
+        assert push_email_job("welcome", "a@example.com", {}, dedupe_key="user-1") == first
+        assert streams.xlen(stream_key("email", "normal")) == 1
+
+    def test_consumer_group_lag(self, streams):
+        """Test lag and per-consumer pending counts are reported."""
+        for i in range(3):
+            push_email_job("welcome", f"user{i}@example.com", {})
+        reserve_job("email", "w1", timeout=1)
+
+        normal = get_consumer_groups("email")["normal"]
+        assert normal["lag"] == 2
+        assert normal["pending"] == 1
+        assert normal["consumers"]["w1"]["pending"] == 1
 
 
 class TestQueueIntegration:
@@ -183,14 +501,12 @@ class TestQueueIntegration:
         # 1. Push job
         job_id = push_email_job("welcome", "user@example.com", {"user_name": "John"})
 
-        # 2. Worker pops job
-        job_data = redis_client.blpop(rk("queue", "email"), timeout=1)
-        assert job_data is not None
-        queue_name, job_json = job_data
-        job = json.loads(job_json)
-
-        # 3. Worker adds to processing set
-        redis_client.sadd(rk("queue", "email", "processing"), job_json)
+        # 2. Worker reserves job into its processing list
+        heartbeat("email", "worker-1")
+        reserved = reserve_job("email", "worker-1", timeout=1)
+        assert reserved is not None
+        job_json, job = reserved
+        assert job["id"] == job_id
 
         # 4. Verify stats
         stats = get_queue_stats()
@@ -198,7 +514,7 @@ class TestQueueIntegration:
         assert stats["email"]["processing"] == 1
 
         # 5. Worker completes job
-        redis_client.srem(rk("queue", "email", "processing"), job_json)
+        ack_job("email", "worker-1", job_json)
 
         # 6. Verify completion
         stats = get_queue_stats()
@@ -0,0 +1,53 @@
+"""Tests for the in-memory SEO redirect engine and middleware."""
+import pytest
+
+from app.models import SEORedirect
+from app.redirects import RedirectTable, redirect_engine
+
+
+@pytest.fixture
+def table():
+    return RedirectTable([
+        ("/old-page", "/new-page", 301),
+        ("/sale/", "/deals", 302),
+        ("/blog/*", "/articles/*", 308),
+        ("/blog/archive/*", "/archive", 301),
+        ("/shop/*", "/store", 999),
+    ])
+
+
+def test_exact_match_ignores_trailing_slash(table):
+    assert table.match("/old-page/") == ("/new-page", 301)
+    assert table.match("/sale") == ("/deals", 302)
+
+
+def test_prefix_rule_carries_remainder(table):
+    assert table.match("/blog/2024/hello") == ("/articles/2024/hello", 308)
+
+
+def test_longest_prefix_wins(table):
+    assert table.match("/blog/archive/2019") == ("/archive", 301)
+
+
+def test_invalid_status_falls_back_to_301(table):
+    assert table.match("/shop/anything") == ("/store", 301)
+
+
+def test_no_match(table):
+    assert table.match("/blogger") is None
+    assert table.match("/") is None
+
+
+def test_middleware_redirects_without_hitting_routes(client, db_session):
+    db_session.add(SEORedirect(source_path="/old-offers", target_path="/offers", http_status=301))
+    db_session.add(SEORedirect(source_path="/gone", target_path="/", http_status=301, is_active=False))
+    db_session.flush()
+    previous = redirect_engine.table
+    redirect_engine.load(db_session)
+    try:
+        response = client.get("/old-offers?ref=x", follow_redirects=False)
+        assert response.status_code == 301
+        assert response.headers["location"] == "/offers?ref=x"
+        assert client.get("/gone", follow_redirects=False).status_code != 301
+    finally:
+        redirect_engine.table = previous
@@ -0,0 +1,185 @@
+"""Tests for the worker runner: concurrency, retries, breakers and dispatch."""
+import asyncio
+import json
+
+import pytest
+
+from app import jobs
+from workers import runner
+
+
+@pytest.fixture
+def fake_queue(monkeypatch):
+    """In-memory stand-ins for the app.queue reserve/ack/retry/fail calls."""
+    state = {"pending": [], "acked": [], "retried": [], "delays": [], "failed": [], "done": set()}
+
+    def reserve_job(queue_name, worker_id, timeout, order=None):
+        if not state["pending"]:
+            return None
+        job = state["pending"].pop(0)
+        return json.dumps(job), job
+
+    monkeypatch.setattr(runner, "reserve_job", reserve_job)
+    def ack_job(queue_name, worker_id, raw, job_id=None):
+        state["acked"].append(json.loads(raw)["id"])
+        if job_id:
+            state["done"].add(job_id)
+
+    monkeypatch.setattr(runner, "ack_job", ack_job)
+    monkeypatch.setattr(runner, "was_processed", lambda q, job_id: job_id in state["done"])
+    def retry_job(queue_name, worker_id, raw, job, delay=0):
+        state["retried"].append(job)
+        state["delays"].append(delay)
+
+    monkeypatch.setattr(runner, "retry_job", retry_job)
+    monkeypatch.setattr(runner, "fail_job", lambda q, w, raw, job, error, error_type="Error": state["failed"].append(job))
+    return state
+
+
+async def _consume_until_empty(state, handler, concurrency, queue_name="email"):
+    stop = asyncio.Event()
+    inflight: set[asyncio.Task] = set()
+    consumer = asyncio.create_task(runner.consume(queue_name, "w1", handler, concurrency, stop, inflight))
+    while state["pending"] or inflight:
+        await asyncio.sleep(0.01)
+    stop.set()
+    await consumer
+
+
+@pytest.mark.asyncio
+async def test_consume_runs_jobs_concurrently_up_to_limit(fake_queue):
+    fake_queue["pending"] = [{"id": f"email_{i}", "attempts": 0} for i in range(20)]
+    running, peak = 0, 0
+
+    async def handler(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    await _consume_until_empty(fake_queue, handler, concurrency=5)
+    assert peak == 5
+    assert len(fake_queue["acked"]) == 20
+
+
+@pytest.mark.asyncio
+async def test_redelivered_copy_of_completed_job_is_skipped(fake_queue):
+    # The reaper hands back a job whose worker died after sending but before acking
+    fake_queue["pending"] = [{"id": "email_a", "attempts": 0}, {"id": "email_a", "attempts": 0}]
+    sent = []
+
+    async def handler(job):
+        sent.append(job["id"])
+
+    await _consume_until_empty(fake_queue, handler, concurrency=1)
+    assert sent == ["email_a"]
+    assert fake_queue["acked"] == ["email_a", "email_a"]
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_with_backoff_then_dead_lettered(fake_queue):
+    fake_queue["pending"] = [{"id": "email_a", "attempts": 0}, {"id": "email_b", "attempts": runner.settings.QUEUE_MAX_ATTEMPTS - 1}]
+
+    async def handler(job):
+        raise RuntimeError("provider down")
+
+    await _consume_until_empty(fake_queue, handler, concurrency=2)
+    assert [j["id"] for j in fake_queue["retried"]] == ["email_a"]
+    assert fake_queue["retried"][0]["attempts"] == 1
+    assert fake_queue["delays"][0] > 0
+    assert [j["id"] for j in fake_queue["failed"]] == ["email_b"]
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_stops_reserving(fake_queue, monkeypatch):
+    monkeypatch.setattr(runner, "take_token", lambda provider: 0.0)
+    fake_queue["pending"] = [{"id": f"email_{i}", "attempts": 0} for i in range(5)]
+    breaker = runner.CircuitBreaker(threshold=2, cooldown=60, max_cooldown=60)
+
+    async def provider_down(job):
+        raise runner.ProviderError("SendGrid API error: 503", 503)
+
+    stop = asyncio.Event()
+    consumer = asyncio.create_task(runner.consume(
+        "email", "w1", runner.guarded("sendgrid", breaker, provider_down), 1, stop, set(), breaker
+    ))
+    await asyncio.sleep(0.1)
+    stop.set()
+    await consumer
+
+    assert breaker.state == breaker.OPEN
+    assert len(fake_queue["retried"]) == 2
+    assert len(fake_queue["pending"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_throttled_job_keeps_its_attempts(fake_queue):
+    fake_queue["pending"] = [{"id": "email_a", "attempts": 2}]
+
+    async def handler(job):
+        raise runner.ProviderError("SendGrid API error: 429", 429)
+
+    await _consume_until_empty(fake_queue, handler, concurrency=1)
+    assert fake_queue["retried"][0]["attempts"] == 2
+
+
+@pytest.mark.asyncio
+async def test_job_definition_caps_attempts(fake_queue):
+    fake_queue["pending"] = [{"id": "maintenance_a", "type": jobs.EXPIRE_OFFERS.name, "attempts": 2}]
+
+    async def handler(job):
+        raise RuntimeError("db down")
+
+    await _consume_until_empty(fake_queue, handler, concurrency=1, queue_name="maintenance")
+    assert jobs.EXPIRE_OFFERS.attempts == 3
+    assert [j["id"] for j in fake_queue["failed"]] == ["maintenance_a"]
+
+
+@pytest.mark.asyncio
+async def test_dispatch_routes_by_type_with_queue_fallback(monkeypatch):
+    monkeypatch.setattr(jobs, "HANDLERS", {})
+    seen = []
+
+    @jobs.handles(jobs.EXPIRE_OFFERS)
+    def expire(job):  # Sync handlers run in a thread
+        seen.append(("expire", job["id"]))
+
+    @jobs.handles_queue("maintenance")
+    async def fallback(job):
+        seen.append(("fallback", job["id"]))
+
+    run_job = runner.dispatch("maintenance")
+    await run_job({"id": "a", "type": jobs.EXPIRE_OFFERS.name})
+    await run_job({"id": "b", "type": "something_else"})
+    assert seen == [("expire", "a"), ("fallback", "b")]
+
+    with pytest.raises(LookupError):
+        await runner.dispatch("sms")({"id": "c", "type": "otp"})
+
+
+@pytest.mark.asyncio
+async def test_requeued_job_goes_back_without_using_an_attempt(fake_queue):
+    fake_queue["pending"] = [{"id": "newsletter_a", "type": jobs.NEWSLETTER_FANOUT.name, "attempts": 1}]
+
+    async def handler(job):
+        raise jobs.Requeue("stopping at checkpoint")
+
+    await _consume_until_empty(fake_queue, handler, concurrency=1, queue_name="newsletter")
+    assert fake_queue["retried"] == [{"id": "newsletter_a", "type": jobs.NEWSLETTER_FANOUT.name, "attempts": 1}]
+    assert fake_queue["delays"] == [0]
+    assert fake_queue["acked"] == [] and fake_queue["failed"] == []
+
+
+def test_newsletter_queue_is_accepted(monkeypatch):
+    started = []
+    monkeypatch.setattr(runner, "_run_process", lambda queues, index=0: started.append(queues))
+    runner.main(["--queues", "newsletter", "--processes", "1"])
+    assert started == [["newsletter"]]
+
+
+def test_fan_out_handler_is_registered():
+    runner.load_handlers()
+    from workers import newsletter_fanout
+
+    assert jobs.handler_for("newsletter", jobs.NEWSLETTER_FANOUT.name) is newsletter_fanout.fan_out
@@ -0,0 +1,80 @@
+"""Tests for the precompiled email/SMS templates."""
+from app import jobs, templating
+from app.email import EmailService
+
+
+def test_render_email_substitutes_job_data():
+    subject, html = templating.render_email("order_confirmation", {"user_name": "Asha", "order_number": "ORD-7"})
+    assert subject == "Order Confirmed - ORD-7"
+    assert "Hi Asha," in html
+    assert "<strong>Items:</strong> 1" in html  # Defaults apply to missing fields
+
+
+def test_order_confirmation_email_lists_items():
+    data = jobs.build_job(jobs.ORDER_CONFIRMATION_EMAIL, {
+        "user_name": "Asha",
+        "order_number": "ORD-8",
+        "total_amount": 780,
+        "items_count": 2,
+        "order_url": "https://app.example.com/orders/8",
+        "items": [
+            {"product_name": "Amazon Pay", "quantity": 2, "unit_price": 265, "subtotal": 530},
+            {"product_name": "Flipkart", "quantity": 1, "unit_price": 250, "subtotal": 250},
+        ],
+    }, to="asha@example.com")["data"]
+    _, html = templating.render_email("order_confirmation", data)
+    assert "<td>Amazon Pay</td>" in html and "<td>₹265.00</td>" in html and "<td>₹530.00</td>" in html
+    assert "<td>Flipkart</td>" in html and "<td>₹250.00</td>" in html
+
+
+def test_render_email_escapes_html_and_skips_empty_sections():
+    _, html = templating.render_email("welcome", {"user_name": "<b>Asha</b>"})
+    assert "&lt;b&gt;Asha&lt;/b&gt;" in html
+    assert "Verify Your Email" not in html
+
+    _, html = templating.render_email("welcome", {"verification_url": "https://app.example.com/v?t=1&u=2"})
+    assert 'href="https://app.example.com/v?t=1&amp;u=2"' in html
+
+
+def test_voucher_codes_email_lists_every_code():
+    data = jobs.build_job(jobs.VOUCHER_CODES_EMAIL, {
+        "order_number": "ORD-9",
+        "vouchers": [
+            {"product_name": "Amazon Pay", "code": "AMZ-1", "value": 500},
+            {"product_name": "Flipkart", "code": "FK-2", "value": 250.5, "instructions": "Redeem in app"},
+        ],
+    }, to="asha@example.com")["data"]
+    subject, html = templating.render_email("voucher_codes", data)
+    assert subject == "Your Voucher Codes - ORD-9"
+    assert "AMZ-1" in html and "₹500.00" in html
+    assert "FK-2" in html and "Redeem in app" in html
+
+
+def test_unknown_types_fall_back_to_generic_message():
+    assert templating.render_email("mystery", {"message": "Hello"}) == ("Notification from CouponAli", "<p>Hello</p>")
+    assert templating.render_sms("mystery", {}) == "Notification from CouponAli"
+    assert templating.render_sms("otp", {"otp": "123456"}).startswith("Your OTP for CouponAli is 123456.")
+
+
+def test_render_does_not_touch_the_filesystem_after_preload(monkeypatch):
+    def no_disk(*args, **kwargs):
+        raise AssertionError("template loaded from disk")
+
+    monkeypatch.setattr(templating.env.loader, "get_source", no_disk)
+    templating.render_email("password_reset", {"reset_url": "https://app.example.com/r"})
+    templating.render("email/service/cashback.html", amount=10, description="Order #1")
+
+
+def test_email_service_templates(monkeypatch):
+    sent = {}
+    service = EmailService()
+    monkeypatch.setattr(service, "send_email", lambda to, subject, html: sent.update(subject=subject, html=html))
+
+    service.send_order_confirmation(
+        "a@example.com", "ORD-1", 530, [{"product_name": "Gift Card", "quantity": 2, "unit_price": 265, "subtotal": 530}]
+    )
+    assert sent["subject"] == "Order Confirmation - ORD-1"
+    assert "<td>₹265.00</td>" in sent["html"] and "Total: ₹530.00" in sent["html"]
+
+    service.send_withdrawal_notification("a@example.com", 99.5, "approved", reference="UTR1")
+    assert "₹99.50 has been approved and processed. Reference: UTR1" in sent["html"]
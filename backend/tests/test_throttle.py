@@ -0,0 +1,74 @@
+"""Tests for provider token buckets and circuit breakers."""
+import pytest
+
+from app import throttle
+from app.redis_client import rk
+from app.throttle import CircuitBreaker, take_token
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(threshold=3, cooldown=10, max_cooldown=60, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.allow() is True
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow() is False
+        assert breaker.retry_after() == 10
+
+    def test_half_open_lets_one_probe_through(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(threshold=1, cooldown=10, max_cooldown=60, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+
+        assert breaker.allow() is True
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow() is False
+        breaker.release()
+        assert breaker.allow() is True
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_probe_doubles_cooldown(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(threshold=1, cooldown=10, max_cooldown=15, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow() is True
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.retry_after() == 15
+
+
+class TestTokenBucket:
+    @pytest.fixture
+    def bucket(self, redis_client, monkeypatch):
+        monkeypatch.setitem(throttle.PROVIDER_LIMITS, "sendgrid", (10, 3))
+        redis_client.delete(rk("throttle", "sendgrid"))
+        yield
+        redis_client.delete(rk("throttle", "sendgrid"))
+
+    def test_burst_then_wait(self, bucket):
+        assert [take_token("sendgrid") for _ in range(3)] == [0, 0, 0]
+        wait = take_token("sendgrid")
+        assert 0 < wait <= 0.1
+
+    def test_disabled_provider_never_waits(self, monkeypatch):
+        monkeypatch.setitem(throttle.PROVIDER_LIMITS, "msg91", (0, 0))
+        assert take_token("msg91") == 0
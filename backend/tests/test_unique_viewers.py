@@ -0,0 +1,66 @@
+"""Tests for HyperLogLog unique-viewer tracking."""
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import redis_client as rc
+
+
+def test_range_uses_weekly_buckets_for_whole_weeks():
+    fake = MagicMock()
+    fake.exists.return_value = 0
+    fake.pfcount.return_value = 42
+    with patch.object(rc, "redis_client", fake):
+        # Sun 2026-10-11 .. Tue 2026-10-20 = one day, ISO week 42, two days
+        assert rc.offer_unique_viewers(7, date(2026, 10, 11), date(2026, 10, 20)) == 42
+
+    merged, *sources = fake.pfmerge.call_args.args
+    assert merged == "offer:7:viewers:range:20261011:20261020"
+    assert sources == [
+        "offer:7:viewers:d20261011",
+        "offer:7:viewers:w202642",
+        "offer:7:viewers:d20261019",
+        "offer:7:viewers:d20261020",
+    ]
+    fake.expire.assert_called_once_with(merged, rc.VIEWERS_RANGE_TTL)
+
+
+def test_single_bucket_range_skips_merge():
+    fake = MagicMock()
+    fake.pfcount.return_value = 3
+    with patch.object(rc, "redis_client", fake):
+        assert rc.offer_unique_viewers(7, date(2026, 10, 19), date(2026, 10, 19)) == 3
+    fake.pfcount.assert_called_once_with("offer:7:viewers:d20261019")
+    fake.pfmerge.assert_not_called()
+
+
+def test_click_adds_viewer_to_day_week_and_all_time_sketches():
+    fake = MagicMock()
+    with patch.object(rc, "redis_client", fake):
+        rc.track_offer_click(7, user_id=99)
+    pipe = fake.pipeline.return_value
+    keys = [c.args[0] for c in pipe.pfadd.call_args_list]
+    assert keys[2] == "offer:7:viewers:all"
+    assert keys[0].startswith("offer:7:viewers:d") and keys[1].startswith("offer:7:viewers:w")
+    fake.sadd.assert_not_called()
+
+
+def test_migrate_viewer_sets_folds_sets_into_all_time_sketch():
+    fakeredis = pytest.importorskip("fakeredis")
+    fake = fakeredis.FakeRedis(decode_responses=True)
+    fake.sadd("offer:7:viewers", *range(2500))
+    fake.set("offer:8:viewers", "not a set")
+    with patch.object(rc, "redis_client", fake), \
+            patch.object(rc, "_memory_usage", side_effect=lambda key: len(key)):
+        report = rc.migrate_viewer_sets()
+
+    assert not fake.exists("offer:7:viewers")
+    assert fake.exists("offer:8:viewers")
+    assert abs(fake.pfcount("offer:7:viewers:all") - 2500) <= 2500 * 0.02
+    assert report == {
+        "offers": 1,
+        "members": 2500,
+        "set_bytes": len("offer:7:viewers"),
+        "hll_bytes": len("offer:7:viewers:all"),
+    }
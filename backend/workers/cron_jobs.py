@@ -1,13 +1,21 @@
-"""Cron Jobs Worker - Handles scheduled maintenance tasks.
+"""Cron Jobs - Scheduled maintenance tasks.
 
-This worker runs periodic jobs:
+The scheduler submits these as jobs on the maintenance queue, where
+workers.runner runs them with retries, DLQ and metrics:
 1. Expire old offers (daily 2 AM)
 2. Recalculate wallet balances (daily 3 AM)
 3. Clean old logs (weekly)
 4. Generate sitemap (daily 4 AM)
+5. Maintain event table partitions (daily 1 AM)
+6. Affiliate transaction sync (submitted by the API's scheduler when
+   AFFILIATE_SYNC_ENABLED is set)
+
+Each run is submitted with the day as its idempotency key, so a second
+scheduler instance (or a restart) does not run a job twice.
 
 Usage:
-    python -m workers.cron_jobs
+    python -m workers.cron_jobs                          # scheduler
+    python -m workers.runner --queues maintenance        # runs the jobs
 """
 from __future__ import annotations
 
@@ -16,14 +24,26 @@ import sys
 from datetime import datetime, timedelta, timezone
 
 import schedule
-from sqlalchemy import select, update
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
-from app.models.merchant import Offer
-from app.models.wallet import WalletBalance, WalletTransaction
-from app.models.admin import AuditLog
+from app.config import get_settings
+from app.database import SessionLocal, engine
+from app.jobs import (
+    AFFILIATE_SYNC,
+    CLEAN_OLD_LOGS,
+    EXPIRE_OFFERS,
+    GENERATE_SITEMAP,
+    MAINTAIN_EVENT_PARTITIONS,
+    RECALCULATE_WALLET_BALANCES,
+    JobSpec,
+    handles,
+    submit,
+)
+from app.models import AuditLog, Offer, WalletBalance, WalletTransaction
 from app.redis_client import redis_client, rk
+from app.tasks.affiliate_sync import sync_affiliate_transactions
+from app.tasks.partitions import drop_expired_partitions, is_partitioned, maintain_partitions
 
 # Configure logging
 logging.basicConfig(
@@ -32,32 +52,15 @@ logging.basicConfig(
     handlers=[logging.StreamHandler(sys.stdout)],
 )
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
-CRON_LOCK_PREFIX = "lock:cron:"
-
+def submit_daily(spec: JobSpec, payload: dict | None = None) -> str:
+    """Submit today's run of a scheduled job; repeats on the same UTC day are no-ops."""
+    return submit(spec, payload or {}, key=datetime.now(timezone.utc).strftime("%Y-%m-%d"))
 
-def with_lock(job_name: str, timeout: int = 3600):
-    """Decorator to ensure only one instance of a job runs at a time."""
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            lock_key = rk(CRON_LOCK_PREFIX, job_name)
-            lock_acquired = redis_client.set(lock_key, "locked", nx=True, ex=timeout)
-            
-            if not lock_acquired:
-                logger.warning(f"Job {job_name} is already running, skipping...")
-                return
-            
-            try:
-                return func(*args, **kwargs)
-            finally:
-                redis_client.delete(lock_key)
-        
-        return wrapper
-    return decorator
 
-
-@with_lock("expire_offers", timeout=1800)
-def expire_old_offers():
+@handles(EXPIRE_OFFERS)
+def expire_old_offers(job: dict | None = None):
     """Mark expired offers as inactive."""
     logger.info("=== Expiring Old Offers ===")
     
@@ -85,12 +88,13 @@ def expire_old_offers():
     except Exception as e:
         logger.error(f"Failed to expire offers: {e}", exc_info=True)
         db.rollback()
+        raise
     finally:
         db.close()
 
 
-@with_lock("recalc_wallets", timeout=3600)
-def recalculate_wallet_balances():
+@handles(RECALCULATE_WALLET_BALANCES)
+def recalculate_wallet_balances(job: dict | None = None):
     """Verify and recalculate wallet balances for integrity."""
     logger.info("=== Recalculating Wallet Balances ===")
     
@@ -130,42 +134,54 @@ def recalculate_wallet_balances():
     except Exception as e:
         logger.error(f"Failed to recalculate wallet balances: {e}", exc_info=True)
         db.rollback()
+        raise
     finally:
         db.close()
 
 
-@with_lock("clean_logs", timeout=1800)
-def clean_old_logs():
-    """Delete old audit logs (older than 90 days)."""
+@handles(CLEAN_OLD_LOGS)
+def clean_old_logs(job: dict | None = None):
+    """Drop audit logs older than the retention window.
+
+    On a partitioned audit_logs table whole monthly partitions are detached and
+    dropped; otherwise a single set-based DELETE is issued.
+    """
     logger.info("=== Cleaning Old Logs ===")
-    
-    db = SessionLocal()
+
+    keep_months = settings.AUDIT_LOG_RETENTION_MONTHS
     try:
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=90)
-        
-        # Delete old audit logs
-        result = db.execute(
-            select(AuditLog).where(AuditLog.created_at < cutoff_date)
-        )
-        old_logs = result.scalars().all()
-        
-        for log in old_logs:
-            db.delete(log)
-        
-        db.commit()
-        
-        deleted_count = len(old_logs)
-        logger.info(f"Deleted {deleted_count} old audit logs")
-        
+        if engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                if is_partitioned(conn, AuditLog.__tablename__):
+                    dropped = drop_expired_partitions(conn, AuditLog.__tablename__, keep_months)
+                    logger.info(f"Dropped {len(dropped)} audit log partitions: {dropped}")
+                    return
+
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=30 * keep_months)
+        with engine.begin() as conn:
+            result = conn.execute(delete(AuditLog).where(AuditLog.created_at < cutoff_date))
+        logger.info(f"Deleted {result.rowcount} old audit logs")
+
     except Exception as e:
         logger.error(f"Failed to clean logs: {e}", exc_info=True)
-        db.rollback()
-    finally:
-        db.close()
+        raise
+
+
+@handles(MAINTAIN_EVENT_PARTITIONS)
+def maintain_event_partitions(job: dict | None = None):
+    """Pre-create upcoming monthly partitions and drop expired ones."""
+    logger.info("=== Maintaining Event Partitions ===")
+
+    try:
+        summary = maintain_partitions(engine)
+        logger.info(f"Partition maintenance done for {len(summary)} tables")
+    except Exception as e:
+        logger.error(f"Failed to maintain partitions: {e}", exc_info=True)
+        raise
 
 
-@with_lock("generate_sitemap", timeout=1800)
-def generate_sitemap():
+@handles(GENERATE_SITEMAP)
+def generate_sitemap(job: dict | None = None):
     """Generate XML sitemap for SEO."""
     logger.info("=== Generating Sitemap ===")
     
@@ -229,31 +245,59 @@ def generate_sitemap():
         
     except Exception as e:
         logger.error(f"Failed to generate sitemap: {e}", exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+@handles(AFFILIATE_SYNC)
+def sync_affiliates(job: dict | None = None):
+    """Import affiliate network transactions and their cashback events."""
+    logger.info("=== Syncing Affiliate Transactions ===")
+
+    db = SessionLocal()
+    try:
+        result = sync_affiliate_transactions(db)
+        logger.info(
+            f"Affiliate sync imported={result['imported']} updated={result['updated']} total={result['total']}"
+        )
+    except Exception as e:
+        logger.error(f"Affiliate sync failed: {e}", exc_info=True)
+        db.rollback()
+        raise
     finally:
         db.close()
 
 
 def run_scheduler():
-    """Run all scheduled jobs."""
+    """Submit the scheduled jobs to the maintenance queue when they are due."""
     logger.info("Starting cron jobs scheduler...")
     
     # Schedule jobs
-    schedule.every().day.at("02:00").do(expire_old_offers)
-    schedule.every().day.at("03:00").do(recalculate_wallet_balances)
-    schedule.every().day.at("04:00").do(generate_sitemap)
-    schedule.every().sunday.at("01:00").do(clean_old_logs)
+    schedule.every().day.at("02:00").do(submit_daily, EXPIRE_OFFERS)
+    schedule.every().day.at("03:00").do(submit_daily, RECALCULATE_WALLET_BALANCES)
+    schedule.every().day.at("04:00").do(submit_daily, GENERATE_SITEMAP)
+    schedule.every().sunday.at("01:00").do(submit_daily, CLEAN_OLD_LOGS)
+    schedule.every().day.at("01:00").do(submit_daily, MAINTAIN_EVENT_PARTITIONS)
     
     logger.info("Scheduled jobs:")
     logger.info("  - Expire old offers: Daily at 02:00 UTC")
     logger.info("  - Recalculate wallet balances: Daily at 03:00 UTC")
     logger.info("  - Generate sitemap: Daily at 04:00 UTC")
     logger.info("  - Clean old logs: Weekly (Sunday) at 01:00 UTC")
+    logger.info("  - Maintain event partitions: Daily at 01:00 UTC")
     
+    # Make sure the current and upcoming months exist before any inserts land
+    try:
+        maintain_event_partitions()
+    except Exception:
+        pass  # Logged; the daily job retries
+
     # Run immediately on startup (for testing)
     # Uncomment to run all jobs on startup:
-    # expire_old_offers()
-    # recalculate_wallet_balances()
-    # generate_sitemap()
+    # submit(EXPIRE_OFFERS, {})
+    # submit(RECALCULATE_WALLET_BALANCES, {})
+    # submit(GENERATE_SITEMAP, {})
     
     # Keep running
     import time
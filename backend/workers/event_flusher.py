@@ -0,0 +1,104 @@
+"""Event Flusher Worker - Drains buffered click/view events into the database.
+
+This worker:
+1. Reads events from the Redis ingest stream via the "flushers" consumer group
+2. Reclaims events left unacknowledged by crashed flushers (XAUTOCLAIM)
+3. Writes each batch to offer_clicks / offer_views with multi-row INSERTs
+4. Acknowledges entries only after the batch is committed (at-least-once)
+5. Drops events the database rejects (missing offer/user) so they cannot
+   block their batch forever
+
+Run several instances to scale out; each gets a distinct consumer name.
+
+Usage:
+    python -m workers.event_flusher
+"""
+from __future__ import annotations
+
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.ingest import ack, backlog, ensure_group, read_batch, write_valid_events
+from app.metrics import increment_events_discarded, observe_events_flush
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+running = True
+
+
+def _stop(signum, frame):
+    global running
+    logger.info("Shutdown requested, finishing current batch...")
+    running = False
+
+
+def flush_batch(consumer: str) -> int:
+    """Read, write and ack one batch. Returns the number of entries handled."""
+    batch = read_batch(consumer, settings.INGEST_BATCH_SIZE, settings.INGEST_BLOCK_MS)
+    if not batch:
+        return 0
+
+    events = [event for _, event in batch if event is not None]
+    skipped = len(batch) - len(events)
+    if skipped:
+        logger.warning(f"Dropping {skipped} undecodable ingest entries")
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        counts, rejected = write_valid_events(db, events)
+        db.commit()
+    except Exception:
+        # Leave entries pending; they are reclaimed after INGEST_CLAIM_IDLE_MS
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for event in rejected:
+        logger.warning(f"Dropping ingest event rejected by the database: {event}")
+        increment_events_discarded(str(event.get("kind", "unknown")))
+    ack([entry_id for entry_id, _ in batch])
+    observe_events_flush(counts, time.perf_counter() - start, backlog())
+    return len(batch)
+
+
+def run_worker():
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    logger.info(f"Starting event flusher as {consumer}")
+    ensure_group()
+
+    while running:
+        try:
+            handled = flush_batch(consumer)
+            if handled:
+                logger.debug(f"Flushed {handled} events")
+        except Exception as e:
+            logger.error(f"Event flush failed: {e}", exc_info=True)
+            time.sleep(5)
+
+    logger.info("Event flusher stopped")
+
+
+def main():
+    """Main entry point."""
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    run_worker()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Newsletter Fan-out - Turns a campaign send into recipient batch jobs.
+
+Fan-out jobs run on the newsletter queue under workers.runner, which gives
+them the usual retries, DLQ, heartbeats and promotion of fan-outs scheduled
+for a campaign's send_at. The handler:
+1. Streams active subscribers in keyset chunks, bulk-inserting delivery rows
+2. Pushes each chunk's SendGrid batch jobs onto the email queue together
+   with the fan-out checkpoint, so a retried fan-out resumes where it stopped
+3. Stops at the next checkpoint when the worker shuts down and raises
+   Requeue, so another worker picks the campaign up from there
+
+Usage:
+    python -m workers.runner --queues newsletter
+"""
+from __future__ import annotations
+
+import logging
+import sys
+import time
+
+from app.database import SessionLocal
+from app.jobs import NEWSLETTER_FANOUT, NewsletterFanout, Requeue, handles, stopping
+from app.newsletter import fan_out_campaign
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+logger = logging.getLogger(__name__)
+
+
+@handles(NEWSLETTER_FANOUT)
+def fan_out(job: dict) -> None:
+    """Enqueue the batch jobs of one campaign, from its checkpoint on."""
+    payload = NewsletterFanout.model_validate(job["data"])
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        enqueued = fan_out_campaign(db, payload.campaign_id, should_stop=stopping.is_set, send_at=payload.send_at)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    logger.info(f"Campaign {payload.campaign_id}: enqueued {enqueued} recipients in {time.perf_counter() - start:.1f}s")
+    if stopping.is_set():
+        raise Requeue(f"worker stopping; campaign {payload.campaign_id} resumes from its checkpoint")
@@ -0,0 +1,369 @@
+"""Worker runner - Runs the handlers registered in app.jobs for any set of queues.
+
+Every queue gets the same runtime:
+- asyncio consumers: up to the queue's concurrency (app.jobs.QUEUES) jobs in
+  flight per process; async handlers run on the loop, sync ones in a thread
+- Reservation via LMOVE/BLMOVE into the worker's processing list (or a
+  Redis Streams consumer group with QUEUE_BACKEND=streams), so a crash never
+  loses a job; heartbeats keep reservations alive and the reaper requeues
+  those of dead workers (QUEUE_VISIBILITY_TIMEOUT)
+- Weighted round-robin over the high/normal/low priority lanes
+- Retries with exponential backoff and jitter up to the job's max attempts,
+  then the DLQ stream (queue:<name>:dead); promotes due delayed jobs. A
+  handler raising app.jobs.Requeue is put straight back without using an
+  attempt (e.g. a fan-out stopped at its checkpoint by a shutdown)
+- Completed job ids are remembered for QUEUE_PROCESSED_TTL, so a redelivered
+  copy of a finished job is acked without sending again
+- For queues backed by a provider: the shared per-provider token bucket and a
+  circuit breaker that stops reserving while the provider is down
+- Prometheus metrics per job type (WORKER_METRICS_PORT + process index)
+- N processes (--processes / WORKER_PROCESSES) x per-queue async concurrency;
+  on SIGTERM/SIGINT stops reserving, sets app.jobs.stopping, lets in-flight
+  jobs finish for up to WORKER_DRAIN_TIMEOUT seconds and hands anything left
+  back to the queue
+
+Usage:
+    python -m workers.runner --queues email,sms [--processes N]
+    python -m workers.runner --queues maintenance
+    python -m workers.runner --queues newsletter
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import importlib
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable
+
+import httpx
+from prometheus_client import start_http_server
+
+from app.config import get_settings
+from app.jobs import LIFESPANS, QUEUES, Requeue, attempts_for, handler_for, stopping
+from app.metrics import add_throttle_wait, observe_job, observe_job_latency, set_circuit_state
+from app.queue import (
+    LaneScheduler,
+    ack_job,
+    ensure_consumer_groups,
+    fail_job,
+    heartbeat,
+    migrate_legacy_dlq,
+    promote_due_jobs,
+    reap_stuck_jobs,
+    reserve_job,
+    retry_delay,
+    retry_job,
+    unregister_worker,
+    was_processed,
+)
+from app.throttle import CircuitBreaker, ProviderError, take_token
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Modules whose import registers job handlers
+HANDLER_MODULES = ("workers.email_sms_worker", "workers.cron_jobs", "workers.newsletter_fanout")
+
+# Handles of jobs being processed, re-claimed on each heartbeat (streams backend)
+held: dict[str, set[str]] = defaultdict(set)
+
+POLL_TIMEOUT_SECONDS = 2
+BREAKER_POLL_SECONDS = 0.5  # Re-check interval while a breaker's probe is in flight
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+def load_handlers() -> None:
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def dispatch(queue_name: str) -> Handler:
+    """Async handler for a queue that routes each job to its registered handler."""
+
+    async def run_job(job: dict) -> None:
+        handler = handler_for(queue_name, job.get("type"))
+        if handler is None:
+            raise LookupError(f"No handler registered for {queue_name} job type {job.get('type')!r}")
+        if asyncio.iscoroutinefunction(handler):
+            await handler(job)
+        else:
+            await asyncio.to_thread(handler, job)
+
+    return run_job
+
+
+def _is_outage(exc: Exception) -> bool:
+    """Failures that say the provider, not the job, is the problem."""
+    if isinstance(exc, ProviderError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def guarded(provider: str, breaker: CircuitBreaker, handler: Handler) -> Handler:
+    """Wrap a send so it waits for a rate-limit token and feeds the provider's breaker."""
+
+    async def send(job: dict) -> None:
+        while (wait := await asyncio.to_thread(take_token, provider)) > 0:
+            add_throttle_wait(provider, wait)
+            await asyncio.sleep(wait)
+        before = breaker.state
+        try:
+            await handler(job)
+        except Exception as exc:
+            if _is_outage(exc):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        else:
+            breaker.record_success()
+        finally:
+            if breaker.state != before:
+                logger.warning(f"{provider} circuit breaker {before} -> {breaker.state}")
+                set_circuit_state(provider, breaker.state)
+
+    return send
+
+
+async def _handle(queue_name: str, worker_id: str, handler: Handler, raw_job: str, job: dict) -> None:
+    """Process one reserved job, then ack, retry or dead-letter it."""
+    job_type = job.get("type", "unknown")
+    attempts = job.get("attempts", 0)
+    max_attempts = attempts_for(queue_name, job_type)
+    if await asyncio.to_thread(was_processed, queue_name, job.get("id")):
+        # Delivery is at-least-once: a reaped or re-claimed copy of a job that already completed
+        observe_job(queue_name, job_type, "duplicate", 0)
+        await asyncio.to_thread(ack_job, queue_name, worker_id, raw_job)
+        logger.info(f"Job {job.get('id')} already processed, skipping")
+        return
+    held[queue_name].add(raw_job)
+    start = time.perf_counter()
+
+    try:
+        await handler(job)
+        observe_job(queue_name, job_type, "success", time.perf_counter() - start)
+        if "enqueued_ts" in job:
+            observe_job_latency(queue_name, job.get("priority", "normal"), time.time() - job["enqueued_ts"])
+        await asyncio.to_thread(ack_job, queue_name, worker_id, raw_job, job.get("id"))
+        logger.info(f"✅ Job {job.get('id')} completed successfully")
+
+    except Requeue as exc:
+        observe_job(queue_name, job_type, "requeued", time.perf_counter() - start)
+        await asyncio.to_thread(retry_job, queue_name, worker_id, raw_job, job)
+        logger.info(f"Job {job.get('id')} requeued: {exc}")
+
+    except Exception as exc:
+        # A 429 means we were too fast, not that the job is bad: retry without using up an attempt
+        throttled = isinstance(exc, ProviderError) and exc.status_code == 429
+        attempts += 0 if throttled else 1
+        logger.error(f"❌ Job {job.get('id')} failed (attempt {attempts}/{max_attempts}): {exc}")
+
+        if attempts >= max_attempts:
+            observe_job(queue_name, job_type, "dead", time.perf_counter() - start)
+            await asyncio.to_thread(fail_job, queue_name, worker_id, raw_job, job, str(exc), type(exc).__name__)
+            logger.warning(f"Job {job.get('id')} moved to DLQ: {queue_name}")
+        else:
+            # Retry later with incremented attempt count, backing off so an outage does not burn attempts
+            observe_job(queue_name, job_type, "retry", time.perf_counter() - start)
+            delay = retry_delay(max(attempts, 1))
+            await asyncio.to_thread(retry_job, queue_name, worker_id, raw_job, {**job, "attempts": attempts}, delay)
+            logger.info(f"Job {job.get('id')} retrying in {delay:.0f}s")
+    finally:
+        held[queue_name].discard(raw_job)
+
+
+async def consume(
+    queue_name: str,
+    worker_id: str,
+    handler: Handler,
+    concurrency: int,
+    stop: asyncio.Event,
+    inflight: set[asyncio.Task],
+    breaker: CircuitBreaker | None = None,
+) -> None:
+    """Reserve jobs while a concurrency slot is free and run each as its own task.
+
+    While ``breaker`` is open no jobs are reserved; when half-open, one probe at a time.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    lanes = LaneScheduler()
+
+    def _done(task: asyncio.Task) -> None:
+        inflight.discard(task)
+        slots.release()
+
+    while not stop.is_set():
+        await slots.acquire()
+        if stop.is_set():
+            slots.release()
+            break
+        if breaker is not None and not breaker.allow():
+            slots.release()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), max(breaker.retry_after(), BREAKER_POLL_SECONDS))
+            continue
+        try:
+            reserved = await asyncio.to_thread(
+                reserve_job, queue_name, worker_id, POLL_TIMEOUT_SECONDS, lanes.order()
+            )
+        except Exception as e:
+            slots.release()
+            if breaker is not None:
+                breaker.release()
+            logger.error(f"Reserving from {queue_name} failed: {e}")
+            await asyncio.sleep(1)
+            continue
+        if reserved is None:
+            slots.release()
+            if breaker is not None:
+                breaker.release()
+            continue
+        task = asyncio.create_task(_handle(queue_name, worker_id, handler, *reserved))
+        inflight.add(task)
+        task.add_done_callback(_done)
+
+
+async def _heartbeat_loop(queues: list[str], worker_id: str, stop: asyncio.Event) -> None:
+    """Keep this worker's reservations alive and recover those of dead workers."""
+    while not stop.is_set():
+        for queue_name in queues:
+            try:
+                await asyncio.to_thread(heartbeat, queue_name, worker_id, list(held[queue_name]))
+                reaped = await asyncio.to_thread(reap_stuck_jobs, queue_name)
+                if reaped:
+                    logger.warning(f"Requeued {reaped} stuck {queue_name} jobs from dead workers")
+            except Exception as e:
+                logger.error(f"Heartbeat failed for {queue_name}: {e}")
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), settings.QUEUE_HEARTBEAT_INTERVAL)
+
+
+async def _promote_loop(queues: list[str], stop: asyncio.Event) -> None:
+    """Move due delayed jobs (retries, scheduled sends) onto their lanes."""
+    while not stop.is_set():
+        for queue_name in queues:
+            try:
+                await asyncio.to_thread(promote_due_jobs, queue_name)
+            except Exception as e:
+                logger.error(f"Promoting delayed {queue_name} jobs failed: {e}")
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), settings.QUEUE_SCHEDULER_INTERVAL)
+
+
+async def run(queues: list[str], worker_id: str) -> None:
+    """Consume the given queues until SIGTERM/SIGINT, then drain."""
+    logger.info(f"=== Starting worker {worker_id} ===")
+    for queue_name in queues:
+        spec = QUEUES[queue_name]
+        logger.info(f"Queue {queue_name}: concurrency {spec.concurrency}, provider {spec.provider or '-'}")
+    logger.info(f"Poll timeout: {POLL_TIMEOUT_SECONDS}s, backend: {settings.QUEUE_BACKEND}")
+
+    for queue_name in queues:
+        await asyncio.to_thread(ensure_consumer_groups, queue_name)
+        migrated = await asyncio.to_thread(migrate_legacy_dlq, queue_name)
+        if migrated:
+            logger.info(f"Moved {migrated} {queue_name} jobs from the old DLQ list into the DLQ stream")
+
+    stop = asyncio.Event()
+    stopping.clear()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    inflight: set[asyncio.Task] = set()
+    async with contextlib.AsyncExitStack() as stack:
+        for factory in LIFESPANS:
+            await stack.enter_async_context(factory())
+
+        # Beat once before reserving anything so the reaper never sees us as dead
+        for queue_name in queues:
+            await asyncio.to_thread(heartbeat, queue_name, worker_id)
+        beats = asyncio.create_task(_heartbeat_loop(queues, worker_id, stop))
+        mover = asyncio.create_task(_promote_loop(queues, stop))
+
+        consumers = []
+        for queue_name in queues:
+            spec = QUEUES[queue_name]
+            handler, breaker = dispatch(queue_name), None
+            if spec.provider:
+                breaker = CircuitBreaker()
+                handler = guarded(spec.provider, breaker, handler)
+            consumers.append(consume(queue_name, worker_id, handler, spec.concurrency, stop, inflight, breaker))
+        await asyncio.gather(*consumers)
+        stopping.set()
+
+        logger.info(f"=== Draining {len(inflight)} in-flight jobs ===")
+        if inflight:
+            _, pending = await asyncio.wait(set(inflight), timeout=settings.WORKER_DRAIN_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await asyncio.gather(beats, mover)
+
+    # Anything not acked (e.g. cancelled jobs) goes back to the queue head
+    for queue_name in queues:
+        try:
+            await asyncio.to_thread(unregister_worker, queue_name, worker_id)
+        except Exception as e:
+            logger.error(f"Failed to unregister from {queue_name}: {e}")
+    logger.info("=== Worker stopped ===")
+
+
+def _run_process(queues: list[str], index: int = 0) -> None:
+    load_handlers()
+    if settings.WORKER_METRICS_PORT:
+        start_http_server(settings.WORKER_METRICS_PORT + index)
+    asyncio.run(run(queues, f"{socket.gethostname()}-{os.getpid()}"))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Background job worker")
+    parser.add_argument("--queues", default=",".join(QUEUES), help="Comma-separated queues to consume (default: all)")
+    parser.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES)
+    args = parser.parse_args(argv)
+
+    queues = [name.strip() for name in args.queues.split(",") if name.strip()]
+    unknown = [name for name in queues if name not in QUEUES]
+    if unknown:
+        parser.error(f"unknown queues: {', '.join(unknown)} (known: {', '.join(QUEUES)})")
+
+    if args.processes <= 1:
+        _run_process(queues)
+        return
+
+    procs = [
+        multiprocessing.Process(target=_run_process, args=(queues, i), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for proc in procs:
+        proc.start()
+
+    def _forward(signum, frame):
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+
+    signal.signal(signal.SIGTERM, _forward)
+    signal.signal(signal.SIGINT, _forward)
+    for proc in procs:
+        proc.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ interface QueueStatsResponse {
 }
 interface DeadLetterJob {
   id: string;
+  dlq_id: string; // stream entry id, stable handle for retry
+  error_type?: string;
   type?: string;
   to?: string; // email recipient
   mobile?: string; // sms recipient
@@ -86,10 +88,10 @@ export default function AdminQueuePage() {
     return () => clearInterval(id);
   }, [autoRefresh, fetchStats, fetchDLQ]);
 
-  const retryJob = async (index: number) => {
+  const retryJob = async (dlqId: string) => {
     setActionBusy(true);
     try {
-      const res = await fetch(`${API_BASE}/dead-letter/${selectedDLQ}/${index}/retry`, { method: "POST" });
+      const res = await fetch(`${API_BASE}/dead-letter/${selectedDLQ}/${encodeURIComponent(dlqId)}/retry`, { method: "POST" });
       if (!res.ok) throw new Error(`Retry failed: ${res.status}`);
       await fetchDLQ();
       await fetchStats();
@@ -200,16 +202,16 @@ export default function AdminQueuePage() {
                 </TableHeader>
                 <TableBody>
                   {dlqJobs.map((job, idx) => (
-                    <TableRow key={job.id}>
+                    <TableRow key={job.dlq_id}>
                       <TableCell className="font-mono text-xs">{idx}</TableCell>
                       <TableCell className="font-mono text-xs max-w-[160px] truncate" title={job.id}>{job.id}</TableCell>
                       <TableCell className="text-xs">{job.type || "—"}</TableCell>
                       <TableCell className="text-xs max-w-[160px] truncate" title={job.to || job.mobile || ""}>{job.to || job.mobile || "—"}</TableCell>
                       <TableCell className="text-xs">{job.attempts}</TableCell>
                       <TableCell className="text-xs" title={job.createdAt}>{new Date(job.createdAt).toLocaleString()}</TableCell>
-                      <TableCell className="text-xs max-w-[200px] truncate" title={job.error}>{job.error ? job.error : "—"}</TableCell>
+                      <TableCell className="text-xs max-w-[200px] truncate" title={job.error}>{job.error ? `${job.error_type ? `${job.error_type}: ` : ""}${job.error}` : "—"}</TableCell>
                       <TableCell className="text-right">
-                        <Button size="sm" variant="outline" disabled={actionBusy} onClick={() => retryJob(idx)}>
+                        <Button size="sm" variant="outline" disabled={actionBusy} onClick={() => retryJob(job.dlq_id)}>
                           <RotateCcw className="mr-1 h-4 w-4" /> Retry
                         </Button>
                       </TableCell>
@@ -223,7 +225,7 @@ export default function AdminQueuePage() {
       </Card>
 
       <p className="text-xs text-muted-foreground">
-        DLQ indices are positional; after a retry or clear, the list is refreshed. Cashback DLQ inspection will be added once backend enables endpoints.
+        Newest dead-letter jobs first; retry requeues a job by its DLQ id. Cashback DLQ inspection will be added once backend enables endpoints.
       </p>
     </div>
   );